@@ -1,13 +1,103 @@
 from django.contrib import admin
-from .models import AsistenciaHumanitaria
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+from .models import AsistenciaHumanitaria, EstadoDatos
+
+# Los valores distintos de cada filtro se guardan por versión del contador de cambios;
+# el tiempo máximo cubre cargas que no pasen por EstadoDatos.registrar_cambio()
+TIMEOUT_VALORES_FILTROS = 3600
+# A partir de esta cantidad estimada de filas el paginador no hace COUNT(*) exacto
+UMBRAL_CONTEO_ESTIMADO = 100000
+
+
+def valores_distintos(campo, calcular):
+    """Valores distintos de `campo` desde la caché compartida; `calcular` los obtiene de la base."""
+    estado = EstadoDatos.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+    return cache.get_or_set(f'admin:valores:{campo}:{estado}', calcular, TIMEOUT_VALORES_FILTROS)
+
+
+class FiltroValoresCacheados(admin.SimpleListFilter):
+    """Filtro por igualdad cuyas opciones salen de valores_distintos() en vez de un SELECT DISTINCT por carga."""
+
+    campo = None
+
+    def lookups(self, request, model_admin):
+        valores = valores_distintos(self.campo, lambda: list(
+            AsistenciaHumanitaria.objects.order_by(self.campo).values_list(self.campo, flat=True).distinct()
+        ))
+        return [(valor, valor) for valor in valores]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.campo: self.value()})
+        return queryset
+
+
+class FiltroDepartamento(FiltroValoresCacheados):
+    title = 'departamento'
+    parameter_name = campo = 'departamento'
+
+
+class FiltroDistrito(FiltroValoresCacheados):
+    title = 'distrito'
+    parameter_name = campo = 'distrito'
+
+
+class FiltroEvento(FiltroValoresCacheados):
+    title = 'evento'
+    parameter_name = campo = 'evento'
+
+
+class FiltroAnio(admin.SimpleListFilter):
+    """Reemplaza date_hierarchy: filtra por rango de fechas del año, con los años cacheados."""
+
+    title = 'año'
+    parameter_name = 'anio'
+
+    def lookups(self, request, model_admin):
+        anios = valores_distintos('anio', lambda: [
+            fecha.year for fecha in AsistenciaHumanitaria.objects.dates('fecha', 'year')
+        ])
+        return [(str(anio), str(anio)) for anio in reversed(anios)]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            anio = int(self.value())
+            return queryset.filter(fecha__gte=f'{anio}-01-01', fecha__lt=f'{anio + 1}-01-01')
+        return queryset
+
+
+class PaginadorEstimado(Paginator):
+    """
+    En PostgreSQL, si el listado no tiene filtros y la tabla es grande, usa la estimación
+    de filas del planificador (pg_class.reltuples) en lugar de un COUNT(*) exacto.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if connection.vendor == 'postgresql' and query is not None and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                    [self.object_list.model._meta.db_table],
+                )
+                fila = cursor.fetchone()
+            if fila and fila[0] >= UMBRAL_CONTEO_ESTIMADO:
+                return fila[0]
+        return super().count
+
 
 @admin.register(AsistenciaHumanitaria)
 class AsistenciaHumanitariaAdmin(admin.ModelAdmin):
     list_display = ['fecha', 'localidad', 'distrito', 'departamento', 'evento', 'total_ayudas']
-    list_filter = ['departamento', 'distrito', 'evento', 'fecha']
+    list_filter = [FiltroDepartamento, FiltroDistrito, FiltroEvento, FiltroAnio]
     search_fields = ['localidad', 'distrito', 'departamento', 'evento']
-    date_hierarchy = 'fecha'
-    
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+
     fieldsets = (
         ('Información General', {
             'fields': ('fecha', 'localidad', 'distrito', 'departamento', 'evento')
@@ -0,0 +1,261 @@
+"""
+Comando Django para medir los caminos críticos del dashboard con datos sintéticos
+Ejecutar con: python manage.py benchmark --tamanos 10000 100000 1000000 --salida benchmark.json
+Solo el admin a 1M de filas: python manage.py benchmark --tamanos 1000000 --grupos admin
+
+Cada tamaño se inserta dentro de una transacción que se revierte al final,
+así la base queda igual que antes de ejecutar el comando. La caché compartida
+se reemplaza por una en memoria para no dejar páginas de datos sintéticos.
+"""
+
+import inspect
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd # type: ignore
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from dashboard import urls as dashboard_urls
+from dashboard import views
+from dashboard.admin import AsistenciaHumanitariaAdmin
+from dashboard.models import AsistenciaHumanitaria
+from dashboard.utils.generador_sintetico import insertar_registros
+from dashboard.utils.limpieza_paralela import cargar_dataframe
+
+sys.path.insert(0, str(settings.BASE_DIR / 'scripts'))
+from presupuesto_consultas import PARAMETROS  # noqa: E402
+
+
+class AdminSinOptimizar(AsistenciaHumanitariaAdmin):
+    """Configuración anterior del admin (filtros por campo, date_hierarchy y COUNT exacto), como referencia."""
+
+    list_filter = ['departamento', 'distrito', 'evento', 'fecha']
+    date_hierarchy = 'fecha'
+    paginator = Paginator
+    show_full_result_count = True
+
+
+class RollbackBenchmark(Exception):
+    """Se usa para revertir la transacción de cada tamaño."""
+
+
+def reiniciar_caches():
+    """Vacía las cachés en memoria de las vistas y la caché de páginas y fragmentos."""
+    views._reiniciar_caches()
+    cache.clear()
+
+
+def consumir_respuesta(response):
+    """Fuerza la generación completa del cuerpo de la respuesta."""
+    if getattr(response, 'streaming', False):
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+class Command(BaseCommand):
+    help = 'Mide carga y limpieza del DataFrame, métodos del DataCleaner, gráficos y vistas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos',
+            type=int,
+            nargs='+',
+            default=[10000, 100000, 1000000],
+            help='Cantidades de registros sintéticos a medir',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=1,
+            help='Repeticiones de cada medición (se reportan mínimo y media)',
+        )
+        parser.add_argument('--semilla', type=int, default=0, help='Semilla del generador')
+        parser.add_argument(
+            '--salida',
+            default='benchmark.json',
+            help='Archivo JSON donde se guardan los resultados',
+        )
+        parser.add_argument(
+            '--comparar',
+            help='Archivo JSON de una ejecución anterior para comparar tiempos',
+        )
+        parser.add_argument(
+            '--grupos',
+            nargs='+',
+            choices=['dataframe', 'cleaner', 'graficos', 'vistas', 'admin'],
+            default=['dataframe', 'cleaner', 'graficos', 'vistas', 'admin'],
+            help='Grupos de mediciones a ejecutar',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Permite ejecutar con registros existentes (se ocultan dentro de la transacción)',
+        )
+
+    def handle(self, *args, **options):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.ejecutar(options)
+
+    def ejecutar(self, options):
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser al menos 1')
+        if AsistenciaHumanitaria.objects.exists() and not options['forzar']:
+            raise CommandError('La tabla tiene registros; use --forzar para medir igualmente')
+
+        self.repeticiones = options['repeticiones']
+        resultados = []
+        for tamano in options['tamanos']:
+            self.stdout.write(self.style.SUCCESS(f'📏 Tamaño: {tamano:,} registros'))
+            try:
+                with transaction.atomic():
+                    AsistenciaHumanitaria.objects.all().delete()
+                    insertar_registros(tamano, semilla=options['semilla'])
+                    resultados.extend(self.medir_tamano(tamano, options['grupos']))
+                    raise RollbackBenchmark()
+            except RollbackBenchmark:
+                pass
+            finally:
+                reiniciar_caches()
+
+        reporte = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'entorno': {
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'base_de_datos': connection.vendor,
+                'maquina': platform.machine(),
+            },
+            'repeticiones': self.repeticiones,
+            'resultados': resultados,
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"💾 Resultados guardados en {options['salida']}"))
+
+        if options.get('comparar'):
+            self.comparar(options['comparar'], resultados)
+
+    def medir(self, resultados, tamano, grupo, nombre, funcion, preparar=None):
+        """Ejecuta `funcion` varias veces y agrega el resultado a la lista."""
+        tiempos = []
+        for _ in range(self.repeticiones):
+            if preparar:
+                preparar()
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+
+        resultados.append({
+            'tamano': tamano,
+            'grupo': grupo,
+            'nombre': nombre,
+            'min_s': round(min(tiempos), 6),
+            'media_s': round(statistics.mean(tiempos), 6),
+        })
+        self.stdout.write(f'  {grupo:<10} {nombre:<55} {min(tiempos):>9.3f}s')
+
+    def medir_tamano(self, tamano, grupos):
+        resultados = []
+        cleaner = views.cleaner
+
+        if 'dataframe' in grupos:
+            self.medir(resultados, tamano, 'dataframe', 'carga_db',
+                       lambda: cargar_dataframe(AsistenciaHumanitaria.objects.order_by('id')))
+            self.medir(resultados, tamano, 'dataframe', '_get_cleaned_dataframe',
+                       views._get_cleaned_dataframe, preparar=reiniciar_caches)
+
+        df_cleaned = views._get_cleaned_dataframe()
+
+        if 'cleaner' in grupos:
+            crudo = cargar_dataframe(AsistenciaHumanitaria.objects.order_by('id'))
+            registros = crudo.to_dict('records')
+            mediciones = {
+                'limpiar_numero': lambda: [crudo[f].apply(cleaner.limpiar_numero) for f in cleaner.aid_fields],
+                'limpiar_texto': lambda: crudo['localidad'].apply(cleaner.limpiar_texto),
+                'limpiar_evento': lambda: crudo['evento'].apply(cleaner.limpiar_evento),
+                'limpiar_departamento': lambda: crudo['departamento'].apply(cleaner.limpiar_departamento),
+                'corregir_distrito_como_departamento': lambda: [
+                    cleaner.corregir_distrito_como_departamento(dep, dist)
+                    for dep, dist in zip(crudo['departamento'], crudo['distrito'])
+                ],
+                'post_process_eventos_with_aids': lambda: df_cleaned.apply(cleaner.post_process_eventos_with_aids, axis=1),
+                'limpiar_registro_completo': lambda: [cleaner.limpiar_registro_completo(r) for r in registros],
+                'huella_registro': lambda: [cleaner.huella_registro(r) for r in registros],
+            }
+            for nombre, funcion in mediciones.items():
+                self.medir(resultados, tamano, 'cleaner', nombre, funcion)
+
+        if 'graficos' in grupos:
+            # Los gráficos temporales reciben los rollups (RollupDiario) en lugar del DataFrame
+            rollups = views._rollups()
+            # Cada medición incluye el cálculo de los datos intermedios que usa el gráfico
+            sin_intermedios = lambda: views._cache.update(intermedios=None)
+            for nombre, funcion in inspect.getmembers(views, inspect.isfunction):
+                if nombre.startswith('generar_grafico_'):
+                    datos = rollups if 'rollups' in inspect.signature(funcion).parameters else df_cleaned
+                    self.medir(resultados, tamano, 'graficos', nombre, lambda f=funcion, d=datos: f(d),
+                               preparar=sin_intermedios)
+
+        if 'vistas' in grupos:
+            factory = RequestFactory()
+            for patron in dashboard_urls.urlpatterns:
+                # Mismos parámetros que la verificación de presupuesto, para no medir respuestas de error
+                url = reverse(f'{dashboard_urls.app_name}:{patron.name}') + PARAMETROS.get(patron.name, '')
+                vista = async_to_sync(patron.callback) if iscoroutinefunction(patron.callback) else patron.callback
+
+                def llamar(v=vista, u=url):
+                    response = v(factory.get(u))
+                    if response.status_code != 200:
+                        raise CommandError(f'{u} respondió {response.status_code}; la medición no es válida')
+                    consumir_respuesta(response)
+
+                self.medir(resultados, tamano, 'vistas', f'{patron.name} (fría)', llamar, preparar=reiniciar_caches)
+                self.medir(resultados, tamano, 'vistas', f'{patron.name} (caliente)', llamar)
+
+        if 'admin' in grupos:
+            factory = RequestFactory()
+            usuario = User(username='benchmark', is_staff=True, is_superuser=True, is_active=True)
+            url = reverse('admin:dashboard_asistenciahumanitaria_changelist')
+            for nombre, clase in [('changelist', AsistenciaHumanitariaAdmin), ('changelist (sin optimizar)', AdminSinOptimizar)]:
+                model_admin = clase(AsistenciaHumanitaria, admin.site)
+                for descripcion, parametros in [('', {}), (' filtrado', {'departamento': 'CENTRAL'})]:
+                    def llamar(m=model_admin, p=parametros):
+                        request = factory.get(url, p)
+                        request.user = usuario
+                        return m.changelist_view(request).render()
+                    self.medir(resultados, tamano, 'admin', f'{nombre}{descripcion} (fría)', llamar, preparar=cache.clear)
+                    self.medir(resultados, tamano, 'admin', f'{nombre}{descripcion} (caliente)', llamar)
+
+        return resultados
+
+    def comparar(self, ruta, resultados):
+        """Muestra la variación de cada medición respecto de una ejecución anterior."""
+        with open(ruta, encoding='utf-8') as archivo:
+            anteriores = {
+                (r['tamano'], r['grupo'], r['nombre']): r['min_s'] for r in json.load(archivo)['resultados']
+            }
+
+        self.stdout.write(f'\n📊 Comparación con {ruta}:')
+        for r in resultados:
+            anterior = anteriores.get((r['tamano'], r['grupo'], r['nombre']))
+            if not anterior:
+                continue
+            variacion = (r['min_s'] - anterior) / anterior * 100
+            estilo = self.style.ERROR if variacion > 10 else self.style.SUCCESS if variacion < -10 else str
+            self.stdout.write(estilo(
+                f"  {r['tamano']:>9,} {r['grupo']:<10} {r['nombre']:<55} {anterior:>9.3f}s -> {r['min_s']:>9.3f}s ({variacion:+.1f}%)"
+            ))
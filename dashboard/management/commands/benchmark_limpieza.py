@@ -0,0 +1,89 @@
+"""
+Comando Django para medir cómo escala la limpieza al aumentar la cantidad de procesos
+Ejecutar con: python manage.py benchmark_limpieza --filas 200000 --workers 8
+
+Inserta --filas registros sintéticos, los limpia en el proceso actual como referencia y
+luego con limpiar_en_paralelo (lo mismo que limpiar_datos --workers) usando de 1 a N
+procesos, verificando que cada resultado sea idéntico al secuencial. Los procesos leen
+la base con sus propias conexiones, así que los registros se confirman y se borran al final.
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Q
+
+from dashboard.models import AsistenciaHumanitaria
+from dashboard.utils.generador_sintetico import insertar_registros
+from dashboard.utils.limpieza_paralela import cargar_dataframe, limpiar_dataframe, limpiar_en_paralelo
+
+
+class Command(BaseCommand):
+    help = 'Mide limpiar_en_paralelo sobre registros sintéticos usando de 1 a N procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=100000,
+            help='Cantidad de registros sintéticos a insertar y limpiar',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Cantidad máxima de procesos a medir',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=0,
+            help='Semilla del generador de datos sintéticos',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Permite ejecutar con registros existentes (solo se limpian los sintéticos)',
+        )
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        max_workers = options['workers']
+        if filas < 1 or max_workers < 1:
+            raise CommandError('--filas y --workers deben ser mayores a 0')
+        if AsistenciaHumanitaria.objects.exists() and not options['forzar']:
+            raise CommandError('La tabla tiene registros; use --forzar para medir igualmente')
+
+        ultimo_id = AsistenciaHumanitaria.objects.aggregate(maximo=Max('id'))['maximo'] or 0
+        # Solo los registros sintéticos (con la tabla vacía equivale a Q())
+        filtro = Q(id__gt=ultimo_id)
+
+        self.stdout.write(f"🧪 Insertando {filas:,} registros sintéticos (semilla {options['semilla']})...")
+        try:
+            insertar_registros(filas, semilla=options['semilla'])
+            self.medir(filtro, filas, max_workers)
+        finally:
+            AsistenciaHumanitaria.objects.filter(filtro).delete()
+            self.stdout.write('🗑️ Registros sintéticos eliminados')
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark de limpieza finalizado'))
+
+    def medir(self, filtro, filas, max_workers):
+        inicio = time.perf_counter()
+        referencia = limpiar_dataframe(cargar_dataframe(AsistenciaHumanitaria.objects.filter(filtro).order_by('id')))
+        base = time.perf_counter() - inicio
+
+        self.stdout.write(f"{'procesos':>9} {'segundos':>10} {'registros/s':>13} {'aceleración':>12}")
+        self.stdout.write(f"{'secuencial':>9} {base:>10.2f} {filas / base:>13,.0f} {1:>11.2f}x")
+        for workers in range(1, max_workers + 1):
+            inicio = time.perf_counter()
+            resultado = limpiar_en_paralelo(filtro, workers)
+            duracion = time.perf_counter() - inicio
+
+            if not referencia.equals(resultado):
+                raise CommandError(f'El resultado con {workers} procesos difiere del secuencial')
+
+            self.stdout.write(
+                f"{workers:>9} {duracion:>10.2f} {filas / duracion:>13,.0f} {base / duracion:>11.2f}x"
+            )
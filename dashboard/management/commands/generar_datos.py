@@ -0,0 +1,55 @@
+"""
+Comando Django para poblar la base con registros sintéticos de asistencia humanitaria
+Ejecutar con: python manage.py generar_datos 100000 --semilla 42
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from dashboard.models import AsistenciaHumanitaria
+from dashboard.utils.generador_sintetico import insertar_registros
+
+
+class Command(BaseCommand):
+    help = 'Genera N registros sintéticos con variantes sucias de departamentos y eventos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('cantidad', type=int, help='Cantidad de registros a generar')
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=0,
+            help='Semilla para obtener siempre los mismos registros',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=50000,
+            help='Cantidad de registros generados e insertados por lote',
+        )
+        parser.add_argument(
+            '--reemplazar',
+            action='store_true',
+            help='Elimina todos los registros existentes antes de generar',
+        )
+
+    def handle(self, *args, **options):
+        cantidad = options['cantidad']
+        if cantidad < 1 or options['lote'] < 1:
+            raise CommandError('La cantidad y el lote deben ser mayores a 0')
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            if options['reemplazar']:
+                eliminados, _ = AsistenciaHumanitaria.objects.all().delete()
+                self.stdout.write(self.style.WARNING(f'🗑️ Eliminados {eliminados} registros existentes'))
+
+            self.stdout.write(f"🧪 Generando {cantidad:,} registros (semilla {options['semilla']})...")
+            insertados = insertar_registros(cantidad, semilla=options['semilla'], lote=options['lote'])
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ {insertados:,} registros generados en {duracion:.2f}s')
+        )
@@ -0,0 +1,184 @@
+"""
+Comando Django para importar registros de asistencia humanitaria desde CSV o Excel
+Ejecutar con: python manage.py importar_datos archivo.csv
+"""
+
+import os
+import re
+import time
+import unicodedata
+
+import pandas as pd # type: ignore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from dashboard.models import CAMPOS_CRUDOS, AsistenciaHumanitaria
+from dashboard.utils.data_cleaner import DataCleaner
+from dashboard.utils.limpieza_paralela import limpiar_dataframe
+
+CAMPOS_TEXTO = ['localidad', 'distrito', 'departamento', 'evento']
+
+
+def normalizar_columna(nombre):
+    """Convierte encabezados como 'Chapa Fibrocemento' o 'KIT-A' al nombre del campo del modelo."""
+    nombre = unicodedata.normalize('NFKD', str(nombre)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', nombre.strip().lower()).strip('_')
+
+
+def leer_csv(ruta, tamano_lote):
+    """Lee un CSV por lotes sin cargarlo completo en memoria."""
+    yield from pd.read_csv(ruta, chunksize=tamano_lote, dtype=str, keep_default_na=False)
+
+
+def leer_excel(ruta, tamano_lote, hoja=None):
+    """Lee una planilla XLSX por lotes usando el modo de solo lectura de openpyxl."""
+    try:
+        from openpyxl import load_workbook # type: ignore
+    except ImportError:
+        raise CommandError('Para importar archivos XLSX es necesario instalar openpyxl')
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = (libro[hoja] if hoja else libro.active).iter_rows(values_only=True)
+        encabezados = next(filas, None)
+        if encabezados is None:
+            return
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) >= tamano_lote:
+                yield pd.DataFrame(lote, columns=encabezados)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=encabezados)
+    finally:
+        libro.close()
+
+
+class Command(BaseCommand):
+    help = 'Importa registros desde un archivo CSV o XLSX, limpiándolos por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta al archivo .csv o .xlsx')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=10000,
+            help='Cantidad de filas leídas, limpiadas e insertadas por lote',
+        )
+        parser.add_argument(
+            '--hoja',
+            help='Nombre de la hoja a importar (solo XLSX, por defecto la hoja activa)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Lee y limpia el archivo sin insertar registros',
+        )
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        tamano_lote = options['lote']
+        dry_run = options['dry_run']
+
+        if not os.path.exists(ruta):
+            raise CommandError(f'No existe el archivo {ruta}')
+        if tamano_lote < 1:
+            raise CommandError('--lote debe ser mayor a 0')
+
+        extension = os.path.splitext(ruta)[1].lower()
+        if extension == '.csv':
+            lotes = leer_csv(ruta, tamano_lote)
+        elif extension in ('.xlsx', '.xlsm'):
+            lotes = leer_excel(ruta, tamano_lote, options.get('hoja'))
+        else:
+            raise CommandError('Formato no soportado: use un archivo .csv o .xlsx')
+
+        self.stdout.write(self.style.SUCCESS(f'📥 Importando {ruta}...'))
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️ Modo DRY-RUN: No se insertarán registros'))
+
+        cleaner = DataCleaner()
+        totales = {'leidos': 0, 'insertados': 0, 'duplicados': 0, 'descartados': 0}
+        inicio = time.perf_counter()
+
+        for numero, lote in enumerate(lotes, start=1):
+            inicio_lote = time.perf_counter()
+            resultado = self.procesar_lote(lote, cleaner, dry_run)
+            for clave, valor in resultado.items():
+                totales[clave] += valor
+
+            duracion = time.perf_counter() - inicio_lote
+            self.stdout.write(
+                f"  Lote {numero}: {resultado['leidos']} leídos, {resultado['insertados']} insertados, "
+                f"{resultado['duplicados']} duplicados, {resultado['descartados']} descartados "
+                f"({resultado['leidos'] / max(duracion, 1e-9):,.0f} filas/s)"
+            )
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(
+            f"📊 Total: {totales['leidos']} leídos, {totales['insertados']} insertados, "
+            f"{totales['duplicados']} duplicados, {totales['descartados']} descartados"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Importación finalizada en {duracion:.2f}s "
+                f"({totales['leidos'] / max(duracion, 1e-9):,.0f} filas/s)"
+            )
+        )
+
+    def procesar_lote(self, lote, cleaner, dry_run):
+        """Limpia un lote, descarta filas inválidas y duplicadas e inserta el resto."""
+        leidos = len(lote)
+        lote = lote.rename(columns=normalizar_columna)
+        if 'fecha' not in lote.columns:
+            raise CommandError("El archivo debe tener una columna 'fecha'")
+
+        for campo in CAMPOS_TEXTO:
+            if campo not in lote.columns:
+                lote[campo] = None
+        for campo in cleaner.aid_fields:
+            if campo not in lote.columns:
+                lote[campo] = 0
+        # Valores tal como vienen en el archivo: se guardan en <campo>_crudo
+        crudos = lote[CAMPOS_CRUDOS].astype(object).where(lote[CAMPOS_CRUDOS].notna(), None)
+        lote = limpiar_dataframe(lote[['fecha'] + CAMPOS_TEXTO + cleaner.aid_fields].copy(), cleaner)
+
+        # Sin fecha válida no se puede guardar; el preposicionamiento se elimina por regla y los
+        # 'SIN EVENTO' sin ayudas se descartan como en limpiar_datos (si no, quedarían con la
+        # huella vigente y limpiar_datos nunca los volvería a seleccionar)
+        sin_evento_ni_ayudas = lote['evento'].eq('SIN EVENTO') & (lote[cleaner.aid_fields].sum(axis=1) == 0)
+        validos = lote['fecha'].notna() & lote['evento'].notna() & ~sin_evento_ni_ayudas
+        lote = lote[validos].copy()
+        descartados = leidos - len(lote)
+        if lote.empty:
+            return {'leidos': leidos, 'insertados': 0, 'duplicados': 0, 'descartados': descartados}
+
+        lote['fecha'] = lote['fecha'].dt.date
+        registros = lote[cleaner.campos_huella].to_dict('records')
+        for registro, originales in zip(registros, crudos.loc[lote.index].to_dict('records')):
+            registro['huella'] = cleaner.huella_registro(registro)
+            for campo, valor in originales.items():
+                registro[f'{campo}_crudo'] = valor
+
+        # Duplicados dentro del lote y contra lo ya guardado (incluye lotes anteriores)
+        unicos = {registro['huella']: registro for registro in registros}
+        existentes = set(
+            AsistenciaHumanitaria.objects.filter(huella__in=list(unicos)).values_list('huella', flat=True)
+        )
+        nuevos = [registro for huella, registro in unicos.items() if huella not in existentes]
+        duplicados = len(registros) - len(nuevos)
+
+        if not dry_run and nuevos:
+            with transaction.atomic():
+                AsistenciaHumanitaria.objects.bulk_create(
+                    [AsistenciaHumanitaria(version_reglas=cleaner.version_reglas, **registro) for registro in nuevos],
+                    batch_size=1000,
+                )
+
+        return {
+            'leidos': leidos,
+            'insertados': len(nuevos),
+            'duplicados': duplicados,
+            'descartados': descartados,
+        }
@@ -3,12 +3,17 @@ Comando Django para limpiar y estandarizar datos de asistencia humanitaria
 Ejecutar con: python manage.py limpiar_datos
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from dashboard.models import AsistenciaHumanitaria
+from django.db.models import Q
 import pandas as pd
-from datetime import datetime
+from dashboard.models import (
+    CAMPOS_CRUDOS, AsistenciaHumanitaria, CambioParcial, ReglasAplicadas, cambios_en_bloque
+)
+import time
 from dashboard.utils.data_cleaner import DataCleaner # Importar DataCleaner
+from dashboard.utils.reglas import ReglasLimpieza, valores_afectados
+from dashboard.utils.limpieza_paralela import cargar_dataframe, limpiar_dataframe, limpiar_en_paralelo
 
 class Command(BaseCommand):
     help = 'Limpia y estandariza los datos de asistencia humanitaria'
@@ -24,10 +29,29 @@ class Command(BaseCommand):
             action='store_true',
             help='Muestra información detallada del proceso',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Cantidad de procesos para limpiar en paralelo (particiona por rangos de id)',
+        )
+        parser.add_argument(
+            '--todos',
+            action='store_true',
+            help='Re-limpia todos los registros, incluso los ya limpiados con las reglas vigentes',
+        )
+        parser.add_argument(
+            '--verificar-huellas',
+            action='store_true',
+            help='Recalcula la huella de cada registro para detectar cambios hechos fuera de Django (p. ej. SQL directo)',
+        )
 
     def handle(self, *args, **options):
         dry_run = options.get('dry_run', False)
         verbose = options.get('verbose', False)
+        workers = options.get('workers', 1)
+        if workers < 1:
+            raise CommandError('--workers debe ser al menos 1')
         
         self.stdout.write(
             self.style.SUCCESS('🧹 Iniciando limpieza de datos...')
@@ -40,35 +64,45 @@ class Command(BaseCommand):
         
         # Inicializar el limpiador de datos
         cleaner = DataCleaner()
-        
-        # Obtener todos los registros
-        registros = AsistenciaHumanitaria.objects.all()
+        aplicadas = ReglasAplicadas.objects.filter(version=cleaner.version_reglas).first()
+        if aplicadas is not None and aplicadas.contenido != cleaner.reglas.contenido:
+            raise CommandError(
+                f"Las reglas v{cleaner.version_reglas} ya se aplicaron con otro contenido: "
+                "incremente 'version' en el archivo de reglas"
+            )
+
+        # Seleccionar solo registros nuevos, modificados o afectados por el cambio de reglas
+        sin_cambios = Q(pk__in=[])
+        if options.get('todos'):
+            filtro = Q()
+        else:
+            afectados, sin_cambios = self.seleccionar_por_reglas(cleaner)
+            filtro = Q(huella__isnull=True) | afectados
+            if options.get('verificar_huellas'):
+                modificados = self.buscar_registros_modificados(cleaner)
+                self.stdout.write(f"🔎 Registros modificados desde la última limpieza: {len(modificados)}")
+                if modificados:
+                    filtro |= Q(id__in=modificados)
+        registros = AsistenciaHumanitaria.objects.filter(filtro)
         total_registros = registros.count()
         
         self.stdout.write(f"📊 Total de registros a procesar: {total_registros}")
+        if total_registros == 0:
+            if not dry_run:
+                self.guardar(cleaner, pd.DataFrame(), [], sin_cambios, total_registros)
+            self.stdout.write(
+                self.style.SUCCESS('✅ No hay registros nuevos ni modificados desde la última limpieza')
+            )
+            return
         
-        # Convertir a DataFrame para facilitar la limpieza
-        data = []
-        for registro in registros:
-            data.append({
-                'id': registro.id,
-                'fecha': registro.fecha,
-                'departamento': registro.departamento,
-                'distrito': registro.distrito,
-                'localidad': registro.localidad,
-                'evento': registro.evento,
-                'kit_b': registro.kit_b,
-                'kit_a': registro.kit_a,
-                'chapa_fibrocemento': registro.chapa_fibrocemento,
-                'chapa_zinc': registro.chapa_zinc,
-                'colchones': registro.colchones,
-                'frazadas': registro.frazadas,
-                'terciadas': registro.terciadas,
-                'puntales': registro.puntales,
-                'carpas_plasticas': registro.carpas_plasticas,
-            })
-        
-        df = pd.DataFrame(data)
+        # 1-5. LIMPIEZA DE FECHAS, AYUDAS, DEPARTAMENTOS, EVENTOS, LOCALIDADES Y DISTRITOS
+        inicio = time.perf_counter()
+        if workers > 1:
+            self.stdout.write(f"🧵 Limpiando en paralelo con {workers} procesos...")
+            df = limpiar_en_paralelo(filtro, workers)
+        else:
+            self.stdout.write("🧹 Limpiando registros...")
+            df = limpiar_dataframe(cargar_dataframe(registros.order_by('id')), cleaner)
         
         if df.empty:
             self.stdout.write(
@@ -76,46 +110,25 @@ class Command(BaseCommand):
             )
             return
         
-        # 1. LIMPIEZA DE FECHAS
-        self.stdout.write("📅 Procesando fechas...")
-        df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
-        df['AÑO'] = df['fecha'].dt.year
-        df['MES'] = df['fecha'].dt.month
-        df['DIA_SEMANA'] = df['fecha'].dt.day_name()
-        
-        # 2. LIMPIEZA DE VALORES NULOS EN AYUDAS
-        self.stdout.write("🔢 Limpiando valores numéricos...")
-        for col in cleaner.aid_fields:
-            df[col] = df[col].apply(cleaner.limpiar_numero)
-        
-        # 3. LIMPIEZA DE DEPARTAMENTOS
-        self.stdout.write("🗺️ Estandarizando departamentos...")
-        df['departamento'] = df['departamento'].apply(cleaner.limpiar_departamento)
-        
-        # 4. LIMPIEZA DE EVENTOS
-        self.stdout.write("⚡ Estandarizando eventos...")
-        df['evento'] = df['evento'].apply(cleaner.limpiar_evento)
-        
-        # Post-procesamiento de eventos (usando la función del cleaner)
-        df['evento'] = df.apply(cleaner.post_process_eventos_with_aids, axis=1)
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(f"⏱️ Limpieza en {duracion:.2f}s ({len(df) / max(duracion, 1e-9):,.0f} registros/s)")
 
-        # Eliminar registros SIN EVENTO que no tienen ayudas (opcional para el comando)
+        # Eliminar registros SIN EVENTO que no tienen ayudas (opcional para el comando) y los de
+        # preposicionamiento (evento nulo por regla, como en importar_datos); el borrado se hace
+        # al guardar, en la misma transacción que las actualizaciones
         cond_sin_evento = df['evento'].str.upper().str.strip().eq('SIN EVENTO')
-        registros_a_eliminar = df[cond_sin_evento & (df[cleaner.aid_fields].sum(axis=1) == 0)]
-        if not dry_run and not registros_a_eliminar.empty:
-            self.stdout.write(
-                self.style.WARNING(f"🗑️ Eliminando {len(registros_a_eliminar)} registros 'SIN EVENTO' y sin ayudas...")
-            )
-            AsistenciaHumanitaria.objects.filter(id__in=registros_a_eliminar['id']).delete()
+        cond_descartar = (cond_sin_evento & (df[cleaner.aid_fields].sum(axis=1) == 0)) | df['evento'].isna()
+        registros_a_eliminar = df[cond_descartar]
+        ids_a_eliminar = registros_a_eliminar['id'].tolist() if not dry_run else []
+        if not registros_a_eliminar.empty:
+            accion = 'Se eliminarían' if dry_run else 'Eliminando'
+            self.stdout.write(self.style.WARNING(
+                f"🗑️ {accion} {len(registros_a_eliminar)} registros de preposicionamiento o 'SIN EVENTO' y sin ayudas..."
+            ))
             df = df[~df['id'].isin(registros_a_eliminar['id'])] # Actualizar DataFrame local
             total_registros = df.shape[0] # Actualizar total de registros
             self.stdout.write(f"📊 Total de registros restantes: {total_registros}")
 
-        # 5. LIMPIEZA DE LOCALIDADES Y DISTRITOS
-        self.stdout.write("🏘️ Limpiando localidades y distritos...")
-        df['localidad'] = df['localidad'].apply(cleaner.limpiar_texto)
-        df['distrito'] = df['distrito'].apply(cleaner.limpiar_texto)
-        
         # 6. MOSTRAR ESTADÍSTICAS DE LIMPIEZA
         if verbose:
             self.stdout.write("\n📊 ESTADÍSTICAS DE LIMPIEZA:")
@@ -136,38 +149,7 @@ class Command(BaseCommand):
         # 7. GUARDAR CAMBIOS EN LA BASE DE DATOS
         if not dry_run:
             self.stdout.write("💾 Guardando cambios en la base de datos...")
-            
-            with transaction.atomic():
-                registros_actualizados = 0
-                
-                for index, row in df.iterrows():
-                    try:
-                        # Solo actualizamos si el registro no fue eliminado
-                        if row['id'] in AsistenciaHumanitaria.objects.values_list('id', flat=True):
-                            registro = AsistenciaHumanitaria.objects.get(id=row['id'])
-                            
-                            # Actualizar campos
-                            registro.departamento = row['departamento']
-                            registro.distrito = row['distrito']
-                            registro.localidad = row['localidad']
-                            registro.evento = row['evento']
-                            for field in cleaner.aid_fields:
-                                setattr(registro, field, int(row[field]))
-                            
-                            registro.save()
-                            registros_actualizados += 1
-                            
-                            if registros_actualizados % 100 == 0:
-                                self.stdout.write(f"  Procesados: {registros_actualizados}/{total_registros}")
-                        
-                    except AsistenciaHumanitaria.DoesNotExist:
-                        # Si el registro fue eliminado, simplemente lo saltamos
-                        pass
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f"Error procesando registro {row['id']}: {e}")
-                        )
-            
+            registros_actualizados = self.guardar(cleaner, df, ids_a_eliminar, sin_cambios, total_registros)
             self.stdout.write(
                 self.style.SUCCESS(f"✅ Limpieza completada: {registros_actualizados} registros actualizados")
             )
@@ -179,3 +161,109 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS('🎉 Proceso de limpieza finalizado')
         )
+
+    def guardar(self, cleaner, df, ids_a_eliminar, sin_cambios, total_registros):
+        """
+        Guarda los registros limpios, borra los descartados, pasa a la versión vigente los
+        registros que las reglas nuevas no cambian y registra las reglas aplicadas. Todo en una
+        transacción, con un solo cambio de versión de los datos: como se guardan los ids
+        tocados (CambioParcial), las vistas solo vuelven a limpiar esos registros.
+        """
+        registros_actualizados = 0
+        with transaction.atomic():
+            # Resumen de estadísticas y versión de los datos se actualizan una sola vez al final
+            with cambios_en_bloque():
+                if ids_a_eliminar:
+                    AsistenciaHumanitaria.objects.filter(id__in=ids_a_eliminar).delete()
+                registros_por_id = AsistenciaHumanitaria.objects.in_bulk(df['id'].tolist()) if not df.empty else {}
+
+                for index, row in df.iterrows():
+                    # Solo actualizamos si el registro no fue eliminado
+                    registro = registros_por_id.get(row['id'])
+                    if registro is None:
+                        continue
+                    try:
+                        # Actualizar campos (el valor crudo original se conserva)
+                        registro._limpieza = True
+                        registro.departamento = row['departamento']
+                        registro.distrito = row['distrito']
+                        registro.localidad = row['localidad']
+                        registro.evento = row['evento']
+                        for field in cleaner.aid_fields:
+                            setattr(registro, field, int(row[field]))
+
+                        # La huella se calcula sobre los valores tal como se guardan
+                        registro.huella = cleaner.huella_registro(
+                            {campo: getattr(registro, campo) for campo in cleaner.campos_huella}
+                        )
+                        registro.version_reglas = cleaner.version_reglas
+
+                        registro.save()
+                        registros_actualizados += 1
+
+                        if registros_actualizados % 100 == 0:
+                            self.stdout.write(f"  Procesados: {registros_actualizados}/{total_registros}")
+
+                    except Exception as e:
+                        self.stdout.write(
+                            self.style.ERROR(f"Error procesando registro {row['id']}: {e}")
+                        )
+
+                marcados = AsistenciaHumanitaria.objects.filter(sin_cambios).update(version_reglas=cleaner.version_reglas)
+                if marcados:
+                    self.stdout.write(f"📐 {marcados} registros no cambian con las reglas v{cleaner.version_reglas}")
+
+            if registros_actualizados or ids_a_eliminar or marcados:
+                CambioParcial.registrar(list(registros_por_id) + ids_a_eliminar)
+            ReglasAplicadas.objects.update_or_create(
+                version=cleaner.version_reglas, defaults={'contenido': cleaner.reglas.contenido}
+            )
+        return registros_actualizados
+
+    def seleccionar_por_reglas(self, cleaner):
+        """
+        Para los registros limpiados con reglas anteriores retorna (afectados, sin_cambios):
+        filtros Q de los que hay que volver a limpiar y de los que las reglas nuevas no cambian.
+        Si se conserva la copia de las reglas anteriores, se comparan ambas versiones sobre los
+        valores crudos distintos y el índice <campo>_crudo da los registros afectados.
+        """
+        afectados, sin_cambios = Q(pk__in=[]), Q(pk__in=[])
+        anteriores = (AsistenciaHumanitaria.objects.exclude(version_reglas=cleaner.version_reglas)
+                      .exclude(version_reglas__isnull=True).order_by()
+                      .values_list('version_reglas', flat=True).distinct())
+        afectados |= Q(version_reglas__isnull=True)
+        for version in anteriores:
+            de_version = Q(version_reglas=version)
+            aplicadas = ReglasAplicadas.objects.filter(version=version).first()
+            if aplicadas is None:
+                self.stdout.write(
+                    self.style.WARNING(f"⚠️ No hay copia de las reglas v{version}: se re-limpian todos sus registros")
+                )
+                afectados |= de_version
+                continue
+
+            anterior = DataCleaner(ReglasLimpieza(aplicadas.contenido))
+            cambian = Q(pk__in=[])
+            for campo in CAMPOS_CRUDOS:
+                crudo = f'{campo}_crudo'
+                valores = (AsistenciaHumanitaria.objects.filter(de_version, **{f'{crudo}__isnull': False})
+                           .order_by().values_list(crudo, flat=True).distinct())
+                distintos = valores_afectados(anterior, cleaner, campo, valores)
+                self.stdout.write(
+                    f"📐 Reglas v{version} → v{cleaner.version_reglas}: {len(distintos)} valores de {campo} cambian"
+                )
+                cambian |= Q(**{f'{crudo}__in': distintos}) | Q(**{f'{crudo}__isnull': True})
+            afectados |= de_version & cambian
+            sin_cambios |= de_version & ~cambian
+        return afectados, sin_cambios
+
+    def buscar_registros_modificados(self, cleaner):
+        """Devuelve los ids cuya huella guardada no coincide con sus valores actuales."""
+        modificados = []
+        registros = AsistenciaHumanitaria.objects.filter(huella__isnull=False).values(
+            'id', 'huella', *cleaner.campos_huella
+        )
+        for registro in registros.iterator(chunk_size=5000):
+            if cleaner.huella_registro(registro) != registro['huella']:
+                modificados.append(registro['id'])
+        return modificados
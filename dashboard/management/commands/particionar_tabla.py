@@ -0,0 +1,196 @@
+"""
+Comando Django para convertir asistencia_humanitaria en una tabla particionada por año (PostgreSQL)
+Ejecutar con: python manage.py particionar_tabla [--anios-futuros 1] [--dry-run]
+Revertir con: python manage.py particionar_tabla --revertir
+
+Crea una partición por año de `fecha` (más una DEFAULT para fechas fuera de rango), copia los
+registros y vuelve a crear los índices sobre la tabla nueva, todo en una transacción con la
+tabla bloqueada. Las consultas con filtros de fecha (exportación, tabla, filtro por año del
+admin) leen solo las particiones de esos años. La clave primaria pasa a ser (id, fecha),
+como exige PostgreSQL; el id sigue siendo único porque sale de la misma secuencia.
+
+Si la tabla ya está particionada, solo agrega las particiones que falten hasta el año
+actual + --anios-futuros (ejecutarlo una vez por año, p. ej. desde cron).
+"""
+
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from dashboard.models import AsistenciaHumanitaria
+
+TABLA = AsistenciaHumanitaria._meta.db_table
+TABLA_NUEVA = f'{TABLA}_nueva'
+PARTICION_DEFAULT = f'{TABLA}_otros'
+
+
+def nombre_particion(anio):
+    return f'{TABLA}_{anio}'
+
+
+def esta_particionada(cursor):
+    cursor.execute('SELECT relkind FROM pg_class WHERE oid = %s::regclass', [TABLA])
+    return cursor.fetchone()[0] == 'p'
+
+
+class Command(BaseCommand):
+    help = 'Convierte asistencia_humanitaria en una tabla particionada por año de fecha (o la revierte)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--revertir',
+            action='store_true',
+            help='Vuelve a una tabla sin particionar con clave primaria (id)',
+        )
+        parser.add_argument(
+            '--anios-futuros',
+            type=int,
+            default=1,
+            help='Años posteriores al actual para los que se crean particiones vacías',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra las sentencias SQL sin ejecutarlas',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('El particionado declarativo solo está disponible en PostgreSQL')
+        if options['anios_futuros'] < 0:
+            raise CommandError('--anios-futuros no puede ser negativo')
+        self.dry_run = options['dry_run']
+        inicio = time.perf_counter()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.cursor = cursor
+            self.ejecutar(f'LOCK TABLE {TABLA} IN ACCESS EXCLUSIVE MODE')
+            particionada = esta_particionada(cursor)
+            if options['revertir']:
+                if not particionada:
+                    self.stdout.write(self.style.WARNING('⚠️ La tabla no está particionada, no hay nada que revertir'))
+                    return
+                self.reconstruir(particionar=False)
+            elif particionada:
+                self.stdout.write('📂 La tabla ya está particionada; se agregan las particiones que falten')
+                self.crear_particiones_faltantes(options['anios_futuros'])
+            else:
+                self.reconstruir(particionar=True, anios_futuros=options['anios_futuros'])
+            if not self.dry_run:
+                self.ejecutar(f'ANALYZE {TABLA}')
+
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING('🔍 Modo dry-run: no se ejecutó ningún cambio'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Listo en {time.perf_counter() - inicio:.1f}s'))
+
+    def ejecutar(self, sql, parametros=None):
+        if self.dry_run and not sql.startswith('LOCK'):
+            self.stdout.write(f'  {sql};')
+            return
+        self.cursor.execute(sql, parametros)
+
+    def rango_anios(self, anios_futuros):
+        self.cursor.execute(f'SELECT EXTRACT(YEAR FROM MIN(fecha))::int, EXTRACT(YEAR FROM MAX(fecha))::int FROM {TABLA}')
+        desde, hasta = self.cursor.fetchone()
+        actual = datetime.date.today().year
+        # Hasta el año actual + anios_futuros, o hasta el último año con registros si es posterior
+        return range(desde or actual, max(hasta or actual, actual + anios_futuros) + 1)
+
+    def crear_particion(self, anio, tabla=TABLA):
+        self.ejecutar(
+            f"CREATE TABLE {nombre_particion(anio)} PARTITION OF {tabla} "
+            f"FOR VALUES FROM ('{anio}-01-01') TO ('{anio + 1}-01-01')"
+        )
+
+    def crear_particiones_faltantes(self, anios_futuros):
+        self.cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass',
+            [TABLA],
+        )
+        existentes = {fila[0] for fila in self.cursor.fetchall()}
+        columnas = ', '.join(self.columnas())
+        creadas = 0
+        for anio in self.rango_anios(anios_futuros):
+            if nombre_particion(anio) in existentes:
+                continue
+            desde, hasta = f'{anio}-01-01', f'{anio + 1}-01-01'
+            # Los registros de ese año que cayeron en la partición DEFAULT se mueven a la nueva
+            self.ejecutar(f'ALTER TABLE {TABLA} DETACH PARTITION {PARTICION_DEFAULT}')
+            self.crear_particion(anio)
+            self.ejecutar(
+                f"INSERT INTO {TABLA} ({columnas}) SELECT {columnas} FROM {PARTICION_DEFAULT} "
+                f"WHERE fecha >= '{desde}' AND fecha < '{hasta}'"
+            )
+            self.ejecutar(f"DELETE FROM {PARTICION_DEFAULT} WHERE fecha >= '{desde}' AND fecha < '{hasta}'")
+            self.ejecutar(f'ALTER TABLE {TABLA} ATTACH PARTITION {PARTICION_DEFAULT} DEFAULT')
+            creadas += 1
+        self.stdout.write(f'📂 {creadas} particiones nuevas')
+
+    def columnas(self):
+        return [
+            connection.ops.quote_name(columna.name)
+            for columna in connection.introspection.get_table_description(self.cursor, TABLA)
+        ]
+
+    def indices(self):
+        """Definiciones de los índices de la tabla, salvo el de la clave primaria."""
+        self.cursor.execute(
+            'SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x '
+            'WHERE x.indrelid = %s::regclass AND NOT x.indisprimary',
+            [TABLA],
+        )
+        # En una tabla particionada la definición dice ON ONLY (solo el padre)
+        return [fila[0].replace(' ON ONLY ', ' ON ') for fila in self.cursor.fetchall()]
+
+    def reconstruir(self, particionar, anios_futuros=1):
+        """Copia la tabla en una nueva (particionada o no), borra la anterior y ocupa su nombre."""
+        columnas = ', '.join(self.columnas())
+        indices = self.indices()
+        self.cursor.execute(f"SELECT pg_get_serial_sequence('{TABLA}', 'id')")
+        secuencia = self.cursor.fetchone()[0]
+        self.cursor.execute("SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'", [TABLA])
+        identidad = bool(self.cursor.fetchone()[0])
+        siguiente_id = 1
+        if secuencia:
+            # Valor que daría la secuencia, para no reutilizar ids de registros borrados
+            self.cursor.execute(f'SELECT last_value + CASE WHEN is_called THEN 1 ELSE 0 END FROM {secuencia}')
+            siguiente_id = self.cursor.fetchone()[0]
+
+        self.ejecutar(
+            f'CREATE TABLE {TABLA_NUEVA} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS)'
+            + (' PARTITION BY RANGE (fecha)' if particionar else '')
+        )
+        # En una tabla particionada la clave primaria debe incluir la columna de partición
+        self.ejecutar(f"ALTER TABLE {TABLA_NUEVA} ADD CONSTRAINT {TABLA_NUEVA}_pkey PRIMARY KEY ({'id, fecha' if particionar else 'id'})")
+        if particionar:
+            anios = self.rango_anios(anios_futuros)
+            for anio in anios:
+                self.crear_particion(anio, TABLA_NUEVA)
+            self.ejecutar(f'CREATE TABLE {PARTICION_DEFAULT} PARTITION OF {TABLA_NUEVA} DEFAULT')
+            self.stdout.write(f'📂 {len(anios)} particiones anuales ({anios.start}-{anios.stop - 1}) y {PARTICION_DEFAULT}')
+
+        self.stdout.write('📦 Copiando registros...')
+        self.ejecutar(f'INSERT INTO {TABLA_NUEVA} ({columnas}) SELECT {columnas} FROM {TABLA}')
+        if not identidad and secuencia:
+            # id serial: la secuencia pertenece a la tabla anterior y se borraría con ella
+            self.ejecutar(f'ALTER SEQUENCE {secuencia} OWNED BY {TABLA_NUEVA}.id')
+        self.ejecutar(f'DROP TABLE {TABLA}')
+        self.ejecutar(f'ALTER TABLE {TABLA_NUEVA} RENAME TO {TABLA}')
+        self.ejecutar(f'ALTER TABLE {TABLA} RENAME CONSTRAINT {TABLA_NUEVA}_pkey TO {TABLA}_pkey')
+        if identidad:
+            # La columna identity de la tabla nueva tiene su propia secuencia: sigue donde quedó la anterior
+            self.ejecutar(f'ALTER SEQUENCE {TABLA_NUEVA}_id_seq RENAME TO {TABLA}_id_seq')
+            self.ejecutar(
+                f"SELECT setval('{TABLA}_id_seq', GREATEST({siguiente_id}, COALESCE((SELECT MAX(id) FROM {TABLA}), 0) + 1), false)"
+            )
+
+        self.stdout.write(f'🗂️ Recreando {len(indices)} índices...')
+        for indice in indices:
+            self.ejecutar(indice)
+        self.stdout.write(self.style.SUCCESS(
+            '✅ Tabla particionada por año de fecha' if particionar else '✅ Tabla sin particionar restaurada'
+        ))
@@ -0,0 +1,97 @@
+"""
+Comando Django que genera en segundo plano los gráficos encolados por las páginas
+(TrabajoGrafico) cuando DASHBOARD_GRAFICOS_EN_SEGUNDO_PLANO está activado
+Ejecutar con: python manage.py procesar_graficos [--intervalo 2] [--una-vez]
+
+Antes de cada trabajo consulta la versión de los datos: los trabajos de versiones
+anteriores se descartan y el DataFrame limpio se mantiene en la memoria del worker entre
+trabajos, igual que en las vistas. Pueden correr varios workers a la vez: cada trabajo lo
+toma uno solo.
+"""
+
+import time
+import traceback
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard import views
+from dashboard.models import TrabajoGrafico
+from dashboard.utils import metricas
+
+# Un trabajo en proceso por más tiempo que esto se considera de un worker que terminó sin completarlo
+MINUTOS_TRABAJO_ABANDONADO = 10
+
+
+class Command(BaseCommand):
+    help = 'Genera en segundo plano los gráficos encolados por las páginas del dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando la cola está vacía',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina',
+        )
+        parser.add_argument(
+            '--max-intentos',
+            type=int,
+            default=3,
+            help='Intentos antes de marcar un trabajo con error',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🖼️ Worker de gráficos iniciado'))
+        procesados = 0
+        try:
+            while True:
+                version = views._sincronizar_version()['etag']
+                self.limpiar_cola(version)
+                trabajo = TrabajoGrafico.tomar_siguiente(version)
+                if trabajo is None:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                self.procesar(trabajo, options['max_intentos'])
+                procesados += 1
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'✅ {procesados} gráficos procesados'))
+
+    def limpiar_cola(self, version):
+        """Borra los trabajos de otras versiones de los datos y devuelve a la cola los abandonados."""
+        TrabajoGrafico.objects.exclude(version_datos=version).delete()
+        limite = timezone.now() - timedelta(minutes=MINUTOS_TRABAJO_ABANDONADO)
+        TrabajoGrafico.objects.filter(estado=TrabajoGrafico.EN_PROCESO, iniciado__lt=limite).update(
+            estado=TrabajoGrafico.PENDIENTE,
+        )
+
+    def procesar(self, trabajo, max_intentos):
+        inicio = time.perf_counter()
+        if trabajo.nombre not in views.GRAFICOS_EN_SEGUNDO_PLANO:
+            trabajo.terminar(error=f'Gráfico desconocido: {trabajo.nombre}')
+            self.stdout.write(self.style.WARNING(f'⚠️ {trabajo.nombre}: gráfico desconocido'))
+            return
+        try:
+            imagen = views._generar_grafico_pendiente(trabajo.nombre)
+        except Exception:
+            reintentar = trabajo.intentos < max_intentos
+            trabajo.terminar(error=traceback.format_exc(), reintentar=reintentar)
+            metricas.incrementar('dashboard_graficos_segundo_plano_total', resultado='error')
+            self.stdout.write(self.style.ERROR(
+                f"❌ {trabajo.nombre}: error en el intento {trabajo.intentos}"
+                + (', se reintentará' if reintentar else '')
+            ))
+        else:
+            trabajo.terminar(imagen=imagen)
+            metricas.incrementar('dashboard_graficos_segundo_plano_total', resultado='generado')
+            metricas.observar('dashboard_grafico_espera_segundos', (trabajo.terminado - trabajo.creado).total_seconds())
+            self.stdout.write(f'🖼️ {trabajo.nombre} en {time.perf_counter() - inicio:.1f}s')
+        metricas.volcar()
@@ -0,0 +1,85 @@
+"""
+Comando Django para comparar ResumenEstadisticas y RollupDiario con un recálculo completo de la tabla
+Ejecutar con: python manage.py reconciliar_resumen [--corregir]
+
+El resumen y los rollups se mantienen en cada alta, cambio y baja hecha con el ORM; cargas por SQL
+directo o errores pueden desviarlos. Termina con código 1 si hay diferencias sin corregir.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from dashboard.models import EstadoDatos, ResumenEstadisticas, RollupDiario
+
+# Días con diferencias que se muestran en detalle
+MAX_DIAS_LISTADOS = 20
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen de estadísticas y los rollups diarios desde cero y reporta (o corrige) las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corregir',
+            action='store_true',
+            help='Guarda los valores recalculados si hay diferencias',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            guardado = ResumenEstadisticas.objects.select_for_update().filter(pk=1).values(*ResumenEstadisticas.CAMPOS).first()
+            calculado = ResumenEstadisticas.calcular_desde_tabla()
+            dias_guardados = {
+                fila.pop('fecha'): fila
+                for fila in RollupDiario.objects.select_for_update().values('fecha', *RollupDiario.CAMPOS)
+            }
+            dias_calculados = RollupDiario.calcular_desde_tabla()
+            duracion = time.perf_counter() - inicio
+
+            if guardado is None:
+                self.stdout.write(self.style.WARNING('⚠️ No existe la fila del resumen'))
+                diferencias = {campo: (None, valor) for campo, valor in calculado.items()}
+            else:
+                diferencias = {
+                    campo: (guardado[campo], valor)
+                    for campo, valor in calculado.items() if guardado[campo] != valor
+                }
+            dias_distintos = sorted(
+                fecha for fecha in dias_guardados.keys() | dias_calculados.keys()
+                if dias_guardados.get(fecha) != dias_calculados.get(fecha)
+            )
+
+            self.stdout.write(f'⏱️ Recálculo completo en {duracion:.2f}s')
+            if not diferencias and not dias_distintos:
+                self.stdout.write(self.style.SUCCESS('✅ El resumen y los rollups diarios coinciden con la tabla'))
+                return
+
+            if diferencias:
+                self.stdout.write(self.style.WARNING(f'📊 {len(diferencias)} campos con diferencias:'))
+                self.stdout.write(f"  {'campo':<28} {'resumen':>14} {'tabla':>14} {'desvío':>12}")
+                for campo, (anterior, actual) in diferencias.items():
+                    desvio = f'{actual - anterior:+,}' if isinstance(anterior, int) and isinstance(actual, int) else '-'
+                    self.stdout.write(f'  {campo:<28} {str(anterior):>14} {str(actual):>14} {desvio:>12}')
+            if dias_distintos:
+                self.stdout.write(self.style.WARNING(f'📅 {len(dias_distintos)} días con diferencias en los rollups:'))
+                self.stdout.write(f"  {'fecha':<12} {'registros rollup':>16} {'tabla':>10}")
+                for fecha in dias_distintos[:MAX_DIAS_LISTADOS]:
+                    anterior = (dias_guardados.get(fecha) or {}).get('registros', 0)
+                    actual = (dias_calculados.get(fecha) or {}).get('registros', 0)
+                    self.stdout.write(f'  {str(fecha):<12} {anterior:>16} {actual:>10}')
+                if len(dias_distintos) > MAX_DIAS_LISTADOS:
+                    self.stdout.write(f'  … y {len(dias_distintos) - MAX_DIAS_LISTADOS} días más')
+
+            if options['corregir']:
+                if diferencias:
+                    ResumenEstadisticas.recalcular()
+                if dias_distintos:
+                    RollupDiario.recalcular()
+                EstadoDatos.registrar_cambio()
+                self.stdout.write(self.style.SUCCESS('✅ Resumen y rollups corregidos'))
+                return
+
+        raise CommandError('Hay diferencias; ejecute con --corregir para guardarlas')
@@ -0,0 +1,90 @@
+"""
+Comando Django para listar variantes de departamento y evento que no están en los diccionarios
+del DataCleaner y que la limpieza resuelve (o no) por búsqueda aproximada de trigramas
+Ejecutar con: python manage.py reportar_variantes [--min-registros 1]
+
+Para cada variante muestra el valor canónico propuesto, la similitud y los registros afectados,
+y al final las líneas listas para agregar a estandarizacion_dept / estandarizacion_eventos.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from dashboard.models import AsistenciaHumanitaria
+from dashboard.utils.data_cleaner import DataCleaner
+
+
+class _CleanerConRegistro(DataCleaner):
+    """DataCleaner que recuerda el último valor que tuvo que resolver por aproximación."""
+
+    consultado = None
+
+    def resolver_difuso(self, tipo, valor):
+        self.consultado = (tipo, valor)
+        return super().resolver_difuso(tipo, valor)
+
+
+class Command(BaseCommand):
+    help = 'Reporta variantes nuevas de departamento y evento con su valor canónico propuesto'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-registros',
+            type=int,
+            default=1,
+            help='Omite variantes con menos registros que este valor',
+        )
+
+    def handle(self, *args, **options):
+        cleaner = _CleanerConRegistro()
+        limpiezas = {
+            'departamento': cleaner.limpiar_departamento,
+            'evento': cleaner.limpiar_evento,
+        }
+        propuestas = {}
+        for campo, limpiar in limpiezas.items():
+            # (tipo, valor) -> [registros, valores crudos]
+            variantes = {}
+            filas = AsistenciaHumanitaria.objects.values(campo).annotate(registros=Count('id')).order_by()
+            for fila in filas:
+                cleaner.consultado = None
+                limpiar(fila[campo])
+                if cleaner.consultado is None:
+                    continue
+                variante = variantes.setdefault(cleaner.consultado, [0, []])
+                variante[0] += fila['registros']
+                variante[1].append(fila[campo])
+
+            variantes = sorted(
+                ((clave[1], registros, crudos) for clave, (registros, crudos) in variantes.items()
+                 if registros >= options['min_registros']),
+                key=lambda variante: -variante[1],
+            )
+            self.stdout.write(self.style.SUCCESS(f'\n📋 {campo}: {len(variantes)} variantes fuera de los diccionarios'))
+            if not variantes:
+                continue
+            self.stdout.write(
+                f"  {'variante':<30} {'propuesta':<22} {'similitud':>9} {'distancia':>9} {'registros':>9}  crudos"
+            )
+            for valor, registros, crudos in variantes:
+                resolucion = cleaner.resoluciones_difusas[(campo, valor)]
+                aceptada = cleaner.resolucion_aceptada(valor, resolucion)
+                propuesta, similitud, distancia = resolucion if resolucion else ('-', 0.0, '-')
+                estilo = self.style.SUCCESS if aceptada else self.style.WARNING
+                self.stdout.write(estilo(
+                    f"  {'✅' if aceptada else '❓'} {valor:<27} {propuesta:<22} {similitud:>9.2f} {distancia:>9} {registros:>9}  "
+                    + ', '.join(repr(crudo) for crudo in crudos[:3]) + (' …' if len(crudos) > 3 else '')
+                ))
+                if aceptada:
+                    propuestas.setdefault(campo, []).append((valor, propuesta))
+
+        self.stdout.write(
+            f'\n✅ = se corrige al limpiar (similitud >= {cleaner.UMBRAL_SIMILITUD}, '
+            f'al menos {cleaner.LONGITUD_MINIMA_DIFUSA} letras y pocas distintas); '
+            '❓ = queda sin corregir, revisar a mano'
+        )
+        diccionarios = {'departamento': 'estandarizacion_dept', 'evento': 'estandarizacion_eventos'}
+        for campo, pares in propuestas.items():
+            self.stdout.write(f'\n# Para agregar a {diccionarios[campo]}:')
+            for valor, propuesta in pares:
+                self.stdout.write(f'{valor!r}: {propuesta!r},')
@@ -0,0 +1,113 @@
+import contextvars
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .utils import metricas
+from .utils.tiempos import finalizar_medicion, iniciar_medicion
+
+logger = logging.getLogger('dashboard.tiempos')
+
+# Contador de consultas SQL del request actual. Se guarda en una ContextVar porque en
+# las vistas async el ORM corre en otro hilo (y con otra conexión) que el middleware.
+_consultas_request = contextvars.ContextVar('consultas_request', default=None)
+
+
+def _contar_consulta(execute, sql, params, many, context):
+    contador = _consultas_request.get()
+    if contador is not None:
+        contador[0] += 1
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def _instalar_contador_consultas(sender, connection, **kwargs):
+    connection.execute_wrappers.append(_contar_consulta)
+
+
+class MiddlewareSyncAsync:
+    """
+    Base para middlewares que funcionan tanto con WSGI como con ASGI: si el resto de la
+    cadena es async no obligan a Django a pasar el request a un hilo.
+    Las subclases implementan antes(request) y despues(request, response, estado).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        estado = self.antes(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finalizar(estado)
+        return self.despues(request, response, estado)
+
+    async def __acall__(self, request):
+        estado = self.antes(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.finalizar(estado)
+        return self.despues(request, response, estado)
+
+    def antes(self, request):
+        return None
+
+    def finalizar(self, estado):
+        pass
+
+    def despues(self, request, response, estado):
+        return response
+
+
+class ServerTimingMiddleware(MiddlewareSyncAsync):
+    """
+    Mide cada request por etapas (base de datos, limpieza, agregaciones, gráficos, plantilla),
+    agrega el encabezado Server-Timing y escribe una línea de log estructurada en JSON.
+    """
+
+    def antes(self, request):
+        return iniciar_medicion()
+
+    def finalizar(self, estado):
+        finalizar_medicion(estado[1])
+
+    def despues(self, request, response, estado):
+        medicion = estado[0]
+        response['Server-Timing'] = medicion.server_timing()
+        logger.info(json.dumps({
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            **medicion.como_dict(),
+        }, ensure_ascii=False))
+        return response
+
+
+class MetricasMiddleware(MiddlewareSyncAsync):
+    """Cuenta requests y consultas SQL por vista y vuelca las métricas del proceso a disco."""
+
+    def antes(self, request):
+        consultas = [0]
+        return consultas, _consultas_request.set(consultas)
+
+    def finalizar(self, estado):
+        _consultas_request.reset(estado[1])
+
+    def despues(self, request, response, estado):
+        vista = request.resolver_match.view_name if request.resolver_match else 'sin_ruta'
+        metricas.incrementar('dashboard_requests_total', vista=vista)
+        metricas.incrementar('dashboard_db_consultas_total', estado[0][0], vista=vista)
+        metricas.volcar()
+        return response
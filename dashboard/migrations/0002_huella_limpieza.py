@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asistenciahumanitaria',
+            name='huella',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='asistenciahumanitaria',
+            name='version_reglas',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_huella_limpieza'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Estado de los Datos',
+                'verbose_name_plural': 'Estado de los Datos',
+                'db_table': 'estado_datos',
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:33
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+CAMPOS_AYUDA = [
+    'kit_b', 'kit_a', 'chapa_fibrocemento', 'chapa_zinc', 'colchones',
+    'frazadas', 'terciadas', 'puntales', 'carpas_plasticas',
+]
+
+
+def crear_resumen(apps, schema_editor):
+    """Calcula el resumen inicial a partir de los registros existentes."""
+    AsistenciaHumanitaria = apps.get_model('dashboard', 'AsistenciaHumanitaria')
+    ResumenEstadisticas = apps.get_model('dashboard', 'ResumenEstadisticas')
+    valores = AsistenciaHumanitaria.objects.aggregate(
+        total_registros=Count('id'),
+        fecha_inicio=Min('fecha'),
+        fecha_fin=Max('fecha'),
+        **{f'total_{campo}': Coalesce(Sum(campo), 0) for campo in CAMPOS_AYUDA},
+    )
+    ResumenEstadisticas.objects.create(pk=1, **valores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_estado_datos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEstadisticas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_registros', models.BigIntegerField(default=0)),
+                ('fecha_inicio', models.DateField(blank=True, null=True)),
+                ('fecha_fin', models.DateField(blank=True, null=True)),
+                ('total_kit_b', models.BigIntegerField(default=0)),
+                ('total_kit_a', models.BigIntegerField(default=0)),
+                ('total_chapa_fibrocemento', models.BigIntegerField(default=0)),
+                ('total_chapa_zinc', models.BigIntegerField(default=0)),
+                ('total_colchones', models.BigIntegerField(default=0)),
+                ('total_frazadas', models.BigIntegerField(default=0)),
+                ('total_terciadas', models.BigIntegerField(default=0)),
+                ('total_puntales', models.BigIntegerField(default=0)),
+                ('total_carpas_plasticas', models.BigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Resumen de Estadísticas',
+                'verbose_name_plural': 'Resumen de Estadísticas',
+                'db_table': 'resumen_estadisticas',
+            },
+        ),
+        migrations.RunPython(crear_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# Columnas que busca /api/buscar/; en PostgreSQL `campo ILIKE '%texto%'` (lookup trgm_icontains) usa estos índices GIN
+CAMPOS_BUSQUEDA = ['localidad', 'distrito', 'departamento']
+
+
+def crear_indices(apps, schema_editor):
+    """Solo en PostgreSQL: en otras bases la búsqueda usa el índice de trigramas en memoria."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for campo in CAMPOS_BUSQUEDA:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS asistencia_{campo}_trgm '
+            f'ON asistencia_humanitaria USING gin ({campo} gin_trgm_ops)'
+        )
+
+
+def borrar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for campo in CAMPOS_BUSQUEDA:
+        schema_editor.execute(f'DROP INDEX IF EXISTS asistencia_{campo}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_resumen_estadisticas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
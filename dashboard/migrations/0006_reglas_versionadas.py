@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:43
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copiar_crudos(apps, schema_editor):
+    """Los registros existentes toman su valor actual como crudo (los ya limpiados, el valor limpio)."""
+    AsistenciaHumanitaria = apps.get_model('dashboard', 'AsistenciaHumanitaria')
+    AsistenciaHumanitaria.objects.update(departamento_crudo=F('departamento'), evento_crudo=F('evento'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_indices_trigramas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioParcial',
+            fields=[
+                ('version', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('ids', models.JSONField()),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Cambio Parcial',
+                'verbose_name_plural': 'Cambios Parciales',
+                'db_table': 'cambio_parcial',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReglasAplicadas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=20, unique=True)),
+                ('contenido', models.JSONField()),
+                ('aplicada', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Reglas Aplicadas',
+                'verbose_name_plural': 'Reglas Aplicadas',
+                'db_table': 'reglas_aplicadas',
+            },
+        ),
+        migrations.AddField(
+            model_name='asistenciahumanitaria',
+            name='departamento_crudo',
+            field=models.TextField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='asistenciahumanitaria',
+            name='evento_crudo',
+            field=models.TextField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(copiar_crudos, migrations.RunPython.noop),
+    ]
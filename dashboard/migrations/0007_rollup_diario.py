@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:52
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+CAMPOS_AYUDA = [
+    'kit_b', 'kit_a', 'chapa_fibrocemento', 'chapa_zinc', 'colchones',
+    'frazadas', 'terciadas', 'puntales', 'carpas_plasticas',
+]
+
+
+def crear_rollups(apps, schema_editor):
+    """Calcula los totales por día a partir de los registros existentes."""
+    AsistenciaHumanitaria = apps.get_model('dashboard', 'AsistenciaHumanitaria')
+    RollupDiario = apps.get_model('dashboard', 'RollupDiario')
+    filas = AsistenciaHumanitaria.objects.order_by().values('fecha').annotate(
+        registros=Count('id'), **{campo: Coalesce(Sum(campo), 0) for campo in CAMPOS_AYUDA},
+    )
+    RollupDiario.objects.bulk_create([RollupDiario(**fila) for fila in filas], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_reglas_versionadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupDiario',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('registros', models.BigIntegerField(default=0)),
+                ('kit_b', models.BigIntegerField(default=0)),
+                ('kit_a', models.BigIntegerField(default=0)),
+                ('chapa_fibrocemento', models.BigIntegerField(default=0)),
+                ('chapa_zinc', models.BigIntegerField(default=0)),
+                ('colchones', models.BigIntegerField(default=0)),
+                ('frazadas', models.BigIntegerField(default=0)),
+                ('terciadas', models.BigIntegerField(default=0)),
+                ('puntales', models.BigIntegerField(default=0)),
+                ('carpas_plasticas', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Rollup Diario',
+                'verbose_name_plural': 'Rollups Diarios',
+                'db_table': 'rollup_diario',
+            },
+        ),
+        migrations.RunPython(crear_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_rollup_diario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistenciahumanitaria',
+            index=models.Index(fields=['fecha'], name='asistencia_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_indice_fecha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoGrafico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('version_datos', models.CharField(max_length=200)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('imagen', models.TextField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Gráfico',
+                'verbose_name_plural': 'Trabajos de Gráficos',
+                'db_table': 'trabajo_grafico',
+                'indexes': [models.Index(fields=['estado', 'creado'], name='trabajo_grafico_estado_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='trabajografico',
+            constraint=models.UniqueConstraint(fields=('nombre', 'version_datos'), name='trabajo_grafico_unico'),
+        ),
+    ]
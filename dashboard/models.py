@@ -1,4 +1,177 @@
-from django.db import models
+import contextvars
+import datetime
+from contextlib import contextmanager
+
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Max, Min, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.lookups import IContains
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+CAMPOS_AYUDA = [
+    'kit_b', 'kit_a', 'chapa_fibrocemento', 'chapa_zinc', 'colchones',
+    'frazadas', 'terciadas', 'puntales', 'carpas_plasticas',
+]
+
+# Campos con reglas de limpieza; su valor original se conserva en <campo>_crudo
+CAMPOS_CRUDOS = ['departamento', 'evento']
+# Campos de la huella (DataCleaner.campos_huella): editarlos fuera de limpiar_datos borra la
+# huella, así la próxima limpieza encuentra el registro con el índice de huella IS NULL
+CAMPOS_HUELLA = ['fecha', 'localidad', 'distrito', 'departamento', 'evento'] + CAMPOS_AYUDA
+# Un cambio parcial con más registros que este límite no guarda los ids (las vistas recargan todo)
+MAX_IDS_CAMBIO_PARCIAL = 100000
+# Cantidad de cambios parciales que se conservan
+CAMBIOS_PARCIALES_GUARDADOS = 50
+
+# Dentro de cambios_en_bloque() los cambios se acumulan y se aplican una sola vez al final
+_cambios_pendientes = contextvars.ContextVar('cambios_pendientes', default=None)
+
+
+@models.TextField.register_lookup
+class ContieneTrigramas(IContains):
+    """
+    `campo__trgm_icontains`: como icontains, pero en PostgreSQL genera `campo ILIKE '%valor%'`
+    sobre la columna tal cual, que es lo que resuelven los índices GIN de pg_trgm (migración
+    0005); icontains genera UPPER(campo::text) LIKE ..., que no los usa. En otras bases es icontains.
+    """
+    lookup_name = 'trgm_icontains'
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs_sql} ILIKE {rhs_sql}', (*lhs_params, *rhs_params)
+
+
+def _como_fecha(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        return datetime.date.fromisoformat(valor)
+    return valor
+
+
+class DeltaResumen:
+    """Cambio en los totales de ResumenEstadisticas producido por altas, bajas o modificaciones."""
+
+    def __init__(self):
+        self.registros = 0
+        self.sumas = dict.fromkeys(CAMPOS_AYUDA, 0)
+        # Fechas agregadas (amplían el rango) y quitadas (si eran un extremo, hay que recalcularlo)
+        self.fecha_min = self.fecha_max = None
+        self.quitada_min = self.quitada_max = None
+        self.recalcular = False
+        self.hubo_cambios = False
+        # fecha -> [registros, sumas de CAMPOS_AYUDA...], para RollupDiario
+        self.dias = {}
+
+    def _sumar_dia(self, fecha, valores):
+        dia = self.dias.setdefault(fecha, [0] * (len(CAMPOS_AYUDA) + 1))
+        for posicion, valor in enumerate(valores):
+            dia[posicion] += valor
+
+    @staticmethod
+    def _extremos(actual_min, actual_max, fecha_min, fecha_max):
+        if fecha_min is None:
+            return actual_min, actual_max
+        if actual_min is None:
+            return fecha_min, fecha_max
+        return min(actual_min, fecha_min), max(actual_max, fecha_max)
+
+    def agregar(self, valores, signo=1):
+        """Suma (signo=1) o resta (signo=-1) un registro dado como dict de valores."""
+        self.registros += signo
+        for campo in CAMPOS_AYUDA:
+            self.sumas[campo] += signo * int(valores.get(campo) or 0)
+        fecha = _como_fecha(valores.get('fecha'))
+        if fecha is not None:
+            self._sumar_dia(fecha, [signo] + [signo * int(valores.get(campo) or 0) for campo in CAMPOS_AYUDA])
+        if signo > 0:
+            self.fecha_min, self.fecha_max = self._extremos(self.fecha_min, self.fecha_max, fecha, fecha)
+        else:
+            self.quitada_min, self.quitada_max = self._extremos(self.quitada_min, self.quitada_max, fecha, fecha)
+
+    def combinar(self, otro):
+        self.registros += otro.registros
+        for campo in CAMPOS_AYUDA:
+            self.sumas[campo] += otro.sumas[campo]
+        self.fecha_min, self.fecha_max = self._extremos(self.fecha_min, self.fecha_max, otro.fecha_min, otro.fecha_max)
+        self.quitada_min, self.quitada_max = self._extremos(
+            self.quitada_min, self.quitada_max, otro.quitada_min, otro.quitada_max
+        )
+        self.recalcular = self.recalcular or otro.recalcular
+        for fecha, valores in otro.dias.items():
+            self._sumar_dia(fecha, valores)
+
+
+def _registrar_cambio(delta):
+    """Aplica el cambio al resumen y sube la versión de los datos (o lo acumula si hay un bloque activo)."""
+    pendientes = _cambios_pendientes.get()
+    if pendientes is not None:
+        pendientes.combinar(delta)
+        EstadoDatos.registrar_cambio()
+        return
+    ResumenEstadisticas.aplicar(delta)
+    RollupDiario.aplicar(delta)
+    EstadoDatos.registrar_cambio()
+
+
+class AsistenciaHumanitariaQuerySet(models.QuerySet):
+    """
+    Mantiene ResumenEstadisticas y EstadoDatos también en las operaciones masivas, que no
+    envían señales. No se escucha post_delete para no desactivar el borrado rápido de Django.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        for obj in objs:
+            _completar_crudos(obj)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if objs:
+                delta = DeltaResumen()
+                for obj in objs:
+                    delta.agregar(vars(obj))
+                _registrar_cambio(delta)
+        return objs
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            # Lo que se va a borrar se resume por día con una agregación antes del DELETE
+            quitados = list(self.order_by().values('fecha').annotate(
+                registros=Count('id'), **{campo: Coalesce(Sum(campo), 0) for campo in CAMPOS_AYUDA},
+            ))
+            resultado = super().delete()
+            if quitados:
+                delta = DeltaResumen()
+                for dia in quitados:
+                    delta.registros -= dia['registros']
+                    for campo in CAMPOS_AYUDA:
+                        delta.sumas[campo] -= dia[campo]
+                    delta._sumar_dia(dia['fecha'], [-dia['registros']] + [-dia[campo] for campo in CAMPOS_AYUDA])
+                delta.quitada_min, delta.quitada_max = min(delta.dias), max(delta.dias)
+                _registrar_cambio(delta)
+        return resultado
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        if set(kwargs) & set(CAMPOS_HUELLA) and 'huella' not in kwargs:
+            kwargs['huella'] = None # Valores editados: limpiar_datos debe volver a limpiarlos
+        filas = super().update(**kwargs)
+        if filas:
+            delta = DeltaResumen()
+            # No se conocen los valores anteriores: si cambian ayudas o fechas se recalculan el resumen y los rollups
+            delta.recalcular = bool(set(kwargs) & set(CAMPOS_AYUDA + ['fecha']))
+            _registrar_cambio(delta)
+        return filas
+
+    update.alters_data = True
+
 
 class AsistenciaHumanitaria(models.Model):
     fecha = models.DateField()
@@ -15,15 +188,43 @@ class AsistenciaHumanitaria(models.Model):
     terciadas = models.IntegerField(default=0)
     puntales = models.IntegerField(default=0)
     carpas_plasticas = models.IntegerField(default=0)
+    # Huella de los valores tal como quedaron tras la última limpieza (ver limpiar_datos)
+    huella = models.CharField(max_length=40, null=True, blank=True, editable=False, db_index=True)
+    version_reglas = models.CharField(max_length=20, null=True, blank=True, editable=False)
+    # Valores antes de limpiar: índice valor crudo -> registros, para re-limpiar solo los
+    # afectados cuando cambia una regla (ver limpiar_datos y dashboard/utils/reglas.py)
+    departamento_crudo = models.TextField(null=True, blank=True, editable=False, db_index=True)
+    evento_crudo = models.TextField(null=True, blank=True, editable=False, db_index=True)
+
+    objects = AsistenciaHumanitariaQuerySet.as_manager()
 
     class Meta:
         db_table = 'asistencia_humanitaria'
+        # Filtros y orden por fecha (últimos registros, exportación por rango, filtro por año);
+        # con la tabla particionada (particionar_tabla) se crea uno por partición
+        indexes = [models.Index(fields=['fecha'], name='asistencia_fecha_idx')]
         verbose_name = 'Asistencia Humanitaria'
         verbose_name_plural = 'Asistencias Humanitarias'
 
     def __str__(self):
         return f"{self.localidad} - {self.fecha}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Valores guardados, para calcular la diferencia en el resumen al modificar o borrar
+        instancia._valores_guardados = dict(zip(field_names, values))
+        return instancia
+
+    def delete(self, *args, **kwargs):
+        valores = getattr(self, '_valores_guardados', None) or vars(self)
+        with transaction.atomic():
+            resultado = super().delete(*args, **kwargs)
+            delta = DeltaResumen()
+            delta.agregar(valores, signo=-1)
+            _registrar_cambio(delta)
+        return resultado
+
     @property
     def total_ayudas(self):
         """Calcula el total de todas las ayudas"""
@@ -33,23 +234,414 @@ class AsistenciaHumanitaria(models.Model):
 
     @classmethod
     def obtener_estadisticas_generales(cls):
-        """Obtiene estadísticas generales de la base de datos"""
-        from django.db.models import Sum, Count, Min, Max
-        
-        stats = cls.objects.aggregate(
-            total_registros=Count('id'),
-            fecha_inicio=Min('fecha'),
-            fecha_fin=Max('fecha'),
-            total_kit_a=Sum('kit_a'),
-            total_kit_b=Sum('kit_b'),
-            total_ayudas=Sum('kit_a') + Sum('kit_b') + Sum('chapa_fibrocemento') + 
-                         Sum('chapa_zinc') + Sum('colchones') + Sum('frazadas') + 
-                         Sum('terciadas') + Sum('puntales') + Sum('carpas_plasticas')
-        )
-        
+        """Obtiene estadísticas generales desde ResumenEstadisticas (una lectura por clave primaria)"""
+        stats = ResumenEstadisticas.obtener()
+        stats['total_ayudas'] = sum(stats[f'total_{campo}'] for campo in CAMPOS_AYUDA)
         return stats
 
     @classmethod
     def verificar_datos_disponibles(cls):
         """Verifica si hay datos disponibles en la base"""
         return cls.objects.exists()
+
+
+class EstadoDatos(models.Model):
+    """
+    Contador de cambios de AsistenciaHumanitaria (una sola fila, pk=1).
+    Junto con la cantidad de registros y la fecha máxima (de ResumenEstadisticas) y el
+    id máximo forma la versión de los datos que usan las vistas para ETag / Last-Modified.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    actualizado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'estado_datos'
+        verbose_name = 'Estado de los Datos'
+        verbose_name_plural = 'Estado de los Datos'
+
+    def __str__(self):
+        return f"Versión {self.version} ({self.actualizado})"
+
+    @classmethod
+    def registrar_cambio(cls):
+        """Incrementa el contador (dentro de cambios_en_bloque() se incrementa una vez al final)."""
+        pendientes = _cambios_pendientes.get()
+        if pendientes is not None:
+            pendientes.hubo_cambios = True
+            return
+        actualizados = cls.objects.filter(pk=1).update(version=F('version') + 1, actualizado=timezone.now())
+        if not actualizados:
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
+
+    @classmethod
+    def version_actual(cls):
+        """Retorna {'etag', 'version', 'actualizado'} con la versión actual de los datos (1 consulta, sin recorrer la tabla)."""
+        estado = cls.objects.filter(pk=1)
+        fila = ResumenEstadisticas.objects.filter(pk=1).values(
+            'total_registros', 'fecha_fin',
+            version=Subquery(estado.values('version')[:1]),
+            estado_actualizado=Subquery(estado.values('actualizado')[:1]),
+            max_id=Subquery(AsistenciaHumanitaria.objects.order_by('-id').values('id')[:1]),
+        ).first()
+        if fila is None:
+            return {'etag': 'sin-resumen', 'version': None, 'actualizado': None}
+        return {
+            'etag': f"{fila['version'] or 0}-{fila['total_registros']}-{fila['max_id']}-{fila['fecha_fin']}",
+            'version': fila['version'] or 0,
+            'actualizado': fila['estado_actualizado'],
+        }
+
+
+class ReglasAplicadas(models.Model):
+    """Copia de cada versión de reglas_limpieza.json aplicada por limpiar_datos."""
+    version = models.CharField(max_length=20, unique=True)
+    contenido = models.JSONField()
+    aplicada = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'reglas_aplicadas'
+        verbose_name = 'Reglas Aplicadas'
+        verbose_name_plural = 'Reglas Aplicadas'
+
+    def __str__(self):
+        return f"Reglas v{self.version} ({self.aplicada})"
+
+
+class CambioParcial(models.Model):
+    """
+    Registros que cambiaron en una versión de los datos (EstadoDatos.version). Si todas las
+    versiones desde la última que vio una vista son parciales, la vista vuelve a leer y
+    limpiar solo esos registros en lugar de todo el DataFrame.
+    """
+    version = models.PositiveBigIntegerField(primary_key=True)
+    ids = models.JSONField()
+    creado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'cambio_parcial'
+        verbose_name = 'Cambio Parcial'
+        verbose_name_plural = 'Cambios Parciales'
+
+    def __str__(self):
+        return f"Versión {self.version}: {len(self.ids)} registros"
+
+    @classmethod
+    def registrar(cls, ids):
+        """
+        Asocia `ids` a la versión actual. Llamar dentro de la misma transacción que subió la
+        versión (la fila de EstadoDatos queda bloqueada hasta el commit).
+        """
+        ids = sorted(set(int(id_) for id_ in ids))
+        if len(ids) > MAX_IDS_CAMBIO_PARCIAL:
+            return
+        version = EstadoDatos.objects.select_for_update().filter(pk=1).values_list('version', flat=True).first()
+        if version is None:
+            return
+        cls.objects.update_or_create(version=version, defaults={'ids': ids})
+        cls.objects.filter(version__lte=version - CAMBIOS_PARCIALES_GUARDADOS).delete()
+
+    @classmethod
+    def ids_entre(cls, desde, hasta):
+        """
+        Ids cambiados en las versiones (desde, hasta], o None si alguna de ellas no fue un
+        cambio parcial registrado.
+        """
+        cambios = list(cls.objects.filter(version__gt=desde, version__lte=hasta).values_list('ids', flat=True))
+        if len(cambios) != hasta - desde:
+            return None
+        return sorted({id_ for ids in cambios for id_ in ids})
+
+
+class ResumenEstadisticas(models.Model):
+    """
+    Totales de AsistenciaHumanitaria (una sola fila, pk=1) mantenidos en cada alta, cambio
+    y baja, para responder las estadísticas generales sin recorrer la tabla.
+    El comando reconciliar_resumen lo compara con un recálculo completo.
+    """
+    total_registros = models.BigIntegerField(default=0)
+    fecha_inicio = models.DateField(null=True, blank=True)
+    fecha_fin = models.DateField(null=True, blank=True)
+    total_kit_b = models.BigIntegerField(default=0)
+    total_kit_a = models.BigIntegerField(default=0)
+    total_chapa_fibrocemento = models.BigIntegerField(default=0)
+    total_chapa_zinc = models.BigIntegerField(default=0)
+    total_colchones = models.BigIntegerField(default=0)
+    total_frazadas = models.BigIntegerField(default=0)
+    total_terciadas = models.BigIntegerField(default=0)
+    total_puntales = models.BigIntegerField(default=0)
+    total_carpas_plasticas = models.BigIntegerField(default=0)
+    actualizado = models.DateTimeField(default=timezone.now)
+
+    CAMPOS = ['total_registros', 'fecha_inicio', 'fecha_fin'] + [f'total_{campo}' for campo in CAMPOS_AYUDA]
+
+    class Meta:
+        db_table = 'resumen_estadisticas'
+        verbose_name = 'Resumen de Estadísticas'
+        verbose_name_plural = 'Resumen de Estadísticas'
+
+    def __str__(self):
+        return f"{self.total_registros} registros ({self.fecha_inicio} a {self.fecha_fin})"
+
+    @classmethod
+    def calcular_desde_tabla(cls):
+        """Recorre AsistenciaHumanitaria completa y retorna los valores que debería tener el resumen."""
+        return AsistenciaHumanitaria.objects.aggregate(
+            total_registros=Count('id'),
+            fecha_inicio=Min('fecha'),
+            fecha_fin=Max('fecha'),
+            **{f'total_{campo}': Coalesce(Sum(campo), 0) for campo in CAMPOS_AYUDA},
+        )
+
+    @classmethod
+    def recalcular(cls):
+        valores = cls.calcular_desde_tabla()
+        cls.objects.update_or_create(pk=1, defaults={**valores, 'actualizado': timezone.now()})
+        return valores
+
+    @classmethod
+    def obtener(cls):
+        """Valores actuales del resumen; si la fila no existe todavía se calcula y se crea."""
+        fila = cls.objects.filter(pk=1).values(*cls.CAMPOS).first()
+        return fila if fila is not None else cls.recalcular()
+
+    @classmethod
+    def aplicar(cls, delta):
+        """Aplica un DeltaResumen con incrementos atómicos (F) sobre la fila del resumen."""
+        if delta.recalcular:
+            cls.recalcular()
+            return
+
+        cambios = {
+            'total_registros': F('total_registros') + delta.registros,
+            'actualizado': timezone.now(),
+            **{f'total_{campo}': F(f'total_{campo}') + valor for campo, valor in delta.sumas.items()},
+        }
+        if delta.fecha_min is not None:
+            fecha_min = Value(delta.fecha_min, output_field=models.DateField())
+            fecha_max = Value(delta.fecha_max, output_field=models.DateField())
+            cambios['fecha_inicio'] = Least(Coalesce('fecha_inicio', fecha_min), fecha_min)
+            cambios['fecha_fin'] = Greatest(Coalesce('fecha_fin', fecha_max), fecha_max)
+        if not cls.objects.filter(pk=1).update(**cambios):
+            cls.recalcular() # Primera vez: el recálculo ya incluye este cambio
+            return
+
+        # Si se quitó una fecha que era extremo del rango, el nuevo extremo sale de la tabla
+        if delta.quitada_min is not None:
+            rango = cls.objects.filter(pk=1).values('fecha_inicio', 'fecha_fin').first()
+            if (rango['fecha_inicio'] is None or delta.quitada_min <= rango['fecha_inicio']
+                    or delta.quitada_max >= rango['fecha_fin']):
+                cls.objects.filter(pk=1).update(**AsistenciaHumanitaria.objects.aggregate(
+                    fecha_inicio=Min('fecha'), fecha_fin=Max('fecha')
+                ))
+
+
+class RollupDiario(models.Model):
+    """
+    Totales de AsistenciaHumanitaria por día, mantenidos en cada alta, cambio y baja junto
+    con ResumenEstadisticas. Los niveles mensual y anual se derivan de esta tabla, que tiene
+    una fila por día con datos en lugar de una por registro.
+    """
+    fecha = models.DateField(primary_key=True)
+    registros = models.BigIntegerField(default=0)
+    kit_b = models.BigIntegerField(default=0)
+    kit_a = models.BigIntegerField(default=0)
+    chapa_fibrocemento = models.BigIntegerField(default=0)
+    chapa_zinc = models.BigIntegerField(default=0)
+    colchones = models.BigIntegerField(default=0)
+    frazadas = models.BigIntegerField(default=0)
+    terciadas = models.BigIntegerField(default=0)
+    puntales = models.BigIntegerField(default=0)
+    carpas_plasticas = models.BigIntegerField(default=0)
+
+    CAMPOS = ['registros'] + CAMPOS_AYUDA
+
+    class Meta:
+        db_table = 'rollup_diario'
+        verbose_name = 'Rollup Diario'
+        verbose_name_plural = 'Rollups Diarios'
+
+    def __str__(self):
+        return f"{self.fecha}: {self.registros} registros"
+
+    @classmethod
+    def calcular_desde_tabla(cls):
+        """Recorre AsistenciaHumanitaria completa y retorna {fecha: {campo: total}}."""
+        filas = AsistenciaHumanitaria.objects.order_by().values('fecha').annotate(
+            registros=Count('id'), **{campo: Coalesce(Sum(campo), 0) for campo in CAMPOS_AYUDA},
+        )
+        return {fila.pop('fecha'): fila for fila in filas}
+
+    @classmethod
+    def recalcular(cls):
+        dias = cls.calcular_desde_tabla()
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create([cls(fecha=fecha, **valores) for fecha, valores in dias.items()], batch_size=1000)
+        return dias
+
+    @classmethod
+    def aplicar(cls, delta):
+        """
+        Suma los totales por día del DeltaResumen con un solo INSERT ... ON CONFLICT que
+        incrementa las filas existentes (PostgreSQL y SQLite), seguro con escrituras concurrentes.
+        """
+        if delta.recalcular:
+            cls.recalcular()
+            return
+        if not delta.dias:
+            return
+
+        tabla = connection.ops.quote_name(cls._meta.db_table)
+        columnas = ', '.join(connection.ops.quote_name(campo) for campo in cls.CAMPOS)
+        incrementos = ', '.join(
+            f'{connection.ops.quote_name(campo)} = {tabla}.{connection.ops.quote_name(campo)} + EXCLUDED.{connection.ops.quote_name(campo)}'
+            for campo in cls.CAMPOS
+        )
+        marcadores = ', '.join(['%s'] * (len(cls.CAMPOS) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {tabla} (fecha, {columnas}) VALUES ({marcadores}) '
+                f'ON CONFLICT (fecha) DO UPDATE SET {incrementos}',
+                [[connection.ops.adapt_datefield_value(fecha)] + valores for fecha, valores in sorted(delta.dias.items())],
+            )
+        # Días que quedaron sin registros tras bajas o cambios de fecha
+        if any(valores[0] < 0 for valores in delta.dias.values()):
+            cls.objects.filter(registros__lte=0).delete()
+
+
+class TrabajoGrafico(models.Model):
+    """
+    Cola de gráficos a generar en segundo plano (comando procesar_graficos), uno por nombre
+    y versión de los datos. Con DASHBOARD_GRAFICOS_EN_SEGUNDO_PLANO las páginas encolan los
+    gráficos que faltan y responden enseguida; el navegador consulta /api/grafico/ hasta que
+    el worker deja la imagen aquí.
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    LISTO = 'listo'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (LISTO, 'Listo'),
+        (ERROR, 'Error'),
+    ]
+
+    nombre = models.CharField(max_length=100)
+    version_datos = models.CharField(max_length=200)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    imagen = models.TextField(null=True, blank=True) # PNG en base64; None si el gráfico no tiene datos
+    error = models.TextField(blank=True, default='')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    creado = models.DateTimeField(default=timezone.now)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'trabajo_grafico'
+        verbose_name = 'Trabajo de Gráfico'
+        verbose_name_plural = 'Trabajos de Gráficos'
+        constraints = [models.UniqueConstraint(fields=['nombre', 'version_datos'], name='trabajo_grafico_unico')]
+        indexes = [models.Index(fields=['estado', 'creado'], name='trabajo_grafico_estado_idx')]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.estado})"
+
+    @classmethod
+    def encolar(cls, nombres, version_datos):
+        """Agrega los trabajos que falten; si otro proceso ya los encoló, no hace nada."""
+        cls.objects.bulk_create(
+            [cls(nombre=nombre, version_datos=version_datos) for nombre in nombres],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def tomar_siguiente(cls, version_datos):
+        """
+        Marca como en proceso el trabajo pendiente más antiguo de la versión y lo retorna, o
+        None si no hay. El UPDATE condicionado al estado evita que dos workers tomen el mismo.
+        """
+        while True:
+            trabajo = cls.objects.filter(estado=cls.PENDIENTE, version_datos=version_datos).order_by('creado', 'id').first()
+            if trabajo is None:
+                return None
+            ahora = timezone.now()
+            tomados = cls.objects.filter(pk=trabajo.pk, estado=cls.PENDIENTE).update(
+                estado=cls.EN_PROCESO, iniciado=ahora, intentos=F('intentos') + 1,
+            )
+            if tomados:
+                trabajo.estado, trabajo.iniciado, trabajo.intentos = cls.EN_PROCESO, ahora, trabajo.intentos + 1
+                return trabajo
+
+    def terminar(self, imagen=None, error=None, reintentar=False):
+        """Guarda el resultado; con error y `reintentar` el trabajo vuelve a quedar pendiente."""
+        if error is None:
+            self.estado, self.imagen, self.error = self.LISTO, imagen, ''
+        else:
+            self.estado, self.error = (self.PENDIENTE if reintentar else self.ERROR), error
+        self.terminado = timezone.now()
+        self.save(update_fields=['estado', 'imagen', 'error', 'terminado'])
+
+
+@contextmanager
+def cambios_en_bloque():
+    """Agrupa los cambios de un proceso masivo: el resumen y el contador se actualizan una vez al final."""
+    pendientes = DeltaResumen()
+    token = _cambios_pendientes.set(pendientes)
+    try:
+        yield
+    finally:
+        _cambios_pendientes.reset(token)
+        if pendientes.hubo_cambios:
+            _registrar_cambio(pendientes)
+
+
+def _completar_crudos(instance):
+    """
+    Un valor que no viene de la limpieza (alta nueva o edición a mano) es el nuevo valor crudo,
+    y una edición de los campos de la huella la borra para que limpiar_datos vuelva a limpiar
+    el registro. limpiar_datos marca sus instancias con _limpieza para conservar el crudo original.
+    """
+    if getattr(instance, '_limpieza', False):
+        return
+    anteriores = getattr(instance, '_valores_guardados', None) or {}
+    for campo in CAMPOS_CRUDOS:
+        valor = getattr(instance, campo)
+        if getattr(instance, f'{campo}_crudo') is None or valor != anteriores.get(campo, valor):
+            setattr(instance, f'{campo}_crudo', valor)
+    if instance.pk is not None and _cambio_huella(instance, anteriores):
+        instance.huella = None
+
+
+def _cambio_huella(instance, anteriores):
+    """Si cambió algún campo de la huella; sin los valores guardados (instancia armada a mano) se asume que sí."""
+    if not set(CAMPOS_HUELLA) <= set(anteriores):
+        return True
+    for campo in CAMPOS_HUELLA:
+        actual, anterior = getattr(instance, campo), anteriores[campo]
+        if campo == 'fecha':
+            actual, anterior = _como_fecha(actual), _como_fecha(anterior)
+        if actual != anterior:
+            return True
+    return False
+
+
+@receiver(pre_save, sender=AsistenciaHumanitaria)
+def _guardar_crudos(sender, instance, **kwargs):
+    _completar_crudos(instance)
+
+
+@receiver(post_save, sender=AsistenciaHumanitaria)
+def _registrar_guardado(sender, instance, created, **kwargs):
+    delta = DeltaResumen()
+    anteriores = getattr(instance, '_valores_guardados', None) or {}
+    if not created:
+        if set(CAMPOS_AYUDA + ['fecha']) <= set(anteriores):
+            delta.agregar(anteriores, signo=-1)
+        else:
+            delta.recalcular = True # Instancia armada a mano o con campos diferidos: no se conocen los valores anteriores
+    delta.agregar(vars(instance))
+    if not created and _como_fecha(anteriores.get('fecha')) == _como_fecha(instance.fecha):
+        delta.quitada_min = delta.quitada_max = None # La fecha no cambió: el rango sigue igual
+    instance._valores_guardados = {campo.attname: getattr(instance, campo.attname) for campo in instance._meta.concrete_fields}
+    _registrar_cambio(delta)
@@ -10,4 +10,10 @@ urlpatterns = [
     path('eventos/', views.analisis_eventos_view, name='eventos'),
     path('api/datos-tabla/', views.datos_tabla_view, name='datos_tabla'),
     path('api/datos-mapa/', views.datos_mapa_view, name='datos_mapa'),
+    path('api/datos-mapa/detalle/', views.datos_mapa_detalle_view, name='datos_mapa_detalle'),
+    path('api/buscar/', views.buscar_view, name='buscar'),
+    path('api/totales/', views.totales_view, name='totales'),
+    path('api/grafico/', views.grafico_view, name='grafico'),
+    path('api/exportar/', views.exportar_datos_view, name='exportar'),
+    path('metrics', views.metricas_view, name='metricas'),
 ]
@@ -0,0 +1,127 @@
+"""
+Motores para las agregaciones de las vistas (geográfica, temporal, eventos y mapa).
+El motor se elige con settings.DASHBOARD_MOTOR_ANALITICO: 'pandas' (por defecto)
+agrupa el DataFrame limpio en memoria; 'duckdb' copia el DataFrame a una base DuckDB
+embebida y resuelve las agregaciones con SQL en varios hilos.
+Ambos motores devuelven exactamente el mismo DataFrame (ver scripts/comparar_motores.py).
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from dashboard.utils.data_cleaner import DataCleaner
+
+CAMPOS_AYUDA = DataCleaner().aid_fields
+
+# Claves que no son columnas del DataFrame sino que se derivan de 'fecha'
+CLAVES_FECHA = {'ano': 'year', 'mes': 'month'}
+
+
+def _columnas_resultado(claves):
+    return list(claves) + ['total_registros'] + [f'total_{campo}' for campo in CAMPOS_AYUDA] + ['total_ayudas']
+
+
+class MotorPandas:
+    """Agrupa el DataFrame limpio con pandas (un solo hilo)."""
+
+    nombre = 'pandas'
+
+    def agregar(self, df, claves):
+        """
+        Cuenta registros y suma cada ayuda por las `claves` indicadas.
+        Retorna un DataFrame ordenado por las claves, sin grupos con claves nulas.
+        """
+        if any(clave in CLAVES_FECHA for clave in claves):
+            df = df.dropna(subset=['fecha'])
+            df = df.assign(**{
+                clave: getattr(df['fecha'].dt, CLAVES_FECHA[clave])
+                for clave in claves if clave in CLAVES_FECHA
+            })
+
+        resultado = df.groupby(list(claves)).agg(
+            total_registros=('id', 'count'),
+            **{f'total_{campo}': (campo, 'sum') for campo in CAMPOS_AYUDA},
+        ).reset_index()
+        resultado['total_ayudas'] = resultado[[f'total_{campo}' for campo in CAMPOS_AYUDA]].sum(axis=1)
+        return resultado[_columnas_resultado(claves)]
+
+
+class MotorDuckDB:
+    """
+    Carga el DataFrame limpio en una tabla DuckDB en memoria y agrega con SQL.
+    La tabla se vuelve a cargar solo cuando cambia el DataFrame (al refrescarse la caché).
+    """
+
+    nombre = 'duckdb'
+
+    def __init__(self):
+        try:
+            import duckdb # type: ignore
+        except ImportError as exc:
+            raise ImproperlyConfigured(
+                "DASHBOARD_MOTOR_ANALITICO='duckdb' requiere el paquete duckdb (pip install duckdb)"
+            ) from exc
+        self.conexion = duckdb.connect(':memory:')
+        self.lock = threading.Lock()
+        self.df_cargado = None
+
+    def _cargar(self, df):
+        if self.df_cargado is df:
+            return
+        columnas = ['id', 'fecha', 'departamento', 'distrito', 'localidad', 'evento'] + CAMPOS_AYUDA
+        self.conexion.register('df_limpio', df[columnas])
+        self.conexion.execute('CREATE OR REPLACE TABLE asistencias AS SELECT * FROM df_limpio')
+        self.conexion.unregister('df_limpio')
+        self.df_cargado = df
+
+    def agregar(self, df, claves):
+        """Equivalente en SQL de MotorPandas.agregar."""
+        expresiones = [
+            f'CAST({CLAVES_FECHA[clave]}(fecha) AS INTEGER) AS {clave}' if clave in CLAVES_FECHA else clave
+            for clave in claves
+        ]
+        condiciones = ['fecha IS NOT NULL' if clave in CLAVES_FECHA else f'{clave} IS NOT NULL' for clave in claves]
+        sumas = [f'CAST(SUM({campo}) AS BIGINT) AS total_{campo}' for campo in CAMPOS_AYUDA]
+        total_ayudas = ' + '.join(f'COALESCE(SUM({campo}), 0)' for campo in CAMPOS_AYUDA)
+        posiciones = ', '.join(str(i + 1) for i in range(len(claves)))
+        sql = (
+            f"SELECT {', '.join(expresiones)}, COUNT(id) AS total_registros, {', '.join(sumas)}, "
+            f"CAST({total_ayudas} AS BIGINT) AS total_ayudas "
+            f"FROM asistencias WHERE {' AND '.join(condiciones)} "
+            f"GROUP BY {posiciones}"
+        )
+
+        with self.lock:
+            self._cargar(df)
+            resultado = self.conexion.execute(sql).df()
+
+        # Mismos tipos que produce pandas: claves como en el DataFrame de origen, conteos int64
+        for clave in claves:
+            tipo = 'int32' if clave in CLAVES_FECHA else df[clave].dtype
+            resultado[clave] = resultado[clave].astype(tipo)
+        resultado['total_registros'] = resultado['total_registros'].astype('int64')
+        # Se ordena en pandas: el ORDER BY de DuckDB no compara los textos igual (p. ej. la Ñ)
+        resultado = resultado.sort_values(list(claves), ignore_index=True)
+        return resultado[_columnas_resultado(claves)]
+
+
+MOTORES = {
+    'pandas': MotorPandas,
+    'duckdb': MotorDuckDB,
+}
+
+_motores = {}
+
+
+def obtener_motor():
+    """Retorna (y reutiliza) la instancia del motor configurado en settings."""
+    nombre = getattr(settings, 'DASHBOARD_MOTOR_ANALITICO', 'pandas')
+    if nombre not in MOTORES:
+        raise ImproperlyConfigured(
+            f"DASHBOARD_MOTOR_ANALITICO='{nombre}' no es válido; opciones: {', '.join(MOTORES)}"
+        )
+    if nombre not in _motores:
+        _motores[nombre] = MOTORES[nombre]()
+    return _motores[nombre]
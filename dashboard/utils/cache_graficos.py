@@ -0,0 +1,81 @@
+"""
+Caché en memoria de los gráficos generados (PNG en base64, varios MB cada uno a 300 dpi)
+con un presupuesto de bytes: al superarlo se descartan los gráficos usados hace más tiempo
+(LRU). Cada entrada guarda su tamaño, así el total se mantiene sin recorrer la caché.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+# Valor por defecto de obtener(): distingue "no está" de un gráfico guardado como None
+AUSENTE = object()
+
+
+def tamano(grafico):
+    """Bytes que ocupa el gráfico en memoria (un str base64, o None si no tiene datos)."""
+    return sys.getsizeof(grafico)
+
+
+class CacheGraficos:
+    """LRU de gráficos por nombre, limitada a `max_bytes`. Segura entre hilos."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict() # nombre -> (gráfico, bytes), del menos al más usado
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.desalojos = 0 # Gráficos descartados por falta de espacio desde que se creó
+        self.rechazos = 0 # Gráficos más grandes que todo el presupuesto (no se guardan)
+
+    def __contains__(self, nombre):
+        with self._lock:
+            return nombre in self._entradas
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entradas)
+
+    def obtener(self, nombre, defecto=AUSENTE):
+        """El gráfico guardado (y lo marca como el más reciente), o `defecto`."""
+        with self._lock:
+            entrada = self._entradas.get(nombre)
+            if entrada is None:
+                return defecto
+            self._entradas.move_to_end(nombre)
+            return entrada[0]
+
+    def guardar(self, nombre, grafico):
+        """Guarda el gráfico descartando los menos usados hasta entrar en el presupuesto. Retorna cuántos descartó."""
+        ocupa = tamano(grafico)
+        with self._lock:
+            anterior = self._entradas.pop(nombre, None)
+            if anterior is not None:
+                self.bytes -= anterior[1]
+            if ocupa > self.max_bytes:
+                self.rechazos += 1
+                return 0
+            desalojados = 0
+            while self._entradas and self.bytes + ocupa > self.max_bytes:
+                _, (_, liberados) = self._entradas.popitem(last=False)
+                self.bytes -= liberados
+                desalojados += 1
+            self._entradas[nombre] = (grafico, ocupa)
+            self.bytes += ocupa
+            self.desalojos += desalojados
+            return desalojados
+
+    def conservar(self, nombres):
+        """Descarta todos los gráficos salvo los de `nombres` (p. ej. tras un cambio parcial de los datos)."""
+        with self._lock:
+            for nombre in [nombre for nombre in self._entradas if nombre not in nombres]:
+                self.bytes -= self._entradas.pop(nombre)[1]
+
+    def vaciar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.bytes = 0
+
+    def nombres(self):
+        with self._lock:
+            return list(self._entradas)
@@ -1,296 +1,81 @@
 import pandas as pd # type: ignore
 import numpy as np # type: ignore
-import re
+import hashlib
 from datetime import datetime
 
+from dashboard.utils.ngramas import IndiceDifuso, normalizar
+from dashboard.utils.reglas import cargar_reglas
+
 class DataCleaner:
-    def __init__(self):
+    # Una variante nueva de departamento o evento se corrige al canónico más parecido solo si
+    # tiene al menos LONGITUD_MINIMA_DIFUSA caracteres, una similitud (Jaccard de trigramas) de
+    # UMBRAL_SIMILITUD o más y difiere de la variante conocida en pocas letras (p. ej. 'PARAGUAY'
+    # no es 'PARAGUARÍ': tiene similitud suficiente pero 2 letras distintas en 9)
+    UMBRAL_SIMILITUD = 0.55
+    LONGITUD_MINIMA_DIFUSA = 5
+    DISTANCIA_RELATIVA_MAXIMA = 0.15
+
+    def __init__(self, reglas=None):
         self.aid_fields = [
             'kit_b', 'kit_a', 'chapa_fibrocemento', 'chapa_zinc',
             'colchones', 'frazadas', 'terciadas', 'puntales', 'carpas_plasticas'
         ]
-        self.evento_patterns = [
-            (r'ASISTENCIAS.*INUNDACION', 'INUNDACION'),
-            (r'ASISTENCIAS.*SEQUIA', 'SEQUIA'),
-            (r'COORDINACION.*REHABILITACION', 'INUNDACION'),
-            (r'TRABAJOS.*FAMILIAS AFECTADAS', 'INUNDACION'),
-            (r'EVENTO CLIMATICO', 'TEMPORAL'),
-            (r'OPERATIVO', 'OPERATIVO JAHO\'I'),
-        ]
-
-        # Mapeo de distritos a sus departamentos correspondientes
-        self.distrito_a_departamento = {
-            'ASUNCIÓN': 'CAPITAL',
-            'LIMPIO': 'CENTRAL',
-            'MARIANO ROQUE ALONSO': 'CENTRAL',
-            'ÑEMBY': 'CENTRAL',
-            'SAN LORENZO': 'CENTRAL',
-            'LAMBARÉ': 'CENTRAL',
-            'FERNANDO DE LA MORA': 'CENTRAL',
-            'VILLA ELISA': 'CENTRAL',
-            'SAN ANTONIO': 'CENTRAL',
-            'LUQUE': 'CENTRAL',
-            'CAPIATÁ': 'CENTRAL',
-            'ITAUGUÁ': 'CENTRAL',
-            'J. AUGUSTO SALDÍVAR': 'CENTRAL',
-            'VILLETA': 'CENTRAL',
-            'GUARAMBARÉ': 'CENTRAL',
-            'YPACARAÍ': 'CENTRAL',
-            'YPANÉ': 'CENTRAL',
-            'ITÁ': 'CENTRAL',
-            'SANTA ROSA': 'MISIONES',
-            'SAN JUAN BAUTISTA': 'MISIONES',
-            'VILLARRICA': 'GUAIRÁ',
-            'CORONEL OVIEDO': 'CAAGUAZÚ',
-            'CAACUPÉ': 'CORDILLERA',
-            'VILLARICA': 'GUAIRÁ',
-            'ITA': 'CENTRAL',
-        }
-
-        # Diccionario de estandarización de departamentos
-        self.estandarizacion_dept = {
-            # Ñeembucú
-            'ÑEEMBUCU': 'ÑEEMBUCÚ',
-            'ÑEEMBUCÙ': 'ÑEEMBUCÚ',
-            'ÑEMBUCU': 'ÑEEMBUCÚ',
-            'ÑEEMBUCU': 'ÑEEMBUCÚ',
-            'Ñeembucu': 'ÑEEMBUCÚ',
-
-            # Alto Paraná
-            'ALTO PARANA': 'ALTO PARANÁ',
-            'ALTO PARANÀ': 'ALTO PARANÁ',
-            'ALTO PNÀ': 'ALTO PARANÁ',
-            'ALTO PNÁ': 'ALTO PARANÁ',
-            'ALTO PY': 'ALTO PARANÁ',
-            'Alto Parana': 'ALTO PARANÁ',
-
-            # Boquerón
-            'BOQUERÒN': 'BOQUERON',
-            'BOQUERÓN': 'BOQUERON',
-            'Boqueron': 'BOQUERON',
-
-            # Caaguazú
-            'CAAGUAZU': 'CAAGUAZÚ',
-            'CAAGUAZÙ': 'CAAGUAZÚ',
-            'Caaguazu': 'CAAGUAZÚ',
-            'Caaguazú': 'CAAGUAZÚ',
-            'CAAG-CANIND': 'CAAGUAZÚ',
-            'CAAG/CANIN': 'CAAGUAZÚ',
-            'CAAG/CANIND.': 'CAAGUAZÚ',
-            'CAAGUAZU- ALTO PARANA': 'CAAGUAZÚ',
-            'CAAGUAZU/MISIONES': 'CAAGUAZÚ',
-            'Caaguazu - Canindeyu': 'CAAGUAZÚ',
-            'Caaguazu y Canindeyu': 'CAAGUAZÚ',
-            'Caaguazu, Canindeyu y San Pedro': 'CAAGUAZÚ',
-            'Caaguazu, San Pedro y Canindeyu': 'CAAGUAZÚ',
-            'Caaguazu-Guaira y San Pedro': 'CAAGUAZÚ',
-            'CAAGUAZU-GUAIRA': 'CAAGUAZÚ',
-            'CAAGUAZU - CANINDEYU': 'CAAGUAZÚ',
-            'CAAGUAZU Y CANINDEYU': 'CAAGUAZÚ',
-            'CAAGUAZU, CANINDEYU Y SAN PEDRO': 'CAAGUAZÚ',
-            'CAAGUAZU, SAN PEDRO Y CANINDEYU': 'CAAGUAZÚ',
-            'CAAGUAZU-GUAIRA Y SAN PEDRO': 'CAAGUAZÚ',
-
-
-            # Caazapá
-            'CAAZAPA': 'CAAZAPÁ',
-            'CAAZAPÀ': 'CAAZAPÁ',
-            'Caazapa': 'CAAZAPÁ',
-            'Caazapa - Guaira': 'CAAZAPÁ',
-            'CAAZAPA - GUAIRA': 'CAAZAPÁ',
-
-            # Canindeyú
-            'CANINDEYU': 'CANINDEYÚ',
-            'CANINDEYÙ': 'CANINDEYÚ',
-            'Canindeyu': 'CANINDEYÚ',
-            'Canindeyu - Caaguazu': 'CANINDEYÚ',
-            'Canindeyu y San Pedro': 'CANINDEYÚ',
-            'CANINDEYU - CAAGUAZU': 'CANINDEYÚ',
-            'CANINDEYU Y SAN PEDRO': 'CANINDEYÚ',
-
-            # Central
-            'CENT/CORDILL': 'CENTRAL',
-            'CENTR-CORD': 'CENTRAL',
-            'CENTRAL': 'CENTRAL',
-            'CENTRAL-CORDILLERA': 'CENTRAL',
-            'CENTRAL/CAP': 'CENTRAL',
-            'CENTRAL/CAPITAL': 'CENTRAL',
-            'CENTRAL/COR': 'CENTRAL',
-            'CENTRAL/CORD': 'CENTRAL',
-            'CENTRAL/CORD.': 'CENTRAL',
-            'CENTRAL/CORDILLER': 'CENTRAL',
-            'CENTRAL/CORDILLERA': 'CENTRAL',
-            'CENTRAL/PARAG.': 'CENTRAL',
-            'central': 'CENTRAL',
-
-            # Concepción
-            'CONCEPCION': 'CONCEPCIÓN',
-            'CONCEPCIÒN': 'CONCEPCIÓN',
-            'Concepcion': 'CONCEPCIÓN',
-
-            # Cordillera
-            'COORDILLERA': 'CORDILLERA',
-            'CORD./CENTRAL': 'CORDILLERA',
-            'CORD/S.PEDRO': 'CORDILLERA',
-            'CORDILLERA': 'CORDILLERA',
-            'CORDILLERA ARROYOS Y EST.': 'CORDILLERA',
-            'CORDILLERA Y SAN PEDRO': 'CORDILLERA',
-            'CORDILLERACAACUPÈ': 'CORDILLERA',
-            'Cordillera': 'CORDILLERA',
-            'CORDILLERA ARROYOS': 'CORDILLERA',
-
-            # Guairá
-            'GUAIRA': 'GUAIRÁ',
-            'GUAIRÀ': 'GUAIRÁ',
-            'GUIARA': 'GUAIRÁ',
-            'Guaira': 'GUAIRÁ',
-            'Guaira - Caazapa': 'GUAIRÁ',
-            'GUAIRA - CAAZAPA': 'GUAIRÁ',
-
-            # Itapúa
-            'ITAPUA': 'ITAPÚA',
-            'ITAPUA- CAAGUAZU': 'ITAPÚA',
-            'ITAPÙA': 'ITAPÚA',
-            'Itapua': 'ITAPÚA',
-
-            # Misiones
-            'MISIONES YABEBYRY': 'MISIONES',
-            'Misiones': 'MISIONES',
-
-            # Paraguarí
-            'PARAGUARI': 'PARAGUARÍ',
-            'PARAGUARI PARAGUARI': 'PARAGUARÍ',
-            'PARAGUARÌ': 'PARAGUARÍ',
-            'Paraguari': 'PARAGUARÍ',
-            'Paraguari -  Guaira': 'PARAGUARÍ',
-            'PARAGUARI - GUAIRA': 'PARAGUARÍ',
-
-            # Presidente Hayes
-            'PDTE HAYES': 'PDTE. HAYES',
-            'PDTE HAYES S.PIRI-4 DE MAYO': 'PDTE. HAYES',
-            'PDTE HYES': 'PDTE. HAYES',
-            'PDTE. HAYES': 'PDTE. HAYES',
-            'PTE HAYES': 'PDTE. HAYES',
-            'PTE. HAYES': 'PDTE. HAYES',
-            'Pdte Hayes': 'PDTE. HAYES',
-            'Pdte. Hayes': 'PDTE. HAYES',
-            'PDTE.HAYES': 'PDTE. HAYES',
-
-            # San Pedro
-            'S.PEDRO/CAN.': 'SAN PEDRO',
-            'SAN PEDRO': 'SAN PEDRO',
-            'SAN PEDRO-CAAGUAZU': 'SAN PEDRO',
-            'SAN PEDRO/ AMAMBAY': 'SAN PEDRO',
-            'SAN PEDRO/ CANINDEYU': 'SAN PEDRO',
-            'San Pedro': 'SAN PEDRO',
-            'San Pedro - Canindeyu': 'SAN PEDRO',
-            'SAN PEDRO - CANINDEYU': 'SAN PEDRO',
-
-            # Varios departamentos
-            'VARIOS DEP.': 'VARIOS DEPARTAMENTOS',
-            'VARIOS DPTOS.': 'VARIOS DEPARTAMENTOS',
-            'VARIOS DPTS.': 'VARIOS DEPARTAMENTOS',
-            'varios': 'VARIOS DEPARTAMENTOS',
-            'REGION ORIENTAL/ OCCIDENTAL': 'VARIOS DEPARTAMENTOS',
-            'VARIOS': 'VARIOS DEPARTAMENTOS',
-
-            # Otros
-            'ASOC MUSICO': 'VARIOS DEPARTAMENTOS',
-            'CNEL OVIEDO': 'CORONEL OVIEDO',  # Coronel Oviedo pertenece a Caaguazú
-            'ITA': 'ITA',  # Itá pertenece a Central
-            'ITAUGUA': 'ITAUGUÁ',  # Itauguá pertenece a Central
-            'VILLARICA': 'VILLARICA',  # Villarrica pertenece a Guairá
-            'ASUNCION': 'ASUNCIÓN',
-            'ASUNCIÓN': 'ASUNCIÓN',
-            'CAACUPÈ': 'CAACUPÉ',  # Caacupé pertenece a Cordillera
-            'CAACUPÉ': 'CAACUPÉ',
-            
-            # Departamentos estándar para completar
-            'ALTO PARAGUAY': 'ALTO PARAGUAY',
-            'AMAMBAY': 'AMAMBAY',
-            'CAPITAL': 'CAPITAL'
-        }
-
-        # Diccionario de estandarización de eventos actualizado según requerimientos
-        self.estandarizacion_eventos = {
-            # COVID y variantes
-            'ALB.COVID': 'COVID', 'ALBER.COVID': 'COVID', 'ALBERG.COVID': 'COVID',
-            'COVI 19 OLL.': 'COVID', 'COVID 19': 'COVID', 'COVI': 'COVID',
-            'VAC.ARATIRI': 'COVID', 'VACUNATORIO SND': 'COVID',
-            'APOY.INST.COVID 19': 'COVID', 'APOYO INSTITUCIONAL COVID': 'COVID',
-            'ÑANGARECO': 'COVID', 'ÑANGAREKO': 'COVID',
-
-            # INCENDIO
-            'INC.FORESTAL': 'INCENDIO', 'INCCENDIO': 'INCENDIO', 'INCEND': 'INCENDIO',
-            'INCEND. DOMIC.': 'INCENDIO', 'INCENDIO DOMICILIARIO': 'INCENDIO',
-            'DERRUMBE': 'INCENDIO', 'INCENDIO FORESTAL': 'INCENDIO',
-
-            # TEMPORAL
-            'EVENTO CLIMATICO': 'TEMPORAL', 'TEMPORAL CENTRAL': 'TEMPORAL',
-            'EVENTO CLIMATICO TEMPORAL': 'TEMPORAL', 'MUNICIPALIDAD': 'TEMPORAL',
-
-            # SEQUIA
-            'SEQ. E INUND.': 'SEQUIA', 'SEQ./INUND.': 'SEQUIA', 'SEQUIA-INUND.': 'SEQUIA',
-
-            # EXTREMA VULNERABILIDAD
-            'COMISION VECINAL': 'EXTREMA VULNERABILIDAD',
-            'AYUDA SOLIDARIA': 'EXTREMA VULNERABILIDAD',
-
-            # C.I.D.H.
-            'C I D H': 'C.I.D.H.',
-            'C.H.D.H': 'C.I.D.H.',
-            'C.I.D.H': 'C.I.D.H.',
-            'C.I.D.H.': 'C.I.D.H.',
-            'C.ID.H': 'C.I.D.H.',
-            'CIDH': 'C.I.D.H.',
-
-            # OPERATIVO JAHO'I
-            'OPERATIVO ÑEÑUA': "OPERATIVO JAHO'I",
-            'OPERATIVO ESPECIAL': "OPERATIVO JAHO'I",
-            'OP INVIERNO': "OPERATIVO JAHO'I", 'OP. INVIERNO': "OPERATIVO JAHO'I",
-            'OP. ÑEÑUA': "OPERATIVO JAHO'I", 'OP.INVIERNO': "OPERATIVO JAHO'I",
-            'OP.ÑEÑUA': "OPERATIVO JAHO'I", 'OPER. ÑEÑUA': "OPERATIVO JAHO'I",
-            'OPER.INVIERN': "OPERATIVO JAHO'I", 'OPER.INVIERNO': "OPERATIVO JAHO'I",
-            'OPERATIVO INV.': "OPERATIVO JAHO'I",
-
-            # INUNDACION
-            'INUNDAC.': 'INUNDACION', 'INUNDAIÓN S.': 'INUNDACION',
-            'INUNDACION SUBITA': 'INUNDACION', 'INUNDACION " DECLARACION DE EMERGENCIA"': 'INUNDACION',
-            'LNUNDACION': 'INUNDACION', 'INUNDACIÓN': 'INUNDACION',
-
-            # OLLA POPULAR
-            'OLLA P': 'OLLA POPULAR', 'OLLA P.': 'OLLA POPULAR', 'OLLA POP': 'OLLA POPULAR',
-            'OLLA POP.': 'OLLA POPULAR', 'OLLA POPILAR': 'OLLA POPULAR',
-            'OLLA POPOLAR': 'OLLA POPULAR', 'OLLA POPUL': 'OLLA POPULAR',
-            'OLLAP.': 'OLLA POPULAR', 'OLLA POPULAR COVID': 'OLLA POPULAR',
-
-            # OTROS
-            'INERAM': 'OTROS', 'INERAM(MINGA)': 'OTROS', 'MINGA': 'OTROS',
-            'INDERT': 'OTROS', 'INDI MBYA GUARANI': 'OTROS',
-            'NIÑEZ': 'OTROS', 'DGRR 027/22': 'OTROS', 'DGRR 028/22': 'OTROS',
-            'DONAC': 'OTROS', 'DONAC.': 'OTROS', 'DONACIÒN': 'OTROS',
-            'EDAN': 'OTROS', 'EVALUACION DE DAÑOS': 'OTROS',
-            'TRABAJO COMUNITARIO': 'OTROS', 'ASISTENCIA INSTITUCIONAL': 'OTROS',
-            'APOYO LOGISTICO': 'OTROS', 'APOYO INSTITUCIONAL': 'OTROS',
-            'APOY.LOG': 'OTROS', 'APOY LOG': 'OTROS',
-            'APOYO LOG.': 'OTROS', 'OTROS "TEMPORAL"': 'OTROS',
-            'APOYO LOGISTICO INDI': 'OTROS',
-
-            # PREPOSICIONAMIENTO (se eliminarán después)
-            'PREP.': 'PREPOSICIONAMIENTO', 'PREPOS': 'PREPOSICIONAMIENTO',
-            'PREPOS.': 'PREPOSICIONAMIENTO', 'PREPOSIC.': 'PREPOSICIONAMIENTO',
-            'PREPOSICION.': 'PREPOSICIONAMIENTO', 'PRE POSICIONAMIENTO': 'PREPOSICIONAMIENTO',
-            'P/ STOCK DEL COE': 'PREPOSICIONAMIENTO', 'REP.DE MATERIAL': 'PREPOSICIONAMIENTO',
-            'REPOSIC.MATER': 'PREPOSICIONAMIENTO', 'REPOSIC.MATER.': 'PREPOSICIONAMIENTO',
-            'PROVISION DE MATERIALES': 'PREPOSICIONAMIENTO', 'REABASTECIMIENTO': 'PREPOSICIONAMIENTO',
-            'REPARACION': 'PREPOSICIONAMIENTO', 'REPARACION DE BAÑADERA': 'PREPOSICIONAMIENTO',
-            'REPARACION DE OBRAS': 'PREPOSICIONAMIENTO', 'PRESTAMO': 'PREPOSICIONAMIENTO',
-            'REPOSICION': 'PREPOSICIONAMIENTO', 'REPOSICION DE MATERIALES': 'PREPOSICIONAMIENTO',
-            'TRASLADO INTERNO': 'PREPOSICIONAMIENTO', 'PREPOSICIONAMIENTO': 'PREPOSICIONAMIENTO',
-
-            # SIN EVENTO
-            'SIN_EVENTO': 'SIN EVENTO', 'DEVOLVIO': 'SIN EVENTO', 'REFUGIO SEN': 'SIN EVENTO',
-        }
+        # Campos que participan de la huella de un registro
+        self.campos_huella = ['fecha', 'localidad', 'distrito', 'departamento', 'evento'] + self.aid_fields
+        # Diccionarios y patrones (de reglas_limpieza.json): mapeo de distritos a departamentos,
+        # estandarización de departamentos y eventos, patrones y palabras clave de eventos
+        self.reglas = reglas or cargar_reglas()
+        self.version_reglas = self.reglas.version
+        self.evento_patterns = self.reglas.patrones_evento
+        self.palabras_clave_evento = self.reglas.palabras_clave_evento
+        self.distrito_a_departamento = self.reglas.distrito_a_departamento
+        self.estandarizacion_dept = self.reglas.estandarizacion_dept
+        self.estandarizacion_eventos = self.reglas.estandarizacion_eventos
+        # Departamentos válidos como resultado de la búsqueda aproximada
+        self.departamentos_canonicos = self.reglas.departamentos_canonicos
+
+        # Índices de trigramas (se arman al primer uso) y resoluciones ya calculadas:
+        # (tipo, valor) -> (canónico más parecido, similitud) o None
+        self._indices_difusos = {}
+        self.resoluciones_difusas = {}
+
+    def _indice_difuso(self, tipo):
+        if tipo not in self._indices_difusos:
+            if tipo == 'departamento':
+                variantes = {nombre: nombre for nombre in self.departamentos_canonicos}
+                variantes.update({
+                    variante: canonico for variante, canonico in self.estandarizacion_dept.items()
+                    if canonico in self.departamentos_canonicos
+                })
+            else:
+                variantes = {canonico: canonico for canonico in self.estandarizacion_eventos.values()}
+                variantes.update(self.estandarizacion_eventos)
+                # Sin PREPOSICIONAMIENTO: ese evento elimina el registro y no debe salir de una aproximación
+                variantes = {
+                    variante: canonico for variante, canonico in variantes.items()
+                    if canonico != 'PREPOSICIONAMIENTO'
+                }
+            self._indices_difusos[tipo] = IndiceDifuso(variantes)
+        return self._indices_difusos[tipo]
+
+    def resolver_difuso(self, tipo, valor):
+        """
+        Valor canónico más parecido a `valor` ('departamento' o 'evento'), o None si ninguno
+        es aceptable (ver resolucion_aceptada). Cada valor se resuelve una sola vez por instancia.
+        """
+        clave = (tipo, valor)
+        if clave not in self.resoluciones_difusas:
+            self.resoluciones_difusas[clave] = self._indice_difuso(tipo).mas_parecido(valor)
+        resolucion = self.resoluciones_difusas[clave]
+        return resolucion[0] if self.resolucion_aceptada(valor, resolucion) else None
+
+    def resolucion_aceptada(self, valor, resolucion):
+        """Si la resolución (canónico, similitud, distancia) de `valor` alcanza los umbrales de la clase."""
+        if resolucion is None or len(normalizar(valor)) < self.LONGITUD_MINIMA_DIFUSA:
+            return False
+        _, similitud, distancia = resolucion
+        return (similitud >= self.UMBRAL_SIMILITUD
+                and distancia <= max(1, int(len(normalizar(valor)) * self.DISTANCIA_RELATIVA_MAXIMA)))
 
     def limpiar_numero(self, value):
         """Intenta convertir un valor a entero, si falla retorna 0."""
@@ -299,6 +84,12 @@ class DataCleaner:
         except (ValueError, TypeError):
             return 0
 
+    def huella_registro(self, record_dict):
+        """Calcula un hash estable de los campos de texto, fecha y numéricos de un registro."""
+        valores = ('' if record_dict.get(campo) is None else str(record_dict.get(campo))
+                   for campo in self.campos_huella)
+        return hashlib.sha1('\x1f'.join(valores).encode('utf-8')).hexdigest()
+
     def limpiar_texto(self, text):
         """Limpia y estandariza cadenas de texto."""
         if pd.isna(text) or text is None or str(text).strip() == '':
@@ -322,32 +113,20 @@ class DataCleaner:
         
         # 2. Búsqueda de patrones en textos largos
         for pattern, replacement in self.evento_patterns:
-            if re.search(pattern, evento_str, re.IGNORECASE):
+            if pattern.search(evento_str):
                 return replacement
                 
         # 3. Búsqueda de palabras clave simples
-        keywords = {
-            'INSTITUCIONAL': 'OTROS',
-            'LOGISTICO': 'OTROS',
-            'LOGÍSTICO': 'OTROS',
-            'LOGISTICA': 'OTROS',
-            'LOGÍSTICA': 'OTROS',
-            'INUNDACION': 'INUNDACION',
-            'SEQUIA': 'SEQUIA',
-            'LLUVIA': 'INUNDACION',
-            'TEMPORAL': 'TEMPORAL',
-            'VIENTO': 'TEMPORAL',
-            'INCENDIO': 'INCENDIO',
-            'COVID': 'COVID',
-            'JAHO\'I': "OPERATIVO JAHO'I",
-            'ÑEÑUA': "OPERATIVO JAHO'I",
-        }
-        
-        for kw, replacement in keywords.items():
+        for kw, replacement in self.palabras_clave_evento.items():
             if kw in evento_str:
                 return replacement
-                
-        # 4. Si no coincide con nada, devolver OTROS
+
+        # 4. Variante nueva (mal escrita) de un evento conocido
+        estandarizado = self.resolver_difuso('evento', evento_str)
+        if estandarizado is not None:
+            return estandarizado
+
+        # 5. Si no coincide con nada, devolver OTROS
         return 'SIN EVENTO'
 
     def post_process_eventos_with_aids(self, row):
@@ -449,10 +228,14 @@ class DataCleaner:
                 break
 
         # 5. Buscar en el diccionario de nuevo, por si acaso
-        if depto_std.upper() in self.estandarizacion_dept:
-            depto_final = self.estandarizacion_dept[depto_std.upper()]
-        else:
+        depto_upper = depto_std.upper()
+        if depto_upper in self.estandarizacion_dept:
+            depto_final = self.estandarizacion_dept[depto_upper]
+        elif depto_upper in self.departamentos_canonicos or depto_upper in self.distrito_a_departamento:
             depto_final = depto_std
+        else:
+            # 6. Variante nueva (mal escrita) de un departamento: el canónico más parecido
+            depto_final = self.resolver_difuso('departamento', depto_upper) or depto_std
 
         return depto_final
 
@@ -467,8 +250,10 @@ class DataCleaner:
         # Limpiar distrito primero
         cleaned_record['distrito'] = self.limpiar_texto(record_dict.get('distrito'))
         
-        # Limpiar departamento
-        departamento_raw = record_dict.get('departamento')
+        # Limpiar departamento (y evento) desde el valor crudo original si el registro lo tiene
+        departamento_raw = record_dict.get('departamento_crudo')
+        if departamento_raw is None:
+            departamento_raw = record_dict.get('departamento')
         distrito_raw = cleaned_record['distrito']
         
         cleaned_record['departamento'] = self.limpiar_departamento(departamento_raw, distrito_raw)
@@ -480,7 +265,10 @@ class DataCleaner:
                 cleaned_record['distrito'] = str(departamento_raw).strip().title()
         
         # Resto de la limpieza
-        cleaned_record['evento'] = self.limpiar_evento(record_dict.get('evento'))
+        evento_raw = record_dict.get('evento_crudo')
+        if evento_raw is None:
+            evento_raw = record_dict.get('evento')
+        cleaned_record['evento'] = self.limpiar_evento(evento_raw)
         cleaned_record['localidad'] = self.limpiar_texto(record_dict.get('localidad'))
 
         # Manejo de fechas
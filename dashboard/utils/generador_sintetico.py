@@ -0,0 +1,93 @@
+"""
+Generador de datos sintéticos de asistencia humanitaria.
+Produce registros "sucios" usando como variantes las claves de los diccionarios
+de estandarización del DataCleaner, para poder medir el sistema a escala.
+"""
+
+import numpy as np # type: ignore
+import pandas as pd # type: ignore
+from dashboard.models import AsistenciaHumanitaria
+from dashboard.utils.data_cleaner import DataCleaner
+
+LOCALIDADES = [
+    'Barrio San Pedro', 'Bañado Sur', 'Bañado Norte', 'Chacarita', 'Tablada Nueva',
+    'Compañía Potrero', 'Asentamiento 8 de Diciembre', 'Colonia Independencia',
+    'Puerto Casado', 'Fuerte Olimpo', 'Mariscal Estigarribia', 'Filadelfia',
+    'Pozo Colorado', 'Pilar', 'Alberdi', 'Ayolas', 'Encarnación', 'Ciudad del Este',
+    'Hernandarias', 'Salto del Guairá', 'Curuguaty', 'Yby Yaú', 'Horqueta', '',
+]
+
+EVENTOS_LARGOS = [
+    'ASISTENCIAS A FAMILIAS AFECTADAS POR LA INUNDACION',
+    'ASISTENCIAS POR SEQUIA EN EL CHACO',
+    'COORDINACION DE TRABAJOS DE REHABILITACION',
+    'TRABAJOS CON FAMILIAS AFECTADAS POR LLUVIAS',
+    'OPERATIVO INVIERNO 2023',
+    'FUERTES VIENTOS Y LLUVIA',
+    '',
+]
+
+
+def _ensuciar(valores, rng, proporcion=0.2):
+    """Aplica variaciones de mayúsculas y espacios a una fracción de los valores."""
+    valores = np.asarray(valores, dtype=object)
+    sucios = rng.random(len(valores)) < proporcion
+    variantes = rng.integers(0, 3, len(valores))
+    for i in np.flatnonzero(sucios):
+        valor = valores[i]
+        if variantes[i] == 0:
+            valores[i] = valor.lower()
+        elif variantes[i] == 1:
+            valores[i] = f'  {valor} '
+        else:
+            valores[i] = valor.title()
+    return valores
+
+
+def generar_dataframe(n, semilla=0, fecha_inicio='2015-01-01', fecha_fin='2024-12-31'):
+    """
+    Genera un DataFrame con `n` registros crudos reproducibles para una semilla dada
+    (cualquier semilla aceptada por numpy.random.default_rng).
+    Las columnas coinciden con los campos del modelo AsistenciaHumanitaria (sin id).
+    """
+    rng = np.random.default_rng(semilla)
+    cleaner = DataCleaner()
+
+    departamentos = sorted(cleaner.estandarizacion_dept) + sorted(cleaner.distrito_a_departamento)
+    distritos = sorted(cleaner.distrito_a_departamento) + ['', 'SIN ESPECIFICAR']
+    eventos = sorted(cleaner.estandarizacion_eventos) + EVENTOS_LARGOS
+
+    inicio = pd.Timestamp(fecha_inicio)
+    dias = (pd.Timestamp(fecha_fin) - inicio).days + 1
+    fechas = inicio + pd.to_timedelta(rng.integers(0, dias, n), unit='D')
+
+    data = {
+        'fecha': fechas.date,
+        'localidad': _ensuciar(rng.choice(LOCALIDADES, n), rng),
+        'distrito': _ensuciar(rng.choice(distritos, n), rng),
+        'departamento': _ensuciar(rng.choice(departamentos, n), rng),
+        'evento': _ensuciar(rng.choice(eventos, n), rng),
+    }
+
+    # La mayoría de los registros entrega pocos tipos de ayuda a la vez
+    for field in cleaner.aid_fields:
+        entrega = rng.random(n) < 0.3
+        data[field] = np.where(entrega, rng.integers(1, 200, n), 0)
+
+    return pd.DataFrame(data)
+
+
+def insertar_registros(n, semilla=0, lote=50000):
+    """
+    Inserta `n` registros sintéticos en AsistenciaHumanitaria por lotes de `lote` filas.
+    Cada lote usa la semilla (semilla, número de lote), así el resultado es reproducible.
+    """
+    insertados = 0
+    for numero, inicio in enumerate(range(0, n, lote)):
+        df = generar_dataframe(min(lote, n - inicio), semilla=[semilla, numero])
+        AsistenciaHumanitaria.objects.bulk_create(
+            [AsistenciaHumanitaria(**registro) for registro in df.to_dict('records')],
+            batch_size=5000,
+        )
+        insertados += len(df)
+    return insertados
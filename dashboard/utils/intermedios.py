@@ -0,0 +1,49 @@
+"""
+Grafo de datos intermedios con nombre (agregaciones del DataFrame limpio) que comparten los
+gráficos y las tablas de las vistas. Cada intermedio declara de qué otros depende y se
+calcula a partir de ellos; los resultados se guardan en un diccionario que el llamador
+descarta cuando cambia la versión de los datos, así cada uno se calcula una sola vez por versión.
+"""
+
+# Nombre reservado del DataFrame limpio, la raíz del grafo
+RAIZ = 'df'
+
+
+class GrafoIntermedios:
+    """
+    Definiciones nombre -> (función, dependencias). Una dependencia debe estar definida antes,
+    así el grafo no puede tener ciclos. Los resultados se comparten: quien los use no debe modificarlos.
+    """
+
+    def __init__(self):
+        self.definiciones = {}
+
+    def definir(self, nombre, *dependencias):
+        """Decorador que registra `funcion(*valores de las dependencias)` como el intermedio `nombre`."""
+        if nombre == RAIZ or nombre in self.definiciones:
+            raise ValueError(f"El intermedio '{nombre}' ya está definido")
+        faltantes = [dependencia for dependencia in dependencias if dependencia != RAIZ and dependencia not in self.definiciones]
+        if faltantes:
+            raise ValueError(f"'{nombre}' depende de intermedios no definidos: {', '.join(faltantes)}")
+
+        def decorador(funcion):
+            self.definiciones[nombre] = (funcion, dependencias)
+            return funcion
+        return decorador
+
+    def calcular(self, nombre, df, resultados, al_calcular=None):
+        """
+        Valor de `nombre` para `df`. Usa los ya guardados en `resultados` ({nombre: valor}) y
+        agrega allí el suyo y los de las dependencias que tuvo que calcular; `al_calcular(nombre)`
+        se llama por cada uno.
+        """
+        if nombre == RAIZ:
+            return df
+        if nombre in resultados:
+            return resultados[nombre]
+        funcion, dependencias = self.definiciones[nombre]
+        valor = funcion(*(self.calcular(dependencia, df, resultados, al_calcular) for dependencia in dependencias))
+        resultados[nombre] = valor
+        if al_calcular is not None:
+            al_calcular(nombre)
+        return valor
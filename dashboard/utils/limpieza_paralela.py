@@ -0,0 +1,112 @@
+"""
+Limpieza de registros de asistencia humanitaria repartida en varios procesos.
+La tabla se particiona por rangos de id y cada proceso limpia su partición
+con su propia conexión a la base de datos.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd # type: ignore
+from django.db import connections
+from django.db.models import Max, Min
+
+from dashboard.utils.data_cleaner import DataCleaner
+
+CAMPOS_REGISTRO = [
+    'id', 'fecha', 'departamento', 'distrito', 'localidad', 'evento',
+    'kit_b', 'kit_a', 'chapa_fibrocemento', 'chapa_zinc', 'colchones',
+    'frazadas', 'terciadas', 'puntales', 'carpas_plasticas',
+]
+
+
+def limpiar_dataframe(df, cleaner=None):
+    """Aplica sobre un DataFrame crudo la misma limpieza que el comando limpiar_datos."""
+    cleaner = cleaner or DataCleaner()
+    if df.empty:
+        return df
+
+    df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+    df['AÑO'] = df['fecha'].dt.year
+    df['MES'] = df['fecha'].dt.month
+    df['DIA_SEMANA'] = df['fecha'].dt.day_name()
+
+    for col in cleaner.aid_fields:
+        df[col] = df[col].apply(cleaner.limpiar_numero)
+
+    df['departamento'] = df['departamento'].apply(cleaner.limpiar_departamento)
+    df['evento'] = df['evento'].apply(cleaner.limpiar_evento)
+    df['evento'] = df.apply(cleaner.post_process_eventos_with_aids, axis=1)
+
+    df['localidad'] = df['localidad'].apply(cleaner.limpiar_texto)
+    df['distrito'] = df['distrito'].apply(cleaner.limpiar_texto)
+    return df
+
+
+def cargar_dataframe(queryset):
+    """
+    Carga los campos crudos de un queryset de AsistenciaHumanitaria en un DataFrame.
+    Departamento y evento salen de <campo>_crudo (el valor antes de cualquier limpieza) si existe.
+    """
+    from dashboard.models import CAMPOS_CRUDOS
+
+    campos_crudos = [f'{campo}_crudo' for campo in CAMPOS_CRUDOS]
+    df = pd.DataFrame(list(queryset.values(*CAMPOS_REGISTRO, *campos_crudos)))
+    if df.empty:
+        return df
+    for campo in CAMPOS_CRUDOS:
+        df[campo] = df.pop(f'{campo}_crudo').fillna(df[campo])
+    return df
+
+
+def calcular_particiones(queryset, workers):
+    """Divide el rango de ids del queryset en `workers` rangos contiguos [desde, hasta)."""
+    limites = queryset.aggregate(minimo=Min('id'), maximo=Max('id'))
+    if limites['minimo'] is None:
+        return []
+
+    minimo, maximo = limites['minimo'], limites['maximo'] + 1
+    paso = max(1, -(-(maximo - minimo) // workers))
+    return [(desde, min(desde + paso, maximo)) for desde in range(minimo, maximo, paso)]
+
+
+def _inicializar_worker():
+    """Prepara Django en procesos creados con 'spawn' (en 'fork' ya está listo)."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _limpiar_particion(particion):
+    """Carga y limpia los registros con id en [desde, hasta) que cumplen el filtro."""
+    from dashboard.models import AsistenciaHumanitaria
+
+    filtro, desde, hasta = particion
+    queryset = AsistenciaHumanitaria.objects.filter(filtro, id__gte=desde, id__lt=hasta).order_by('id')
+    try:
+        return limpiar_dataframe(cargar_dataframe(queryset))
+    finally:
+        connections.close_all()
+
+
+def limpiar_en_paralelo(filtro, workers):
+    """
+    Limpia los registros que cumplen `filtro` (un objeto Q) usando `workers` procesos.
+    El resultado se une ordenado por id, independientemente del orden de llegada.
+    """
+    from dashboard.models import AsistenciaHumanitaria
+
+    particiones = calcular_particiones(AsistenciaHumanitaria.objects.filter(filtro), workers)
+    if not particiones:
+        return pd.DataFrame()
+
+    # Los procesos hijos no deben heredar conexiones abiertas del proceso padre
+    connections.close_all()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as executor:
+        resultados = list(executor.map(_limpiar_particion, [(filtro, desde, hasta) for desde, hasta in particiones]))
+
+    resultados = [df for df in resultados if not df.empty]
+    if not resultados:
+        return pd.DataFrame()
+    return pd.concat(resultados, ignore_index=True).sort_values('id', kind='stable').reset_index(drop=True)
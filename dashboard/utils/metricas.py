@@ -0,0 +1,166 @@
+"""
+Métricas internas del dashboard expuestas en formato de texto de Prometheus.
+Cada proceso acumula sus valores en memoria y los vuelca a un archivo JSON propio
+dentro de settings.METRICAS_DIR; /metrics suma los archivos de todos los procesos.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+BUCKETS_SEGUNDOS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INTERVALO_VOLCADO_SEGUNDOS = 1.0
+
+# nombre -> (tipo, descripción)
+DEFINICIONES = {
+    'dashboard_df_reconstrucciones_total': ('counter', 'Veces que se reconstruyó el DataFrame limpio'),
+    'dashboard_df_reconstruccion_segundos': ('histogram', 'Duración de la reconstrucción del DataFrame limpio'),
+    'dashboard_df_refrescos_parciales_total': ('counter', 'Veces que se actualizaron solo los registros cambiados del DataFrame'),
+    'dashboard_df_refresco_parcial_segundos': ('histogram', 'Duración de la actualización parcial del DataFrame limpio'),
+    'dashboard_df_bytes': ('gauge', 'Tamaño en memoria del DataFrame limpio en caché'),
+    'dashboard_sumas_acumuladas_bytes': ('gauge', 'Tamaño en memoria del índice de sumas acumuladas de /api/totales/'),
+    'dashboard_grafico_render_segundos': ('histogram', 'Latencia de generación de cada gráfico'),
+    'dashboard_cache_graficos_total': ('counter', 'Consultas a la caché de gráficos por resultado'),
+    'dashboard_cache_graficos_bytes': ('gauge', 'Memoria ocupada por los gráficos en caché'),
+    'dashboard_cache_graficos_entradas': ('gauge', 'Gráficos guardados en la caché en memoria'),
+    'dashboard_cache_graficos_desalojos_total': ('counter', 'Gráficos descartados de la caché por superar su presupuesto de memoria'),
+    'dashboard_graficos_segundo_plano_total': ('counter', 'Gráficos de la cola de segundo plano por resultado'),
+    'dashboard_grafico_espera_segundos': ('histogram', 'Tiempo desde que se encola un gráfico hasta que el worker lo termina'),
+    'dashboard_intermedios_calculados_total': ('counter', 'Datos intermedios compartidos calculados por nombre'),
+    'dashboard_cache_respuestas_total': ('counter', 'Consultas a la caché compartida de páginas por resultado'),
+    'dashboard_db_consultas_total': ('counter', 'Consultas SQL ejecutadas por vista'),
+    'dashboard_requests_total': ('counter', 'Requests atendidos por vista'),
+    'dashboard_cleaner_filas_total': ('counter', 'Filas procesadas por DataCleaner'),
+    'dashboard_cleaner_segundos_total': ('counter', 'Tiempo total de limpieza con DataCleaner'),
+    'dashboard_cleaner_filas_por_segundo': ('gauge', 'Velocidad de la última limpieza con DataCleaner'),
+}
+
+_lock = threading.Lock()
+_estado = {'pid': None, 'valores': {}, 'ultimo_volcado': 0.0}
+
+
+def _valores():
+    """Valores del proceso actual; se reinician si el proceso fue creado con fork."""
+    if _estado['pid'] != os.getpid():
+        _estado['pid'] = os.getpid()
+        _estado['valores'] = {}
+    return _estado['valores']
+
+
+def _clave(nombre, labels):
+    return json.dumps([nombre, sorted(labels.items())], ensure_ascii=False)
+
+
+def incrementar(nombre, valor=1, **labels):
+    with _lock:
+        valores = _valores()
+        clave = _clave(nombre, labels)
+        valores[clave] = valores.get(clave, 0) + valor
+
+
+def fijar(nombre, valor, **labels):
+    with _lock:
+        _valores()[_clave(nombre, labels)] = valor
+
+
+def observar(nombre, valor, **labels):
+    """Registra una observación en un histograma con BUCKETS_SEGUNDOS."""
+    with _lock:
+        valores = _valores()
+        clave = _clave(nombre, labels)
+        histograma = valores.setdefault(clave, {'buckets': [0] * len(BUCKETS_SEGUNDOS), 'suma': 0.0, 'cantidad': 0})
+        for i, limite in enumerate(BUCKETS_SEGUNDOS):
+            if valor <= limite:
+                histograma['buckets'][i] += 1
+        histograma['suma'] += valor
+        histograma['cantidad'] += 1
+
+
+def volcar(forzar=False):
+    """Escribe los valores del proceso en su archivo (como mucho una vez por intervalo)."""
+    ahora = time.monotonic()
+    if not forzar and ahora - _estado['ultimo_volcado'] < INTERVALO_VOLCADO_SEGUNDOS:
+        return
+    with _lock:
+        contenido = json.dumps(_valores(), ensure_ascii=False)
+        _estado['ultimo_volcado'] = ahora
+
+    os.makedirs(settings.METRICAS_DIR, exist_ok=True)
+    ruta = os.path.join(settings.METRICAS_DIR, f'metricas_{os.getpid()}.json')
+    temporal = f'{ruta}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _formatear_labels(labels):
+    if not labels:
+        return ''
+    partes = []
+    for nombre, valor in labels:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def exportar_prometheus():
+    """
+    Agrega los archivos de todos los procesos y los devuelve en formato de texto de Prometheus.
+    Contadores e histogramas se suman (incluidos procesos terminados); los gauges se
+    reportan por proceso vivo con el label pid.
+    """
+    volcar(forzar=True)
+    agregados = {}
+    for ruta in sorted(glob.glob(os.path.join(settings.METRICAS_DIR, 'metricas_*.json'))):
+        pid = int(os.path.basename(ruta)[len('metricas_'):-len('.json')])
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                valores = json.load(archivo)
+        except (OSError, ValueError):
+            continue
+
+        for clave, valor in valores.items():
+            nombre, labels = json.loads(clave)
+            tipo = DEFINICIONES.get(nombre, ('gauge', ''))[0]
+            labels = tuple(tuple(par) for par in labels)
+            if tipo == 'gauge':
+                if not _proceso_vivo(pid):
+                    continue
+                agregados[(nombre, labels + (('pid', pid),))] = valor
+            elif tipo == 'histogram':
+                actual = agregados.setdefault((nombre, labels), {'buckets': [0] * len(BUCKETS_SEGUNDOS), 'suma': 0.0, 'cantidad': 0})
+                actual['buckets'] = [a + b for a, b in zip(actual['buckets'], valor['buckets'])]
+                actual['suma'] += valor['suma']
+                actual['cantidad'] += valor['cantidad']
+            else:
+                agregados[(nombre, labels)] = agregados.get((nombre, labels), 0) + valor
+
+    lineas = []
+    for nombre, (tipo, descripcion) in DEFINICIONES.items():
+        series = sorted((labels, valor) for (n, labels), valor in agregados.items() if n == nombre)
+        lineas.append(f'# HELP {nombre} {descripcion}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for labels, valor in series:
+            if tipo == 'histogram':
+                for limite, cantidad in zip(BUCKETS_SEGUNDOS, valor['buckets']):
+                    lineas.append(f"{nombre}_bucket{_formatear_labels(labels + (('le', limite),))} {cantidad}")
+                lineas.append(f"{nombre}_bucket{_formatear_labels(labels + (('le', '+Inf'),))} {valor['cantidad']}")
+                lineas.append(f"{nombre}_sum{_formatear_labels(labels)} {valor['suma']}")
+                lineas.append(f"{nombre}_count{_formatear_labels(labels)} {valor['cantidad']}")
+            else:
+                lineas.append(f'{nombre}{_formatear_labels(labels)} {valor}')
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,157 @@
+"""
+Índice invertido de trigramas en memoria para la búsqueda de localidades, distritos y
+departamentos (/api/buscar/) cuando la base no es PostgreSQL. Se arma sobre los valores
+distintos ya limpios, así que su tamaño depende de la cantidad de nombres y no de registros.
+En PostgreSQL la búsqueda usa el índice GIN de pg_trgm (migración 0005).
+"""
+
+import heapq
+import unicodedata
+from bisect import bisect_left
+
+TAMANO_NGRAMA = 3
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, para que 'encarnacion' encuentre 'Encarnación'."""
+    texto = unicodedata.normalize('NFKD', str(texto).strip().lower())
+    return ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+
+
+def ngramas(texto, n=TAMANO_NGRAMA):
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceNgramas:
+    """
+    Índice de trigramas sobre pares (campo, valor) con su cantidad de registros.
+    Los valores que empiezan con la consulta salen de una lista ordenada (bisect); solo si
+    no alcanzan se buscan los que la contienen, intersectando las listas de sus trigramas.
+    """
+
+    def __init__(self, valores):
+        """`valores`: iterable de (campo, valor, registros)."""
+        self.entradas = []
+        self.normalizados = []
+        self.postings = {}
+        for campo, valor, registros in valores:
+            posicion = len(self.entradas)
+            normalizado = normalizar(valor)
+            self.entradas.append({'campo': campo, 'valor': valor, 'registros': int(registros)})
+            self.normalizados.append(normalizado)
+            for ngrama in ngramas(normalizado):
+                self.postings.setdefault(ngrama, set()).add(posicion)
+        self.orden = sorted(range(len(self.entradas)), key=self.normalizados.__getitem__)
+        self.ordenados = [self.normalizados[posicion] for posicion in self.orden]
+
+    @classmethod
+    def desde_dataframe(cls, df, campos):
+        """Arma el índice con los valores distintos de `campos` del DataFrame limpio."""
+        valores = []
+        for campo in campos:
+            if df.empty or campo not in df:
+                continue
+            conteos = df[campo].dropna().value_counts()
+            valores.extend((campo, valor, registros) for valor, registros in conteos.items())
+        return cls(valores)
+
+    def _candidatos(self, consulta):
+        trigramas = ngramas(consulta)
+        if not trigramas:
+            # Consultas más cortas que un trigrama: se recorren los valores distintos
+            return range(len(self.entradas))
+        listas = sorted((self.postings.get(ngrama, set()) for ngrama in trigramas), key=len)
+        return set.intersection(*listas) if listas[0] else set()
+
+    def _mejores(self, posiciones, limite):
+        # Para valores que contienen la consulta, el más corto es el más parecido
+        return heapq.nsmallest(
+            limite, posiciones,
+            key=lambda posicion: (len(self.normalizados[posicion]), -self.entradas[posicion]['registros'], posicion),
+        )
+
+    def buscar(self, consulta, campos=None, limite=10):
+        """
+        Valores que contienen `consulta` (sin distinguir mayúsculas ni tildes). Primero los
+        que empiezan con la consulta, luego los demás; en cada grupo, los más cortos
+        (más parecidos) y con más registros primero.
+        """
+        consulta = normalizar(consulta)
+        if not consulta:
+            return []
+        desde = bisect_left(self.ordenados, consulta)
+        hasta = bisect_left(self.ordenados, consulta + '\uffff')
+        prefijos = [
+            posicion for posicion in self.orden[desde:hasta]
+            if not campos or self.entradas[posicion]['campo'] in campos
+        ]
+        resultado = self._mejores(prefijos, limite)
+
+        if len(resultado) < limite:
+            contienen = [
+                posicion for posicion in self._candidatos(consulta)
+                if (not campos or self.entradas[posicion]['campo'] in campos)
+                and consulta in self.normalizados[posicion]
+                and not self.normalizados[posicion].startswith(consulta)
+            ]
+            resultado += self._mejores(contienen, limite - len(resultado))
+        return [self.entradas[posicion] for posicion in resultado]
+
+    def __len__(self):
+        return len(self.entradas)
+
+
+def distancia_edicion(a, b):
+    """Distancia de Levenshtein (inserciones, borrados y reemplazos de un carácter) entre `a` y `b`."""
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, caracter_a in enumerate(a, 1):
+        actual = [i]
+        for j, caracter_b in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (caracter_a != caracter_b)))
+        anterior = actual
+    return anterior[-1]
+
+
+class IndiceDifuso:
+    """
+    Índice de trigramas sobre variantes conocidas (variante -> valor canónico) para resolver
+    variantes nuevas por similitud (Jaccard de trigramas, como pg_trgm). Solo se comparan
+    las variantes que comparten al menos un trigrama con el valor buscado.
+    """
+
+    def __init__(self, variantes):
+        self.variantes = []
+        self.postings = {}
+        vistas = set()
+        for variante, canonico in variantes.items():
+            normalizado = normalizar(variante)
+            if not normalizado or normalizado in vistas:
+                continue
+            vistas.add(normalizado)
+            trigramas = ngramas(f'  {normalizado} ')
+            for ngrama in trigramas:
+                self.postings.setdefault(ngrama, []).append(len(self.variantes))
+            self.variantes.append((len(trigramas), canonico, normalizado))
+
+    def mas_parecido(self, valor):
+        """
+        Retorna (canónico, similitud, distancia de edición) de la variante más parecida a `valor`,
+        o None si no comparte trigramas. La distancia es entre `valor` y esa variante, normalizados.
+        """
+        normalizado = normalizar(valor)
+        trigramas = ngramas(f'  {normalizado} ')
+        comunes = {}
+        for ngrama in trigramas:
+            for posicion in self.postings.get(ngrama, ()):
+                comunes[posicion] = comunes.get(posicion, 0) + 1
+        mejor = None
+        for posicion, cantidad in comunes.items():
+            total, canonico, variante = self.variantes[posicion]
+            similitud = cantidad / (len(trigramas) + total - cantidad)
+            if mejor is None or similitud > mejor[1]:
+                mejor = (canonico, similitud, variante)
+        if mejor is None:
+            return None
+        return mejor[0], mejor[1], distancia_edicion(normalizado, mejor[2])
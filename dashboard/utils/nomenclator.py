@@ -0,0 +1,94 @@
+"""
+Nomenclátor sin conexión (dashboard/nomenclator.json) para ubicar en el mapa departamentos,
+distritos y localidades. Los nombres se buscan normalizados (sin tildes ni mayúsculas) en
+diccionarios armados una sola vez; un nombre repetido en varios departamentos se resuelve
+con el departamento del registro.
+"""
+
+import json
+import os
+import threading
+
+from dashboard.utils.ngramas import normalizar
+
+RUTA_NOMENCLATOR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nomenclator.json')
+
+_cargado = None
+_lock = threading.Lock()
+
+
+def _coordenadas(entrada, precision):
+    return {'lat': entrada['lat'], 'lng': entrada['lng'], 'precision': precision}
+
+
+class Nomenclator:
+    """Índices por nombre normalizado de los lugares del nomenclátor."""
+
+    def __init__(self, contenido):
+        self.version = str(contenido['version'])
+        self.pais = contenido['pais']
+        self.departamentos = {
+            normalizar(nombre): dict(coordenadas, departamento=nombre)
+            for nombre, coordenadas in contenido['departamentos'].items()
+        }
+        # nombre normalizado -> [entradas]; puede haber homónimos en distintos departamentos
+        self.distritos = self._indexar(contenido['distritos'])
+        self.localidades = self._indexar(contenido['localidades'])
+
+    @staticmethod
+    def _indexar(entradas):
+        indice = {}
+        for entrada in entradas:
+            for nombre in [entrada['nombre']] + entrada.get('alias', []):
+                indice.setdefault(normalizar(nombre), []).append(entrada)
+        return indice
+
+    def _elegir(self, candidatos, departamento, distrito=None):
+        """
+        La entrada del mismo departamento (y distrito); sin pista, solo si el nombre es único.
+        Si el registro es de un departamento conocido y el nombre solo figura en otros, no se
+        ubica (sería un homónimo en otro lugar del país).
+        """
+        if distrito is not None:
+            mismos = [entrada for entrada in candidatos if normalizar(entrada.get('distrito', '')) == normalizar(distrito)]
+            if len(mismos) == 1:
+                return mismos[0]
+        if departamento is not None:
+            mismos = [entrada for entrada in candidatos if normalizar(entrada['departamento']) == normalizar(departamento)]
+            if len(mismos) == 1:
+                return mismos[0]
+            if not mismos and normalizar(departamento) in self.departamentos:
+                return None
+        return candidatos[0] if len(candidatos) == 1 else None
+
+    def departamento(self, nombre):
+        """{'lat', 'lng', 'zoom'} del departamento, o None si no está en el nomenclátor."""
+        entrada = self.departamentos.get(normalizar(nombre))
+        return {'lat': entrada['lat'], 'lng': entrada['lng'], 'zoom': entrada['zoom']} if entrada else None
+
+    def distrito(self, nombre, departamento=None):
+        """{'lat', 'lng', 'precision'} del distrito, o None si no está o es ambiguo."""
+        entrada = self._elegir(self.distritos.get(normalizar(nombre), []), departamento)
+        return _coordenadas(entrada, 'distrito') if entrada else None
+
+    def localidad(self, nombre, distrito=None, departamento=None):
+        """
+        Coordenadas de la localidad; si no figura, las del distrito con ese nombre (muchas
+        localidades son cabeceras de distrito) y, por último, las del distrito del registro.
+        'precision' indica cuál de las tres se usó.
+        """
+        entrada = self._elegir(self.localidades.get(normalizar(nombre), []), departamento, distrito)
+        if entrada:
+            return _coordenadas(entrada, 'localidad')
+        return self.distrito(nombre, departamento) or (self.distrito(distrito, departamento) if distrito else None)
+
+
+def cargar_nomenclator():
+    """El nomenclátor incluido en el paquete, leído una sola vez por proceso."""
+    global _cargado
+    if _cargado is None:
+        with _lock:
+            if _cargado is None:
+                with open(RUTA_NOMENCLATOR, encoding='utf-8') as archivo:
+                    _cargado = Nomenclator(json.load(archivo))
+    return _cargado
@@ -0,0 +1,72 @@
+"""
+Reglas de limpieza versionadas (dashboard/reglas_limpieza.json o settings.DASHBOARD_REGLAS_LIMPIEZA).
+El archivo se compila una vez (patrones como regex) y se vuelve a leer solo si cambia,
+así una regla nueva se aplica sin deploy. limpiar_datos guarda una copia de las reglas
+aplicadas (ReglasAplicadas) para calcular qué valores crudos cambian con la versión nueva.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+RUTA_POR_DEFECTO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reglas_limpieza.json')
+
+_cargadas = {}
+_lock = threading.Lock()
+
+
+class ReglasLimpieza:
+    """Forma compilada de una versión de las reglas."""
+
+    def __init__(self, contenido):
+        self.contenido = contenido
+        self.version = str(contenido['version'])
+        self.patrones_evento = [
+            (re.compile(patron, re.IGNORECASE), reemplazo) for patron, reemplazo in contenido['patrones_evento']
+        ]
+        self.palabras_clave_evento = contenido['palabras_clave_evento']
+        self.distrito_a_departamento = contenido['distrito_a_departamento']
+        self.estandarizacion_dept = contenido['estandarizacion_dept']
+        self.estandarizacion_eventos = contenido['estandarizacion_eventos']
+        self.departamentos_canonicos = contenido['departamentos_canonicos']
+        self.huella = hashlib.sha1(json.dumps(contenido, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _ruta_configurada():
+    from django.conf import settings
+    if settings.configured:
+        return getattr(settings, 'DASHBOARD_REGLAS_LIMPIEZA', RUTA_POR_DEFECTO)
+    return RUTA_POR_DEFECTO
+
+
+def cargar_reglas(ruta=None):
+    """Retorna las reglas del archivo; la misma instancia mientras el archivo no cambie."""
+    ruta = ruta or _ruta_configurada()
+    estado = os.stat(ruta)
+    clave = (estado.st_mtime_ns, estado.st_size)
+    guardadas = _cargadas.get(ruta)
+    if guardadas is None or guardadas[0] != clave:
+        with _lock:
+            guardadas = _cargadas.get(ruta)
+            if guardadas is None or guardadas[0] != clave:
+                with open(ruta, encoding='utf-8') as archivo:
+                    guardadas = (clave, ReglasLimpieza(json.load(archivo)))
+                _cargadas[ruta] = guardadas
+    return guardadas[1]
+
+
+def valores_afectados(anterior, nuevo, campo, valores):
+    """
+    Valores crudos de `campo` ('departamento' o 'evento') que se limpian distinto con el
+    DataCleaner `nuevo` que con `anterior`.
+    """
+    if campo == 'departamento':
+        def limpiar(cleaner, valor):
+            # El departamento también decide si el distrito se completa (limpiar_registro_completo)
+            return cleaner.limpiar_departamento(valor), str(valor).strip().upper() in cleaner.distrito_a_departamento
+    else:
+        def limpiar(cleaner, valor):
+            return cleaner.limpiar_evento(valor)
+    return [valor for valor in valores if limpiar(anterior, valor) != limpiar(nuevo, valor)]
@@ -0,0 +1,88 @@
+"""
+Índice de sumas acumuladas por día para responder totales de cualquier rango de fechas
+(/api/totales/) sin recorrer los registros. Para cada valor de una dimensión (todo el país,
+cada departamento, cada evento) guarda un arreglo con una fila por día con datos y la
+cantidad de registros y las ayudas acumuladas hasta ese día; el total de [desde, hasta]
+es la resta de dos filas. Un arreglo por día del calendario traduce cada fecha a su fila,
+así fechas aisladas muy lejanas no agrandan los arreglos de sumas.
+"""
+
+import numpy as np # type: ignore
+import pandas as pd # type: ignore
+
+DIMENSIONES = ['departamento', 'evento']
+
+
+class IndiceSumasAcumuladas:
+    """Sumas acumuladas (registros + ayudas) por día, en total y por cada dimensión."""
+
+    def __init__(self, df, campos_ayuda, dimensiones=DIMENSIONES):
+        self.columnas = ['registros'] + list(campos_ayuda)
+        df = df.dropna(subset=['fecha'])
+        if df.empty:
+            self.inicio = self.fin = None
+            self.dias = 0
+            self.filas = np.zeros(1, dtype='int64')
+            self.valores = {dimension: np.array([], dtype=object) for dimension in dimensiones}
+            self.acumulados = {dimension: np.zeros((0, 1, len(self.columnas)), dtype='int64') for dimension in dimensiones}
+            self.acumulados[None] = np.zeros((1, 1, len(self.columnas)), dtype='int64')
+            return
+
+        fechas = df['fecha'].values.astype('datetime64[D]')
+        self.inicio, self.fin = fechas.min(), fechas.max()
+        self.dias = int((self.fin - self.inicio).astype(int)) + 1
+        desplazamientos = (fechas - self.inicio).astype('int64')
+        con_datos, posiciones = np.unique(desplazamientos, return_inverse=True)
+        # filas[d]: cantidad de días con datos anteriores al día d del calendario, es decir, la
+        # fila acumulada a restar para empezar en d (la fila 0 está en cero)
+        self.filas = np.searchsorted(con_datos, np.arange(self.dias + 1), side='left')
+        self.largo = len(con_datos) + 1
+        posiciones = posiciones.reshape(-1) + 1
+        sumandos = [np.ones(len(df), dtype='int64')] + [df[campo].to_numpy(dtype='int64') for campo in campos_ayuda]
+
+        self.valores = {}
+        self.acumulados = {None: self._acumular(np.zeros(len(df), dtype='int64'), 1, posiciones, sumandos)}
+        for dimension in dimensiones:
+            codigos, valores = pd.factorize(df[dimension], sort=True)
+            self.valores[dimension] = np.asarray(valores, dtype=object)
+            self.acumulados[dimension] = self._acumular(codigos, len(valores), posiciones, sumandos)
+
+    def _acumular(self, codigos, cantidad, posiciones, sumandos):
+        """Arreglo (valores, días con datos + 1, columnas) con las sumas acumuladas de cada valor."""
+        largo = self.largo
+        # Registros sin valor en la dimensión (código -1) solo cuentan en el total
+        validos = codigos >= 0
+        indices = codigos[validos].astype('int64') * largo + posiciones[validos]
+        acumulados = np.empty((cantidad, largo, len(sumandos)), dtype='int64')
+        for columna, sumando in enumerate(sumandos):
+            por_dia = np.bincount(indices, weights=sumando[validos], minlength=cantidad * largo)
+            acumulados[:, :, columna] = np.rint(por_dia).astype('int64').reshape(cantidad, largo)
+        return np.cumsum(acumulados, axis=1, out=acumulados)
+
+    def _posicion(self, fecha, despues):
+        """Fila acumulada antes de `fecha` (o hasta `fecha` inclusive, si `despues`)."""
+        if fecha is None:
+            return self.filas[-1] if despues else 0
+        dia = int((np.datetime64(fecha, 'D') - self.inicio).astype(int)) + (1 if despues else 0)
+        return self.filas[min(max(dia, 0), self.dias)]
+
+    def totales(self, desde=None, hasta=None, dimension=None):
+        """
+        Totales de [desde, hasta] (fechas inclusive; None = sin límite). Sin dimensión
+        retorna un dict; con dimensión, {valor: dict} solo de los valores con registros.
+        """
+        acumulados = self.acumulados[dimension]
+        if self.dias:
+            diferencia = acumulados[:, self._posicion(hasta, True)] - acumulados[:, self._posicion(desde, False)]
+        else:
+            diferencia = acumulados[:, 0]
+        if dimension is None:
+            return dict(zip(self.columnas, diferencia[0].tolist()))
+        return {
+            valor: dict(zip(self.columnas, fila.tolist()))
+            for valor, fila in zip(self.valores[dimension], diferencia) if fila[0] > 0
+        }
+
+    @property
+    def bytes(self):
+        return self.filas.nbytes + sum(arreglo.nbytes for arreglo in self.acumulados.values())
@@ -0,0 +1,73 @@
+"""
+Medición de tiempos por etapa dentro de un request.
+Las etapas se acumulan en la medición activa del contexto actual (si la hay)
+y el middleware ServerTimingMiddleware las publica al final del request.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+_medicion_actual = contextvars.ContextVar('medicion_tiempos', default=None)
+
+
+class MedicionRequest:
+    """Duraciones acumuladas por etapa y aciertos/fallos de caché de un request."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+        self.cache = {}
+
+    def agregar(self, etapa, segundos):
+        self.etapas[etapa] = self.etapas.get(etapa, 0.0) + segundos
+
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def server_timing(self):
+        """Arma el valor del encabezado Server-Timing (duraciones en milisegundos)."""
+        partes = [f'{etapa};dur={segundos * 1000:.1f}' for etapa, segundos in self.etapas.items()]
+        partes += [f'cache-{nombre};desc={estado}' for nombre, estado in self.cache.items()]
+        partes.append(f'total;dur={self.total() * 1000:.1f}')
+        return ', '.join(partes)
+
+    def como_dict(self):
+        return {
+            'total_ms': round(self.total() * 1000, 1),
+            'etapas_ms': {etapa: round(segundos * 1000, 1) for etapa, segundos in self.etapas.items()},
+            'cache': dict(self.cache),
+        }
+
+
+def iniciar_medicion():
+    """Activa una medición nueva para el contexto actual y retorna (medicion, token)."""
+    medicion = MedicionRequest()
+    return medicion, _medicion_actual.set(medicion)
+
+
+def finalizar_medicion(token):
+    _medicion_actual.reset(token)
+
+
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+@contextmanager
+def medir(etapa):
+    """Acumula la duración del bloque en la etapa indicada de la medición activa."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion = _medicion_actual.get()
+        if medicion is not None:
+            medicion.agregar(etapa, time.perf_counter() - inicio)
+
+
+def marcar_cache(nombre, acierto):
+    """Registra si la caché `nombre` se encontró (hit) o hubo que generarla (miss)."""
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        medicion.cache[nombre] = 'hit' if acierto else 'miss'
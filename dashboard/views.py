@@ -5,15 +5,38 @@ matplotlib.use('Agg')  # Para usar matplotlib sin GUI
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.urls import reverse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from django.db import connection
 from django.db.models import Sum, Count
 from django.db.models.functions import Extract
-from .models import AsistenciaHumanitaria
+from .models import CAMPOS_CRUDOS, AsistenciaHumanitaria, CambioParcial, EstadoDatos, RollupDiario, TrabajoGrafico
 from .utils.data_cleaner import DataCleaner # Importar DataCleaner
+from .utils import metricas
+from .utils.analitica import obtener_motor
+from .utils.cache_graficos import AUSENTE, CacheGraficos
+from .utils.intermedios import RAIZ, GrafoIntermedios
+from .utils.ngramas import IndiceNgramas, normalizar
+from .utils.nomenclator import cargar_nomenclator
+from .utils.reglas import cargar_reglas, valores_afectados
+from .utils.sumas_acumuladas import DIMENSIONES, IndiceSumasAcumuladas
+from .utils.tiempos import marcar_cache, medir
 import numpy as np
 import time
 import calendar
+import threading
+import datetime
+import tempfile
 import locale # Importar el módulo locale
 
 try:
@@ -38,9 +61,194 @@ cleaner = DataCleaner()
 _cache = {
     'cleaned_df': None,
     'last_df_update': 0,
-    'graphs': {} # Para almacenar gráficos codificados en base64
+    # Gráficos codificados en base64, con presupuesto de memoria (se descartan los menos usados)
+    'graphs': CacheGraficos(getattr(settings, 'DASHBOARD_CACHE_GRAFICOS_MB', 256) * 1024 * 1024),
+    'version_datos': None, # Versión de los datos (ETag) con la que se armaron las cachés
+    'version_numero': None, # EstadoDatos.version correspondiente, para los cambios parciales
+    'indice_busqueda': None, # (DataFrame, IndiceNgramas) para /api/buscar/ fuera de PostgreSQL
+    'agregados_mapa': None, # (DataFrame, agregados por nivel) para /api/datos-mapa/
+    'rollups': None, # (versión de los datos, {'diario', 'mensual', 'anual'}) desde RollupDiario
+    'sumas_acumuladas': None, # (DataFrame, IndiceSumasAcumuladas) para /api/totales/
+    'intermedios': None, # (DataFrame, {nombre: resultado}) de INTERMEDIOS
 }
-CACHE_TIMEOUT_SECONDS = 300 # Cachear datos y gráficos por 5 minutos (ajustar según necesidad)
+CACHE_TIMEOUT_SECONDS = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT_SECONDS', 300) # Cachear datos y gráficos por 5 minutos (ajustar según necesidad)
+
+# pyplot no es seguro entre hilos: todos los gráficos se generan en este único hilo,
+# así las vistas (WSGI con hilos o ASGI) pueden atender requests en paralelo sin mezclar figuras
+_ejecutor_graficos = ThreadPoolExecutor(max_workers=1, thread_name_prefix='graficos')
+
+# Páginas completas y fragmentos ({% cache %}) que se guardan en la caché compartida por versión de datos
+PAGINAS_EN_CACHE = ['dashboard:dashboard', 'dashboard:geografico', 'dashboard:temporal', 'dashboard:eventos']
+FRAGMENTOS_EN_CACHE = ['tabla_distritos', 'tabla_eventos_departamento']
+
+# Columnas del DataFrame limpio que usa cada gráfico: tras un cambio parcial solo se regeneran
+# los gráficos que leen alguna columna modificada (los que no figuran aquí, siempre)
+_AYUDAS = set(cleaner.aid_fields)
+COLUMNAS_GRAFICOS = {
+    'ayudas_por_ano': {'fecha'} | _AYUDAS,
+    'departamentos': {'departamento'} | _AYUDAS,
+    'eventos': {'evento'} | _AYUDAS,
+    'tendencia_mensual': {'fecha'},
+    'total_ayudas_departamento': {'departamento'} | _AYUDAS,
+    'top_localidades': {'localidad'},
+    'evolucion_ayudas_top_departamentos': {'departamento', 'fecha'} | _AYUDAS,
+    'heatmap_departamento_anio': {'departamento', 'fecha'} | _AYUDAS,
+    'ayudas_mensual': {'fecha'} | _AYUDAS,
+    'distribucion_anual_ayuda_principal': {'fecha'} | _AYUDAS,
+    'eventos_mayor_ayuda': {'evento'} | _AYUDAS,
+    'composicion_ayudas_por_evento': {'evento'} | _AYUDAS,
+    'top_eventos_frecuentes_seaborn': {'evento'},
+    'comparacion_eventos_por_anio': {'evento', 'fecha'} | _AYUDAS,
+    'heatmap_eventos_por_anio': {'evento', 'fecha'} | _AYUDAS,
+    'eventos_comunes_total_anio': {'evento', 'fecha'} | _AYUDAS,
+    'tendencia_mensual_eventos_alternativo': {'evento', 'fecha'} | _AYUDAS,
+}
+COLUMNAS_LIMPIAS = ['fecha', 'localidad', 'distrito', 'departamento', 'evento'] + cleaner.aid_fields
+# Ids por consulta al volver a leer los registros de un cambio parcial
+LOTE_IDS_RELECTURA = 5000
+
+def _reiniciar_caches():
+    """Vacía las cachés en memoria, dejando el proceso como recién iniciado."""
+    _cache['cleaned_df'] = None
+    _cache['last_df_update'] = 0
+    _cache['graphs'].vaciar()
+    _cache['version_datos'] = None
+    _cache['version_numero'] = None
+    _cache['indice_busqueda'] = None
+    _cache['agregados_mapa'] = None
+    _cache['rollups'] = None
+    _cache['sumas_acumuladas'] = None
+    _cache['intermedios'] = None
+
+def _sincronizar_version():
+    """
+    Consulta la versión de los datos y, si cambió respecto de la que generó las cachés en
+    memoria, las actualiza o vacía para no servir datos viejos con un ETag nuevo. La usan
+    las vistas (una vez por request) y el worker de procesar_graficos.
+    """
+    global cleaner
+    version = EstadoDatos.version_actual()
+    reglas = cargar_reglas()
+    version['etag'] = f"{reglas.version}-{version['etag']}"
+    if _cache['version_datos'] != version['etag']:
+        if _cache['version_datos'] is not None:
+            _invalidar_cache_compartida(_cache['version_datos'])
+        cleaner_anterior = cleaner
+        if cleaner.reglas is not reglas:
+            cleaner = DataCleaner(reglas)
+        if not _refrescar_parcial(version, cleaner_anterior):
+            _reiniciar_caches()
+        _cache['version_datos'] = version['etag']
+        _cache['version_numero'] = version['version']
+    return version
+
+def _version_datos(request):
+    """Versión de los datos (ver _sincronizar_version), calculada una sola vez por request."""
+    if not hasattr(request, '_version_datos'):
+        request._version_datos = _sincronizar_version()
+    return request._version_datos
+
+def _clave_respuesta(path, etag):
+    return f'respuesta:{path}:{etag}'
+
+def _invalidar_cache_compartida(etag):
+    """Borra de la caché compartida las páginas y fragmentos de una versión de datos anterior."""
+    claves = [_clave_respuesta(reverse(nombre), etag) for nombre in PAGINAS_EN_CACHE]
+    claves += [make_template_fragment_key(nombre, [etag]) for nombre in FRAGMENTOS_EN_CACHE]
+    cache.delete_many(claves)
+
+def respuesta_en_cache(vista):
+    """
+    Guarda la página completa en la caché compartida con clave ruta + versión de los datos,
+    así cualquier proceso la reutiliza sin recalcular hasta que los datos cambien.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        clave = _clave_respuesta(request.path, _version_datos(request)['etag'])
+        with medir('cache'):
+            guardada = cache.get(clave)
+        marcar_cache('respuesta', guardada is not None)
+        metricas.incrementar('dashboard_cache_respuestas_total', resultado='hit' if guardada else 'miss')
+        if guardada is not None:
+            return HttpResponse(guardada['contenido'], content_type=guardada['content_type'])
+
+        response = vista(request, *args, **kwargs)
+        # Una página con gráficos pendientes no se guarda: al recargarla deben aparecer las imágenes
+        if response.status_code == 200 and not response.streaming and not getattr(response, 'graficos_pendientes', False):
+            with medir('cache'):
+                cache.set(clave, {'contenido': response.content, 'content_type': response['Content-Type']})
+        return response
+    return envoltura
+
+def condicional_por_version(vista):
+    """
+    Agrega ETag y Last-Modified según la versión de los datos y responde 304 sin ejecutar
+    la vista (ni pandas ni matplotlib) si el cliente ya tiene esa versión. Sirve para vistas sync y async.
+    """
+    def precondiciones(request):
+        version = _version_datos(request)
+        etag = quote_etag(version['etag'])
+        ultima_modificacion = int(version['actualizado'].timestamp()) if version['actualizado'] else None
+        return etag, ultima_modificacion, get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+
+    def completar(response, etag, ultima_modificacion):
+        if getattr(response, 'graficos_pendientes', False):
+            # Sin validadores: el navegador no debe recibir un 304 con los gráficos todavía pendientes
+            patch_cache_control(response, no_store=True)
+            return response
+        response.headers.setdefault('ETag', etag)
+        if ultima_modificacion and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(ultima_modificacion)
+        # Que el navegador siempre revalide (barato gracias al 304) en vez de suponer que sigue vigente
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            etag, ultima_modificacion, response = await sync_to_async(precondiciones)(request)
+            if response is None:
+                response = await vista(request, *args, **kwargs)
+            return completar(response, etag, ultima_modificacion)
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        etag, ultima_modificacion, response = precondiciones(request)
+        if response is None:
+            response = vista(request, *args, **kwargs)
+        return completar(response, etag, ultima_modificacion)
+    return envoltura
+
+def _leer_registros(queryset):
+    """Lee los campos crudos en un DataFrame; departamento y evento salen de <campo>_crudo si existe."""
+    campos_crudos = [f'{campo}_crudo' for campo in CAMPOS_CRUDOS]
+    df = pd.DataFrame(list(queryset.values('id', *COLUMNAS_LIMPIAS, *campos_crudos)))
+    if not df.empty:
+        for campo in CAMPOS_CRUDOS:
+            df[f'{campo}_crudo'] = df[f'{campo}_crudo'].fillna(df[campo])
+            df[campo] = df[f'{campo}_crudo']
+    return df
+
+def _limpiar_registros(df):
+    """Aplica la limpieza completa de DataCleaner sobre el DataFrame (en el lugar)."""
+    # Asegurar que la columna 'fecha' sea de tipo datetime y manejar nulos
+    df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+    # Aplicar operaciones de limpieza directamente a las columnas del DataFrame
+    # Limpiar campos numéricos
+    for field in cleaner.aid_fields:
+        df[field] = df[field].apply(cleaner.limpiar_numero)
+    # Limpiar campos de texto
+    df['departamento'] = df['departamento'].apply(cleaner.limpiar_departamento)
+    df['evento'] = df['evento'].apply(cleaner.limpiar_texto).apply(cleaner.limpiar_evento)
+    df['localidad'] = df['localidad'].apply(cleaner.limpiar_texto)
+    df['distrito'] = df['distrito'].apply(cleaner.limpiar_texto)
+    # Aplicar post-procesamiento de eventos (requiere campos de ayuda ya limpios)
+    df['evento'] = df.apply(cleaner.post_process_eventos_with_aids, axis=1)
+    # Los valores crudos solo se usan para volver a limpiar: como categorías ocupan poco
+    for campo in CAMPOS_CRUDOS:
+        df[f'{campo}_crudo'] = df[f'{campo}_crudo'].astype('category')
+    return df
 
 def _get_cleaned_dataframe():
     """
@@ -50,78 +258,284 @@ def _get_cleaned_dataframe():
     current_time = time.time()
     # Si el DataFrame está en caché y no ha expirado, lo retornamos
     if _cache['cleaned_df'] is not None and (current_time - _cache['last_df_update']) < CACHE_TIMEOUT_SECONDS:
+        marcar_cache('df', True)
         return _cache['cleaned_df']
+    marcar_cache('df', False)
 
     # Si no está en caché o ha expirado, lo generamos
-    queryset = AsistenciaHumanitaria.objects.all().values(
-        'id', 'fecha', 'localidad', 'distrito', 'departamento', 'evento',
-        'kit_b', 'kit_a', 'chapa_fibrocemento', 'chapa_zinc', 'colchones',
-        'frazadas', 'terciadas', 'puntales', 'carpas_plasticas'
-    )
+    with medir('db'):
+        df = _leer_registros(AsistenciaHumanitaria.objects.all())
         
-    if not queryset.exists():
-        df = pd.DataFrame() # Retorna un DataFrame vacío si no hay datos
-    else:
-        df = pd.DataFrame(list(queryset))  
-        # Asegurar que la columna 'fecha' sea de tipo datetime y manejar nulos
-        df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
-        # Aplicar operaciones de limpieza directamente a las columnas del DataFrame
-        # Limpiar campos numéricos
-        for field in cleaner.aid_fields:
-            df[field] = df[field].apply(cleaner.limpiar_numero)
-        # Limpiar campos de texto
-        df['departamento'] = df['departamento'].apply(cleaner.limpiar_departamento)
-        df['evento'] = df['evento'].apply(cleaner.limpiar_texto).apply(cleaner.limpiar_evento)
-        df['localidad'] = df['localidad'].apply(cleaner.limpiar_texto)
-        df['distrito'] = df['distrito'].apply(cleaner.limpiar_texto)
-        # Aplicar post-procesamiento de eventos (requiere campos de ayuda ya limpios)
-        df['evento'] = df.apply(cleaner.post_process_eventos_with_aids, axis=1)
+    inicio_limpieza = time.perf_counter()
+    if not df.empty:
+        with medir('limpieza'):
+            _limpiar_registros(df)
+        duracion_limpieza = time.perf_counter() - inicio_limpieza
+        metricas.incrementar('dashboard_cleaner_filas_total', len(df))
+        metricas.incrementar('dashboard_cleaner_segundos_total', duracion_limpieza)
+        metricas.fijar('dashboard_cleaner_filas_por_segundo', len(df) / max(duracion_limpieza, 1e-9))
+
+    metricas.incrementar('dashboard_df_reconstrucciones_total')
+    metricas.observar('dashboard_df_reconstruccion_segundos', time.time() - current_time)
+    metricas.fijar('dashboard_df_bytes', int(df.memory_usage(deep=True).sum()))
     
     # Almacenar el DataFrame limpio en caché
     _cache['cleaned_df'] = df
     _cache['last_df_update'] = current_time
-    _cache['graphs'] = {} # Limpiar la caché de gráficos cuando los datos se refrescan
+    _cache['graphs'].vaciar() # Limpiar la caché de gráficos cuando los datos se refrescan
     return df
 
+def _refrescar_parcial(version, cleaner_anterior):
+    """
+    Actualiza el DataFrame en caché sin reconstruirlo: vuelve a leer los registros de los
+    cambios parciales (CambioParcial) desde la última versión vista y vuelve a limpiar los
+    registros cuyos valores crudos se limpian distinto con las reglas nuevas. Solo descarta
+    los gráficos que usan columnas que cambiaron. Retorna False si hay que recargar todo.
+    """
+    df = _cache['cleaned_df']
+    if df is None or df.empty or version['version'] is None or _cache['version_numero'] is None:
+        return False
+    if version['version'] == _cache['version_numero']:
+        if cleaner is cleaner_anterior:
+            return False # Cambió el ETag sin cambios registrados (p. ej. SQL directo)
+        ids_cambiados = []
+    else:
+        ids_cambiados = CambioParcial.ids_entre(_cache['version_numero'], version['version'])
+        if ids_cambiados is None:
+            return False
+
+    inicio = time.perf_counter()
+    # Registros afectados por las reglas nuevas: se limpian de nuevo desde sus valores crudos
+    afectados = pd.Series(False, index=df.index)
+    if cleaner is not cleaner_anterior:
+        for campo in CAMPOS_CRUDOS:
+            crudos = df[f'{campo}_crudo']
+            afectados |= crudos.isin(valores_afectados(cleaner_anterior, cleaner, campo, crudos.cat.categories))
+    afectados &= ~df['id'].isin(ids_cambiados)
+    relimpiar = df.loc[afectados].copy()
+    for campo in CAMPOS_CRUDOS:
+        relimpiar[campo] = relimpiar[f'{campo}_crudo'].astype(object)
+
+    # Registros modificados o borrados en la base
+    partes = [relimpiar]
+    for inicio_lote in range(0, len(ids_cambiados), LOTE_IDS_RELECTURA):
+        lote = ids_cambiados[inicio_lote:inicio_lote + LOTE_IDS_RELECTURA]
+        partes.append(_leer_registros(AsistenciaHumanitaria.objects.filter(id__in=lote)))
+    partes = [parte for parte in partes if not parte.empty]
+    if partes:
+        nuevos = pd.concat([parte.astype({f'{campo}_crudo': object for campo in CAMPOS_CRUDOS}) for parte in partes])
+        _limpiar_registros(nuevos)
+    else:
+        nuevos = df.iloc[:0]
+
+    reemplazados = df['id'].isin(ids_cambiados) | afectados
+    anteriores = df.loc[reemplazados].set_index('id').sort_index()
+    nuevos_por_id = nuevos.set_index('id').sort_index()
+    if anteriores.index.equals(nuevos_por_id.index):
+        cambiadas = {
+            columna for columna in COLUMNAS_LIMPIAS
+            if not anteriores[columna].equals(nuevos_por_id[columna])
+        }
+    else:
+        cambiadas = None # Registros nuevos o borrados: cambian todos los conteos
+
+    if reemplazados.any() or not nuevos.empty:
+        df = pd.concat([df.loc[~reemplazados], nuevos]).sort_values('id', kind='stable', ignore_index=True)
+        for campo in CAMPOS_CRUDOS:
+            df[f'{campo}_crudo'] = df[f'{campo}_crudo'].astype(object).astype('category')
+        _cache['cleaned_df'] = df
+    if cambiadas is None:
+        _cache['graphs'].vaciar()
+    else:
+        _cache['graphs'].conservar({nombre for nombre, columnas in COLUMNAS_GRAFICOS.items() if not columnas & cambiadas})
+    metricas.incrementar('dashboard_df_refrescos_parciales_total')
+    metricas.observar('dashboard_df_refresco_parcial_segundos', time.perf_counter() - inicio)
+    return True
+
+def _rollups():
+    """
+    Totales por día (RollupDiario) y los niveles mensual y anual derivados de ellos, con las
+    mismas columnas de ayuda que el DataFrame limpio. Se leen una vez por versión de los datos
+    sin recorrer los registros.
+    """
+    guardado = _cache['rollups']
+    if guardado is not None and guardado[0] is not None and guardado[0] == _cache['version_datos']:
+        marcar_cache('rollups', True)
+        return guardado[1]
+    marcar_cache('rollups', False)
+
+    with medir('db'):
+        diario = pd.DataFrame(
+            list(RollupDiario.objects.order_by('fecha').values('fecha', *RollupDiario.CAMPOS)),
+            columns=['fecha'] + RollupDiario.CAMPOS,
+        )
+    with medir('agregaciones'):
+        diario['fecha'] = pd.to_datetime(diario['fecha'])
+        diario['ano'] = diario['fecha'].dt.year.astype('int32')
+        diario['mes'] = diario['fecha'].dt.month.astype('int32')
+        rollups = {
+            'diario': diario,
+            'mensual': diario.groupby(['ano', 'mes'], as_index=False)[RollupDiario.CAMPOS].sum(),
+            'anual': diario.groupby('ano', as_index=False)[RollupDiario.CAMPOS].sum(),
+        }
+    _cache['rollups'] = (_cache['version_datos'], rollups)
+    return rollups
+
+def _filas_rollup(rollup, claves):
+    """Filas de un nivel de los rollups con las columnas de obtener_motor().agregar() (total_*)."""
+    filas = rollup[claves].copy()
+    filas['total_registros'] = rollup['registros']
+    for campo in cleaner.aid_fields:
+        filas[f'total_{campo}'] = rollup[campo]
+    filas['total_ayudas'] = rollup[cleaner.aid_fields].sum(axis=1)
+    return filas.to_dict('records')
+
+# --- Datos intermedios compartidos por gráficos y tablas ---
+# Agregaciones del DataFrame limpio que necesitan varios gráficos o vistas; cada una se calcula
+# una vez por versión de los datos (mientras no cambie el DataFrame) y la reutilizan todos
+INTERMEDIOS = GrafoIntermedios()
+# Serializa los cálculos: los gráficos se generan en su hilo y las tablas en el de cada request
+_lock_intermedios = threading.RLock()
+
+def _intermedio(nombre, df_cleaned):
+    """Resultado del intermedio `nombre` para df_cleaned (no modificarlo: es compartido)."""
+    with _lock_intermedios:
+        guardado = _cache['intermedios']
+        if guardado is None or guardado[0] is not df_cleaned:
+            guardado = _cache['intermedios'] = (df_cleaned, {})
+        return INTERMEDIOS.calcular(
+            nombre, df_cleaned, guardado[1],
+            al_calcular=lambda calculado: metricas.incrementar('dashboard_intermedios_calculados_total', intermedio=calculado),
+        )
+
+# Agregaciones del motor analítico (tablas de las vistas geográfica y de eventos, y el mapa)
+CLAVES_AGREGADOS = [
+    ['departamento'],
+    ['departamento', 'distrito'],
+    ['departamento', 'distrito', 'localidad'],
+    ['evento'],
+    ['departamento', 'evento'],
+]
+for _claves in CLAVES_AGREGADOS:
+    INTERMEDIOS.definir(f"agregado_{'_'.join(_claves)}", RAIZ)(
+        lambda df, claves=_claves: obtener_motor().agregar(df, claves)
+    )
+
+def _agregado(df_cleaned, claves):
+    """obtener_motor().agregar(df_cleaned, claves), compartido entre vistas y el mapa."""
+    return _intermedio(f"agregado_{'_'.join(claves)}", df_cleaned)
+
+@INTERMEDIOS.definir('anio', RAIZ)
+def _intermedio_anio(df):
+    """Año de cada registro con fecha (los registros sin fecha no figuran)."""
+    return df['fecha'].dropna().dt.year.rename('AÑO')
+
+@INTERMEDIOS.definir('eventos_por_anio', RAIZ, 'anio')
+def _intermedio_eventos_por_anio(df, anio):
+    """Registros por año (filas) y evento (columnas)."""
+    return df.loc[anio.index, 'evento'].groupby(anio).value_counts().unstack().fillna(0)
+
+@INTERMEDIOS.definir('registros_por_anio_mes', RAIZ, 'anio')
+def _intermedio_registros_por_anio_mes(df, anio):
+    return df.loc[anio.index].groupby([anio, df.loc[anio.index, 'fecha'].dt.month.rename('MES')]).size()
+
+@INTERMEDIOS.definir('registros_por_evento', RAIZ)
+def _intermedio_registros_por_evento(df):
+    return df['evento'].value_counts()
+
+@INTERMEDIOS.definir('ayudas_por_departamento', RAIZ)
+def _intermedio_ayudas_por_departamento(df):
+    """Suma de cada ayuda por departamento."""
+    return df.groupby('departamento')[cleaner.aid_fields].sum()
+
+@INTERMEDIOS.definir('ayudas_por_evento', RAIZ)
+def _intermedio_ayudas_por_evento(df):
+    """Suma de cada ayuda por evento."""
+    return df.groupby('evento')[cleaner.aid_fields].sum()
+
+@INTERMEDIOS.definir('ayudas_por_departamento_anio', RAIZ, 'anio')
+def _intermedio_ayudas_por_departamento_anio(df, anio):
+    """Total de ayudas (todas sumadas) por departamento y año."""
+    con_anio = df.loc[anio.index, ['departamento'] + cleaner.aid_fields]
+    return con_anio.groupby(['departamento', anio])[cleaner.aid_fields].sum().sum(axis=1)
+
+def _grafico_en_cache(graph_name, df_cleaned):
+    """
+    El gráfico si está en caché y no ha expirado (basado en la última actualización del DF);
+    si no, AUSENTE. Registra el acierto en las métricas.
+    """
+    # Los gráficos de los rollups no dependen del DataFrame: valen mientras no cambie la versión de los datos
+    vigente = df_cleaned is not _cache['cleaned_df'] or (time.time() - _cache['last_df_update']) < CACHE_TIMEOUT_SECONDS
+    grafico = _cache['graphs'].obtener(graph_name) if vigente else AUSENTE
+    if grafico is not AUSENTE:
+        marcar_cache(f'grafico-{graph_name}', True)
+        metricas.incrementar('dashboard_cache_graficos_total', resultado='hit')
+    return grafico
+
+def _guardar_grafico(graph_name, graphic):
+    """Guarda el gráfico en la caché en memoria y actualiza sus métricas de tamaño y descartes."""
+    graficos = _cache['graphs']
+    desalojados = graficos.guardar(graph_name, graphic)
+    if desalojados:
+        metricas.incrementar('dashboard_cache_graficos_desalojos_total', desalojados)
+    metricas.fijar('dashboard_cache_graficos_bytes', graficos.bytes)
+    metricas.fijar('dashboard_cache_graficos_entradas', len(graficos))
+
 def _get_cached_graph(graph_name, df_cleaned, graph_generation_func):
     """Función auxiliar para obtener o generar un gráfico con caching."""
-    current_time = time.time()
-    # Si el gráfico está en caché y no ha expirado (basado en la última actualización del DF), lo retornamos
-    if graph_name in _cache['graphs'] and (current_time - _cache['last_df_update']) < CACHE_TIMEOUT_SECONDS:
-        return _cache['graphs'][graph_name]
-        
+    graphic = _grafico_en_cache(graph_name, df_cleaned)
+    if graphic is not AUSENTE:
+        return graphic
+
     # Si no está en caché o ha expirado, lo generamos
-    graphic = graph_generation_func(df_cleaned)
-    _cache['graphs'][graph_name] = graphic
+    marcar_cache(f'grafico-{graph_name}', False)
+    metricas.incrementar('dashboard_cache_graficos_total', resultado='miss')
+    inicio = time.perf_counter()
+    with medir('graficos'):
+        graphic = _ejecutor_graficos.submit(graph_generation_func, df_cleaned).result()
+    metricas.observar('dashboard_grafico_render_segundos', time.perf_counter() - inicio, grafico=graph_name)
+    _guardar_grafico(graph_name, graphic)
     return graphic
 
+def _render(request, template_name, context):
+    """render() midiendo el tiempo de la plantilla; la versión de datos es la clave de los {% cache %}."""
+    context['version_datos'] = _version_datos(request)['etag']
+    with medir('plantilla'):
+        return render(request, template_name, context)
+
+@condicional_por_version
+@respuesta_en_cache
 def dashboard_view(request):
     """Vista principal del dashboard"""
     df_cleaned = _get_cleaned_dataframe()
         
     # Estadísticas generales
-    total_registros = df_cleaned.shape[0]
-    total_departamentos = df_cleaned['departamento'].nunique() if not df_cleaned.empty else 0
-    total_localidades = df_cleaned['localidad'].nunique() if not df_cleaned.empty else 0
+    with medir('agregaciones'):
+        total_registros = df_cleaned.shape[0]
+        total_departamentos = df_cleaned['departamento'].nunique() if not df_cleaned.empty else 0
+        total_localidades = df_cleaned['localidad'].nunique() if not df_cleaned.empty else 0
         
     # Obtener datos para gráficos usando la función de ayuda con caché
-    grafico_ayudas_por_ano = _get_cached_graph('ayudas_por_ano', df_cleaned, generar_grafico_ayudas_por_ano)
+    rollups = _rollups()
+    grafico_ayudas_por_ano = _get_cached_graph('ayudas_por_ano', rollups, generar_grafico_ayudas_por_ano)
     grafico_departamentos = _get_cached_graph('departamentos', df_cleaned, generar_grafico_por_departamento)
     grafico_eventos = _get_cached_graph('eventos', df_cleaned, generar_grafico_por_evento)
-    grafico_tendencia_mensual = _get_cached_graph('tendencia_mensual', df_cleaned, generar_grafico_tendencia_mensual)
+    grafico_tendencia_mensual = _get_cached_graph('tendencia_mensual', rollups, generar_grafico_tendencia_mensual)
 
     # Datos para tablas (usamos el ORM para paginación, pero limpiamos al vuelo)
-    ultimos_registros_raw = AsistenciaHumanitaria.objects.order_by('-fecha')[:10]
-        
-    ultimos_registros_cleaned = []
-    for r in ultimos_registros_raw:
-        # Crear un diccionario a partir de la instancia del modelo para la limpieza
-        record_dict = {field.name: getattr(r, field.name) for field in r._meta.fields}
-        cleaned_record = cleaner.limpiar_registro_completo(record_dict)
+    with medir('db'):
+        ultimos_registros_raw = list(AsistenciaHumanitaria.objects.order_by('-fecha')[:10])
+
+    with medir('limpieza'):
+        ultimos_registros_cleaned = []
+        for r in ultimos_registros_raw:
+            # Crear un diccionario a partir de la instancia del modelo para la limpieza
+            record_dict = {field.name: getattr(r, field.name) for field in r._meta.fields}
+            cleaned_record = cleaner.limpiar_registro_completo(record_dict)
             
-        # Calcular total_ayudas a partir de los campos numéricos limpios
-        cleaned_record['total_ayudas'] = sum(cleaned_record.get(field, 0) for field in cleaner.aid_fields)
-        ultimos_registros_cleaned.append(cleaned_record)
+            # Calcular total_ayudas a partir de los campos numéricos limpios
+            cleaned_record['total_ayudas'] = sum(cleaned_record.get(field, 0) for field in cleaner.aid_fields)
+            ultimos_registros_cleaned.append(cleaned_record)
 
     context = {
         'total_registros': total_registros,
@@ -134,8 +548,10 @@ def dashboard_view(request):
         'ultimos_registros': ultimos_registros_cleaned, # Usamos los registros limpios
     }
         
-    return render(request, 'dashboard/dashboard.html', context)
+    return _render(request, 'dashboard/dashboard.html', context)
 
+@condicional_por_version
+@respuesta_en_cache
 def analisis_geografico_view(request):
     """Vista para análisis geográfico"""
     df_cleaned = _get_cleaned_dataframe()
@@ -145,40 +561,20 @@ def analisis_geografico_view(request):
             'datos_distritos': [],
             'active_section': 'geografico'
         }
-        return render(request, 'dashboard/geografico.html', context)
-    # Estadísticas por departamento
-    datos_departamentos = df_cleaned.groupby('departamento').agg(
-        total_registros=('id', 'count'),
-        total_kit_a=('kit_a', 'sum'),
-        total_kit_b=('kit_b', 'sum'),
-        total_chapa_fibrocemento=('chapa_fibrocemento', 'sum'),
-        total_chapa_zinc=('chapa_zinc', 'sum'),
-        total_colchones=('colchones', 'sum'),
-        total_frazadas=('frazadas', 'sum'),
-        total_terciadas=('terciadas', 'sum'),
-        total_puntales=('puntales', 'sum'),
-        total_carpas_plasticas=('carpas_plasticas', 'sum'),
-    ).reset_index()
-        
-    datos_departamentos['total_ayudas'] = datos_departamentos[[f'total_{field}' for field in cleaner.aid_fields]].sum(axis=1)
-        
-    datos_departamentos = datos_departamentos.sort_values('total_ayudas', ascending=False).to_dict('records')
-    # Estadísticas por distrito
-    datos_distritos = df_cleaned.groupby(['departamento', 'distrito']).agg(
-        total_registros=('id', 'count'),
-        total_kit_a=('kit_a', 'sum'),
-        total_kit_b=('kit_b', 'sum'),
-        total_chapa_fibrocemento=('chapa_fibrocemento', 'sum'),
-        total_chapa_zinc=('chapa_zinc', 'sum'),
-        total_colchones=('colchones', 'sum'),
-        total_frazadas=('frazadas', 'sum'),
-        total_terciadas=('terciadas', 'sum'),
-        total_puntales=('puntales', 'sum'),
-        total_carpas_plasticas=('carpas_plasticas', 'sum'),
-    ).reset_index()
-    datos_distritos['total_ayudas'] = datos_distritos[[f'total_{field}' for field in cleaner.aid_fields]].sum(axis=1)
+        return _render(request, 'dashboard/geografico.html', context)
+    with medir('agregaciones'):
+        # Estadísticas por departamento
+        datos_departamentos = _agregado(df_cleaned, ['departamento'])
         
-    datos_distritos = datos_distritos.sort_values(['departamento', 'total_ayudas'], ascending=[True, False]).to_dict('records')
+        datos_departamentos = datos_departamentos.sort_values('total_ayudas', ascending=False).to_dict('records')
+
+    def datos_distritos():
+        # Estadísticas por distrito: la plantilla llama a esta función solo si el fragmento
+        # 'tabla_distritos' no está en caché
+        with medir('agregaciones'):
+            distritos = _agregado(df_cleaned, ['departamento', 'distrito'])
+            return distritos.sort_values(['departamento', 'total_ayudas'], ascending=[True, False]).to_dict('records')
+
     #para los graficos
     grafico_departamentos = _get_cached_graph('departamentos', df_cleaned, generar_grafico_por_departamento)
     grafico_total_ayudas_departamento = _get_cached_graph('total_ayudas_departamento', df_cleaned, generar_grafico_total_ayudas_departamento)
@@ -198,66 +594,36 @@ def analisis_geografico_view(request):
         'grafico_heatmap_departamento_anio': grafico_heatmap_departamento_anio
     }
         
-    return render(request, 'dashboard/geografico.html', context)
+    return _render(request, 'dashboard/geografico.html', context)
 
+@condicional_por_version
+@respuesta_en_cache
 def analisis_temporal_view(request):
-    """Vista para análisis temporal"""
-    df_cleaned = _get_cleaned_dataframe()
-    if df_cleaned.empty:
+    """Vista para análisis temporal (desde los rollups diarios, sin recorrer los registros)"""
+    rollups = _rollups()
+    if rollups['diario'].empty:
         context = {
             'datos_anuales': [],
             'datos_mensuales': [],
             'active_section': 'temporal'
         }
-        return render(request, 'dashboard/temporal.html', context)
+        return _render(request, 'dashboard/temporal.html', context)
     #Para los graficos
-    grafico_ayudas_mensual = _get_cached_graph('ayudas_mensual', df_cleaned, generar_grafico_ayudas_mensual)
-    grafico_ayudas_por_ano = _get_cached_graph('ayudas_por_ano', df_cleaned, generar_grafico_ayudas_por_ano)
-    grafico_distribucion_anual_ayuda_principal = _get_cached_graph('distribucion_anual_ayuda_principal', df_cleaned, generar_grafico_distribucion_anual_ayuda_principal)
-    grafico_tendencia_mensual = _get_cached_graph('tendencia_mensual', df_cleaned, generar_grafico_tendencia_mensual)
-
-
-    # Asegurar que la columna 'fecha' sea de tipo datetime y no tenga nulos
-    df = df_cleaned.dropna(subset=['fecha']).copy()
-        
-    # Datos por año
-    df['ano'] = df['fecha'].dt.year
-    datos_anuales = df.groupby('ano').agg(
-        total_registros=('id', 'count'),
-        total_kit_a=('kit_a', 'sum'),
-        total_kit_b=('kit_b', 'sum'),
-        total_chapa_fibrocemento=('chapa_fibrocemento', 'sum'),
-        total_chapa_zinc=('chapa_zinc', 'sum'),
-        total_colchones=('colchones', 'sum'),
-        total_frazadas=('frazadas', 'sum'),
-        total_terciadas=('terciadas', 'sum'),
-        total_puntales=('puntales', 'sum'),
-        total_carpas_plasticas=('carpas_plasticas', 'sum'),
-    ).reset_index()
-    datos_anuales['total_ayudas'] = datos_anuales[[f'total_{field}' for field in cleaner.aid_fields]].sum(axis=1)
-        
-    datos_anuales['promedio_mensual'] = datos_anuales['total_registros'] / 12 # Aproximado
-    datos_anuales = datos_anuales.sort_values('ano').to_dict('records')
-    # Datos por mes
-    df['mes'] = df['fecha'].dt.month
-    datos_mensuales = df.groupby(['ano', 'mes']).agg(
-        total_registros=('id', 'count'),
-        total_kit_a=('kit_a', 'sum'),
-        total_kit_b=('kit_b', 'sum'),
-        total_chapa_fibrocemento=('chapa_fibrocemento', 'sum'),
-        total_chapa_zinc=('chapa_zinc', 'sum'),
-        total_colchones=('colchones', 'sum'),
-        total_frazadas=('frazadas', 'sum'),
-        total_terciadas=('terciadas', 'sum'),
-        total_puntales=('puntales', 'sum'),
-        total_carpas_plasticas=('carpas_plasticas', 'sum'),
-    ).reset_index()
-    datos_mensuales['total_ayudas'] = datos_mensuales[[f'total_{field}' for field in cleaner.aid_fields]].sum(axis=1)
-        
-    datos_mensuales = datos_mensuales.sort_values(['ano', 'mes']).to_dict('records')
-    # Añadir el nombre del mes
-    for mes_data in datos_mensuales: # Cambiado 'mes' a 'mes_data' para evitar conflicto con la columna 'mes'
-        mes_data['mes_nombre'] = calendar.month_name[mes_data['mes']].capitalize()
+    grafico_ayudas_mensual = _get_cached_graph('ayudas_mensual', rollups, generar_grafico_ayudas_mensual)
+    grafico_ayudas_por_ano = _get_cached_graph('ayudas_por_ano', rollups, generar_grafico_ayudas_por_ano)
+    grafico_distribucion_anual_ayuda_principal = _get_cached_graph('distribucion_anual_ayuda_principal', rollups, generar_grafico_distribucion_anual_ayuda_principal)
+    grafico_tendencia_mensual = _get_cached_graph('tendencia_mensual', rollups, generar_grafico_tendencia_mensual)
+
+    with medir('agregaciones'):
+        # Datos por año
+        datos_anuales = _filas_rollup(rollups['anual'], ['ano'])
+        for ano_data in datos_anuales:
+            ano_data['promedio_mensual'] = ano_data['total_registros'] / 12 # Aproximado
+        # Datos por mes
+        datos_mensuales = _filas_rollup(rollups['mensual'], ['ano', 'mes'])
+        # Añadir el nombre del mes
+        for mes_data in datos_mensuales: # Cambiado 'mes' a 'mes_data' para evitar conflicto con la columna 'mes'
+            mes_data['mes_nombre'] = calendar.month_name[mes_data['mes']].capitalize()
     context = {
         'datos_anuales': datos_anuales,
         'datos_mensuales': datos_mensuales,
@@ -268,8 +634,10 @@ def analisis_temporal_view(request):
         'grafico_tendencia_mensual': grafico_tendencia_mensual
     }
         
-    return render(request, 'dashboard/temporal.html', context)
+    return _render(request, 'dashboard/temporal.html', context)
 
+@condicional_por_version
+@respuesta_en_cache
 def analisis_eventos_view(request):
     """Vista para análisis por eventos"""
     df_cleaned = _get_cleaned_dataframe()
@@ -279,140 +647,234 @@ def analisis_eventos_view(request):
             'eventos_departamento': [],
             'active_section': 'eventos'
         }
-        return render(request, 'dashboard/eventos.html', context)
-    # Datos por tipo de evento
-    datos_eventos = df_cleaned.groupby('evento').agg(
-        total_registros=('id', 'count'),
-        total_kit_a=('kit_a', 'sum'),
-        total_kit_b=('kit_b', 'sum'),
-        total_chapa_fibrocemento=('chapa_fibrocemento', 'sum'),
-        total_chapa_zinc=('chapa_zinc', 'sum'),
-        total_colchones=('colchones', 'sum'),
-        total_frazadas=('frazadas', 'sum'),
-        total_terciadas=('terciadas', 'sum'),
-        total_puntales=('puntales', 'sum'),
-        total_carpas_plasticas=('carpas_plasticas', 'sum'),
-    ).reset_index()
-    datos_eventos['total_ayudas'] = datos_eventos[[f'total_{field}' for field in cleaner.aid_fields]].sum(axis=1)
+        return _render(request, 'dashboard/eventos.html', context)
+    with medir('agregaciones'):
+        # Datos por tipo de evento
+        datos_eventos = _agregado(df_cleaned, ['evento'])
         
-    datos_eventos = datos_eventos.sort_values('total_registros', ascending=False).to_dict('records')
+        datos_eventos = datos_eventos.sort_values('total_registros', ascending=False).to_dict('records')
+
+    #para los graficos (con la cola en segundo plano, los que faltan quedan pendientes)
+    graficos, pendientes = _graficos_en_segundo_plano(request, df_cleaned)
+
+    def eventos_departamento():
+        # Eventos por departamento: la plantilla llama a esta función solo si el fragmento
+        # 'tabla_eventos_departamento' no está en caché
+        with medir('agregaciones'):
+            por_departamento = _agregado(df_cleaned, ['departamento', 'evento'])
+            return por_departamento.sort_values(['departamento', 'total_registros'], ascending=[True, False]).to_dict('records')
 
-    #para los graficos
-    grafico_eventos = _get_cached_graph('eventos', df_cleaned, generar_grafico_por_evento)
-    grafico_eventos_mayor_ayuda = _get_cached_graph('eventos_mayor_ayuda', df_cleaned, generar_grafico_eventos_mayor_ayuda)
-    grafico_composicion_ayudas_por_evento = _get_cached_graph('composicion_ayudas_por_evento', df_cleaned, generar_grafico_composicion_ayudas_por_evento)
-    grafico_top_eventos_frecuentes_seaborn = _get_cached_graph('top_eventos_frecuentes_seaborn', df_cleaned, generar_grafico_top_eventos_frecuentes_seaborn)
-    grafico_comparacion_eventos_por_anio = _get_cached_graph('comparacion_eventos_por_anio', df_cleaned, generar_grafico_comparacion_eventos_por_anio)
-    grafico_heatmap_eventos_por_anio = _get_cached_graph('heatmap_eventos_por_anio', df_cleaned, generar_grafico_heatmap_eventos_por_anio)
-    grafico_eventos_comunes_total_anio = _get_cached_graph('eventos_comunes_total_anio', df_cleaned, generar_grafico_eventos_comunes_total_anio)
-    grafico_tendencia_mensual_eventos_alternativo = _get_cached_graph('tendencia_mensual_eventos_alternativo', df_cleaned, generar_grafico_tendencia_mensual_eventos_alternativo)
-
-    # Eventos por departamento
-    eventos_departamento = df_cleaned.groupby(['departamento', 'evento']).agg(
-        total_registros=('id', 'count'),
-        total_kit_a=('kit_a', 'sum'),
-        total_kit_b=('kit_b', 'sum'),
-        total_chapa_fibrocemento=('chapa_fibrocemento', 'sum'),
-        total_chapa_zinc=('chapa_zinc', 'sum'),
-        total_colchones=('colchones', 'sum'),
-        total_frazadas=('frazadas', 'sum'),
-        total_terciadas=('terciadas', 'sum'),
-        total_puntales=('puntales', 'sum'),
-        total_carpas_plasticas=('carpas_plasticas', 'sum'),
-    ).reset_index()
-    eventos_departamento['total_ayudas'] = eventos_departamento[[f'total_{field}' for field in cleaner.aid_fields]].sum(axis=1)
-        
-    eventos_departamento = eventos_departamento.sort_values(['departamento', 'total_registros'], ascending=[True, False]).to_dict('records')
     context = {
         'datos_eventos': datos_eventos,
         'eventos_departamento': eventos_departamento,
         'active_section': 'eventos',
-        'grafico_eventos': grafico_eventos,
-        'grafico_eventos_mayor_ayuda': grafico_eventos_mayor_ayuda,
-        'grafico_composicion_ayudas_por_evento': grafico_composicion_ayudas_por_evento,
-        'grafico_top_eventos_frecuentes_seaborn': grafico_top_eventos_frecuentes_seaborn,
-        'grafico_comparacion_eventos_por_anio': grafico_comparacion_eventos_por_anio,
-        'grafico_heatmap_eventos_por_anio': grafico_heatmap_eventos_por_anio,
-        'grafico_eventos_comunes_total_anio': grafico_eventos_comunes_total_anio,
-        'grafico_tendencia_mensual_eventos_alternativo': grafico_tendencia_mensual_eventos_alternativo,
+        'graficos_pendientes': pendientes,
+        **{f'grafico_{nombre}': grafico for nombre, grafico in graficos.items()},
+    }
+
+    response = _render(request, 'dashboard/eventos.html', context)
+    response.graficos_pendientes = bool(pendientes)
+    return response
 
+def _graficos_en_segundo_plano(request, df_cleaned):
+    """
+    ({nombre: imagen}, [pendientes]) de GRAFICOS_EN_SEGUNDO_PLANO. Sin la cola activada se
+    generan aquí como siempre. Con DASHBOARD_GRAFICOS_EN_SEGUNDO_PLANO, los que no están en
+    memoria se buscan en TrabajoGrafico (una consulta) y los que falten se encolan para el
+    comando procesar_graficos: quedan en None y la plantilla muestra un marcador en su lugar.
+    """
+    if not getattr(settings, 'DASHBOARD_GRAFICOS_EN_SEGUNDO_PLANO', False):
+        return {
+            nombre: _get_cached_graph(nombre, df_cleaned, funcion)
+            for nombre, funcion in GRAFICOS_EN_SEGUNDO_PLANO.items()
+        }, []
+
+    graficos = {}
+    for nombre in GRAFICOS_EN_SEGUNDO_PLANO:
+        grafico = _grafico_en_cache(nombre, df_cleaned)
+        if grafico is not AUSENTE:
+            graficos[nombre] = grafico
+    faltantes = [nombre for nombre in GRAFICOS_EN_SEGUNDO_PLANO if nombre not in graficos]
+    if not faltantes:
+        return graficos, []
+    version = _version_datos(request)['etag']
+    trabajos = {
+        trabajo['nombre']: trabajo for trabajo in
+        TrabajoGrafico.objects.filter(nombre__in=faltantes, version_datos=version).values('nombre', 'estado', 'imagen')
     }
-        
-    return render(request, 'dashboard/eventos.html', context)
+    pendientes = []
+    for nombre in faltantes:
+        trabajo = trabajos.get(nombre)
+        if trabajo is not None and trabajo['estado'] == TrabajoGrafico.LISTO:
+            marcar_cache(f'grafico-{nombre}', True)
+            metricas.incrementar('dashboard_graficos_segundo_plano_total', resultado='listo')
+            graficos[nombre] = trabajo['imagen']
+            _guardar_grafico(nombre, trabajo['imagen'])
+        elif trabajo is not None and trabajo['estado'] == TrabajoGrafico.ERROR:
+            # El worker no pudo generarlo: se intenta aquí, como sin la cola
+            graficos[nombre] = _get_cached_graph(nombre, df_cleaned, GRAFICOS_EN_SEGUNDO_PLANO[nombre])
+        else:
+            graficos[nombre] = None
+            pendientes.append(nombre)
+    nuevos = [nombre for nombre in pendientes if nombre not in trabajos]
+    if nuevos:
+        TrabajoGrafico.encolar(nuevos, version)
+        metricas.incrementar('dashboard_graficos_segundo_plano_total', len(nuevos), resultado='encolado')
+    return graficos, pendientes
+
+def _generar_grafico_pendiente(nombre):
+    """Genera un gráfico de GRAFICOS_EN_SEGUNDO_PLANO con los datos actuales (worker y /api/grafico/)."""
+    return _get_cached_graph(nombre, _get_cleaned_dataframe(), GRAFICOS_EN_SEGUNDO_PLANO[nombre])
+
+def _respuesta_grafico(estado, **datos):
+    response = JsonResponse({'estado': estado, **datos})
+    # El estado cambia sin que cambie la versión de los datos: nunca reutilizar una respuesta
+    patch_cache_control(response, no_store=True)
+    return response
+
+def grafico_view(request):
+    """
+    API para que la página de eventos cargue un gráfico pendiente: ?nombre= de
+    GRAFICOS_EN_SEGUNDO_PLANO. Retorna {'estado': 'pendiente'|'listo'|'error', 'imagen'}.
+    Si el worker no lo terminó en DASHBOARD_ESPERA_MAXIMA_GRAFICO segundos (p. ej. porque no
+    está corriendo) o la cola está desactivada, el gráfico se genera en este request.
+    """
+    nombre = request.GET.get('nombre', '')
+    if nombre not in GRAFICOS_EN_SEGUNDO_PLANO:
+        return JsonResponse({'error': f"Gráfico desconocido: '{nombre}'"}, status=400)
+    version = _version_datos(request)['etag']
+    imagen = _grafico_en_cache(nombre, _cache['cleaned_df'])
+    if imagen is not AUSENTE:
+        return _respuesta_grafico(TrabajoGrafico.LISTO, imagen=imagen)
+
+    trabajo = None
+    if getattr(settings, 'DASHBOARD_GRAFICOS_EN_SEGUNDO_PLANO', False):
+        trabajo = TrabajoGrafico.objects.filter(nombre=nombre, version_datos=version).first()
+        if trabajo is None:
+            TrabajoGrafico.encolar([nombre], version)
+            metricas.incrementar('dashboard_graficos_segundo_plano_total', resultado='encolado')
+            return _respuesta_grafico(TrabajoGrafico.PENDIENTE)
+        if trabajo.estado == TrabajoGrafico.LISTO:
+            metricas.incrementar('dashboard_graficos_segundo_plano_total', resultado='listo')
+            return _respuesta_grafico(TrabajoGrafico.LISTO, imagen=trabajo.imagen)
+        if trabajo.estado == TrabajoGrafico.ERROR:
+            return _respuesta_grafico(TrabajoGrafico.ERROR, error=trabajo.error)
+        espera = (timezone.now() - trabajo.creado).total_seconds()
+        if espera < getattr(settings, 'DASHBOARD_ESPERA_MAXIMA_GRAFICO', 60):
+            return _respuesta_grafico(trabajo.estado)
+
+    imagen = _generar_grafico_pendiente(nombre)
+    if trabajo is not None:
+        metricas.incrementar('dashboard_graficos_segundo_plano_total', resultado='generado_en_request')
+        # Si el worker lo tomó mientras tanto, su resultado no se pisa
+        TrabajoGrafico.objects.filter(pk=trabajo.pk, estado=TrabajoGrafico.PENDIENTE).update(
+            estado=TrabajoGrafico.LISTO, imagen=imagen, terminado=timezone.now(),
+        )
+    return _respuesta_grafico(TrabajoGrafico.LISTO, imagen=imagen)
+
+# Claves de agrupación de cada nivel del mapa; los agregados de los tres niveles se calculan
+# juntos una vez por versión de los datos, así acercar el mapa no repite el groupby
+NIVELES_MAPA = {
+    'departamento': ['departamento'],
+    'distrito': ['departamento', 'distrito'],
+    'localidad': ['departamento', 'distrito', 'localidad'],
+}
 
-def datos_mapa_view(request):
-    """API para obtener datos del mapa por departamento - USANDO DATAFRAME LIMPIO"""
-    df_cleaned = _get_cleaned_dataframe()
-    if df_cleaned.empty:
-        return JsonResponse({'departamentos': []})
-    # Agrupar por departamento (ya limpio) y calcular métricas
-    datos_agrupados = df_cleaned.groupby('departamento').agg(
-        total_registros=('id', 'count'),
-        total_kit_a=('kit_a', 'sum'),
-        total_kit_b=('kit_b', 'sum'),
-        total_chapa_fibrocemento=('chapa_fibrocemento', 'sum'),
-        total_chapa_zinc=('chapa_zinc', 'sum'),
-        total_colchones=('colchones', 'sum'),
-        total_frazadas=('frazadas', 'sum'),
-        total_terciadas=('terciadas', 'sum'),
-        total_puntales=('puntales', 'sum'),
-        total_carpas_plasticas=('carpas_plasticas', 'sum'),
-    ).reset_index()
-    datos_agrupados['total_ayudas'] = datos_agrupados[[f'total_{field}' for field in cleaner.aid_fields]].sum(axis=1)
-    # Coordenadas aproximadas de los departamentos de Paraguay
-    coordenadas_departamentos = {
-        'CAPITAL': {'lat': -25.2967, 'lng': -57.6359, 'zoom': 12}, # Asunción con posición más centrada y zoom más cercano
-        'CENTRAL': {'lat': -25.3637, 'lng': -57.4259, 'zoom': 10}, # Central desplazado al este
-        'ALTO PARANÁ': {'lat': -25.5163, 'lng': -54.6436, 'zoom': 9},
-        'ITAPÚA': {'lat': -26.8753, 'lng': -55.9178, 'zoom': 9},
-        'CAAGUAZÚ': {'lat': -25.4669, 'lng': -56.0175, 'zoom': 9},
-        'SAN PEDRO': {'lat': -24.0669, 'lng': -57.0789, 'zoom': 9},
-        'CORDILLERA': {'lat': -25.3219, 'lng': -56.8467, 'zoom': 9},
-        'GUAIRÁ': {'lat': -25.7833, 'lng': -56.4500, 'zoom': 9},
-        'CAAZAPÁ': {'lat': -26.1978, 'lng': -56.3711, 'zoom': 9},
-        'MISIONES': {'lat': -26.8833, 'lng': -57.0833, 'zoom': 9},
-        'PARAGUARÍ': {'lat': -25.6319, 'lng': -57.1456, 'zoom': 9},
-        'ALTO PARAGUAY': {'lat': -20.3167, 'lng': -58.1833, 'zoom': 8},
-        'PDTE. HAYES': {'lat': -23.3500, 'lng': -59.0500, 'zoom': 8},
-        'BOQUERON': {'lat': -22.6833, 'lng': -60.4167, 'zoom': 8},
-        'AMAMBAY': {'lat': -22.5667, 'lng': -56.0333, 'zoom': 9},
-        'CANINDEYÚ': {'lat': -24.1167, 'lng': -55.1667, 'zoom': 9},
-        'CONCEPCIÓN': {'lat': -23.4167, 'lng': -57.4333, 'zoom': 9},
-        'ÑEEMBUCÚ': {'lat': -26.9167, 'lng': -58.2833, 'zoom': 9},
+def _totales_mapa(fila):
+    return {
+        'total_registros': fila['total_registros'],
+        'total_ayudas': fila['total_ayudas'],
+        'total_kits': fila['total_kit_a'] + fila['total_kit_b'],
+        'total_chapa_fibrocemento': fila['total_chapa_fibrocemento'],
+        'total_chapa_zinc': fila['total_chapa_zinc'],
     }
-    resultado = []
-    for index, item in datos_agrupados.iterrows():
-        departamento = item['departamento']
-        coords = coordenadas_departamentos.get(departamento, {'lat': -23.442503, 'lng': -58.443832, 'zoom': 6}) # Default Paraguay
-            
-        resultado.append({
-            'departamento': departamento,
-            'lat': coords['lat'],
-            'lng': coords['lng'],
-            'zoom': coords['zoom'],
-            'total_registros': item['total_registros'],
-            'total_ayudas': item['total_ayudas'],
-            'total_kits': item['total_kit_a'] + item['total_kit_b'],
-            'total_chapa_fibrocemento': item['total_chapa_fibrocemento'],
-            'total_chapa_zinc': item['total_chapa_zinc'],
-        })
+
+def _calcular_agregados_mapa(df_cleaned):
+    """
+    {nivel: {departamento: (puntos, registros sin coordenadas)}}. Cada punto lleva los totales
+    del grupo y sus coordenadas del nomenclátor; los grupos sin ubicación conocida no se dibujan.
+    """
+    nomenclator = cargar_nomenclator()
+    agregados = {}
+    for nivel, claves in NIVELES_MAPA.items():
+        por_departamento = {}
+        for fila in _agregado(df_cleaned, claves).to_dict('records'):
+            departamento = fila['departamento']
+            if nivel == 'departamento':
+                # Sin coordenadas conocidas, el departamento se ubica en el centro del país
+                coordenadas = nomenclator.departamento(departamento) or nomenclator.pais
+            elif nivel == 'distrito':
+                coordenadas = nomenclator.distrito(fila['distrito'], departamento)
+            else:
+                coordenadas = nomenclator.localidad(fila['localidad'], fila['distrito'], departamento)
+            puntos, sin_coordenadas = por_departamento.get(departamento, ([], 0))
+            if coordenadas is None:
+                sin_coordenadas += fila['total_registros']
+            else:
+                puntos.append({**{clave: fila[clave] for clave in claves}, **coordenadas, **_totales_mapa(fila)})
+            por_departamento[departamento] = (puntos, sin_coordenadas)
+        agregados[nivel] = por_departamento
+    return agregados
+
+def _agregados_mapa():
+    """Agregados del mapa de todos los niveles; se recalculan solo cuando cambia el DataFrame limpio."""
+    df_cleaned = _get_cleaned_dataframe()
+    guardado = _cache['agregados_mapa']
+    if guardado is None or guardado[0] is not df_cleaned:
+        marcar_cache('agregados-mapa', False)
+        with medir('agregaciones'):
+            guardado = (df_cleaned, _calcular_agregados_mapa(df_cleaned) if not df_cleaned.empty else {})
+        _cache['agregados_mapa'] = guardado
+    else:
+        marcar_cache('agregados-mapa', True)
+    return guardado[1]
+
+@condicional_por_version
+async def datos_mapa_view(request):
+    """API para obtener datos del mapa por departamento - USANDO DATAFRAME LIMPIO"""
+    # La carga del DataFrame y la agregación corren en un hilo, fuera del event loop
+    agregados = await sync_to_async(_agregados_mapa)()
+    resultado = [
+        punto for puntos, _ in agregados.get('departamento', {}).values() for punto in puntos
+    ]
     return JsonResponse({'departamentos': resultado})
 
-def generar_grafico_ayudas_por_ano(df_cleaned):
-    """Genera gráfico de distribución de ayudas por año - USANDO DATAFRAME LIMPIO"""
-    if df_cleaned.empty:
+@condicional_por_version
+async def datos_mapa_detalle_view(request):
+    """API del mapa por distrito o localidad (?nivel=); ?departamento= devuelve solo el departamento que se acercó"""
+    nivel = request.GET.get('nivel', 'distrito')
+    if nivel not in NIVELES_MAPA or nivel == 'departamento':
+        return JsonResponse({'error': 'nivel debe ser distrito o localidad'}, status=400)
+    departamento = request.GET.get('departamento')
+
+    agregados = await sync_to_async(_agregados_mapa)()
+    por_departamento = agregados.get(nivel, {})
+    if departamento:
+        grupos = [por_departamento.get(departamento, ([], 0))]
+    else:
+        grupos = por_departamento.values()
+    puntos = [punto for puntos, _ in grupos for punto in puntos]
+    sin_coordenadas = sum(sin_coordenadas for _, sin_coordenadas in grupos)
+    # Registros según la precisión de sus coordenadas: el nomenclátor tiene pocas localidades,
+    # así que en el nivel localidad la mayoría se ubica en el centro de su distrito
+    por_precision = {}
+    for punto in puntos:
+        por_precision[punto['precision']] = por_precision.get(punto['precision'], 0) + punto['total_registros']
+    por_precision['sin_coordenadas'] = sin_coordenadas
+    return JsonResponse({
+        'nivel': nivel,
+        'puntos': puntos,
+        'registros_sin_coordenadas': sin_coordenadas,
+        'registros_por_precision': por_precision,
+    })
+
+def generar_grafico_ayudas_por_ano(rollups):
+    """Genera gráfico de distribución de ayudas por año - DESDE LOS ROLLUPS ANUALES"""
+    if rollups['anual'].empty:
         return crear_grafico_sin_datos("No hay datos disponibles para mostrar ayudas por año")
         
-    df = df_cleaned.copy() # Trabajar con una copia
-        
-    # Extraer año de la fecha limpia
-    df['AÑO'] = df['fecha'].dt.year
-        
-    # Columnas de ayudas (ya limpias y numéricas por _get_cleaned_dataframe)
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns] # Asegurarse de que las columnas existan
-        
-    # Agrupar por año y sumar ayudas
-    df_grouped = df.groupby('AÑO')[ayudas].sum()
+    # Totales por año ya agregados (RollupDiario)
+    df_grouped = rollups['anual'].set_index('ano').rename_axis('AÑO')[cleaner.aid_fields]
     if df_grouped.empty:
         return crear_grafico_sin_datos("No hay datos agrupados por año para mostrar ayudas.")
         
@@ -457,13 +919,8 @@ def generar_grafico_por_departamento(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles por departamento")
         
-    df = df_cleaned.copy() # Trabajar con una copia
-        
-    # Columnas de ayudas
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-        
-    # Agrupar por departamento (ya limpio) y sumar ayudas
-    df_grouped = df.groupby('departamento')[ayudas].sum().reset_index()
+    # Ayudas sumadas por departamento (ya limpio)
+    df_grouped = _intermedio('ayudas_por_departamento', df_cleaned).reset_index()
     if df_grouped.empty:
         return crear_grafico_sin_datos("No hay datos agrupados por departamento.")
         
@@ -512,10 +969,8 @@ def generar_grafico_por_evento(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles por evento")
             
-    df = df_cleaned.copy() # Trabajar con una copia
-            
-    # Agrupar por evento (ya limpio) y contar
-    df_grouped = df.groupby('evento').size().reset_index(name='total')
+    # Registros por evento (ya limpio)
+    df_grouped = _intermedio('registros_por_evento', df_cleaned).sort_index().rename_axis('evento').reset_index(name='total')
     if df_grouped.empty:
         return crear_grafico_sin_datos("No hay datos agrupados por evento.")
     
@@ -582,31 +1037,14 @@ def generar_grafico_por_evento(df_cleaned):
     graphic = base64.b64encode(image_png)
     return graphic.decode('utf-8')
 
-def generar_grafico_tendencia_mensual(df_cleaned):
-    """Genera gráfico de tendencia mensual - USANDO DATAFRAME LIMPIO"""
-    if df_cleaned.empty:
+def generar_grafico_tendencia_mensual(rollups):
+    """Genera gráfico de tendencia mensual - DESDE LOS ROLLUPS MENSUALES"""
+    if rollups['mensual'].empty:
         return crear_grafico_sin_datos("No hay datos disponibles para tendencia mensual")
         
-    df = df_cleaned.copy() # Trabajar con una copia
-        
-    # Asegurar que la columna 'fecha' sea de tipo datetime y no tenga nulos
-    df = df.dropna(subset=['fecha'])
-        
-    # Si después de eliminar NaNs, el DataFrame se vuelve vacío, retornar gráfico sin datos
-    if df.empty:
-        return crear_grafico_sin_datos("No hay datos de fecha válidos para tendencia mensual")
-    # Extraer mes y año de la fecha limpia
-    df['mes'] = df['fecha'].dt.month
-    df['ano'] = df['fecha'].dt.year
-        
-    # Agrupar por año y mes y contar registros
-    df_grouped = df.groupby(['ano', 'mes']).size().reset_index(name='total_registros')
-    if df_grouped.empty:
-        return crear_grafico_sin_datos("No hay datos agrupados por mes/año para tendencia mensual.")
-        
-    # Si df_grouped está vacío después de agrupar
-    if df_grouped.empty:
-        return crear_grafico_sin_datos("No hay datos agrupados por mes/año para tendencia mensual")
+    # Registros por año y mes ya agregados (RollupDiario)
+    df_grouped = rollups['mensual'][['ano', 'mes']].copy()
+    df_grouped['total_registros'] = rollups['mensual']['registros']
     # CORRECCIÓN: Usar un diccionario con las claves 'year', 'month', 'day'
     df_grouped['fecha_plot'] = pd.to_datetime({
         'year': df_grouped['ano'],
@@ -646,24 +1084,14 @@ def generar_grafico_tendencia_mensual(df_cleaned):
 import logging
 logger = logging.getLogger(__name__)
 
-def generar_grafico_ayudas_mensual(df_cleaned):
-    """Genera gráfico de distribución mensual de ayudas humanitarias (barras apiladas)."""
+def generar_grafico_ayudas_mensual(rollups):
+    """Genera gráfico de distribución mensual de ayudas humanitarias (barras apiladas) desde los rollups mensuales."""
 
-    if df_cleaned.empty:
+    if rollups['mensual'].empty:
         return crear_grafico_sin_datos("No hay datos disponibles para la distribución mensual de ayudas.")
 
-    df = df_cleaned.copy()
-
-    df = df.dropna(subset=['fecha'])
-
-    if df.empty:
-        return crear_grafico_sin_datos("No hay datos de fecha válidos.")
-
-    df['MES'] = df['fecha'].dt.month
-
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-
-    plot_data = df.groupby('MES')[ayudas].sum()
+    # Suma de cada mes del año sobre todos los años
+    plot_data = rollups['mensual'].groupby('mes')[cleaner.aid_fields].sum().rename_axis('MES')
 
     if plot_data.empty:
         return crear_grafico_sin_datos("No hay datos agrupados por mes para la distribución mensual de ayudas.")
@@ -728,15 +1156,8 @@ def generar_grafico_total_ayudas_departamento(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para el total de ayudas por departamento.")
     
-    df = df_cleaned.copy()
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-
-    # Asegurarse de que las columnas de ayuda sean numéricas
-    for field in ayudas:
-        df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
-
     # Sumar todas las ayudas por departamento
-    df_grouped = df.groupby('departamento')[ayudas].sum().sum(axis=1).sort_values(ascending=False)
+    df_grouped = _intermedio('ayudas_por_departamento', df_cleaned).sum(axis=1).sort_values(ascending=False)
     if df_grouped.empty:
         return crear_grafico_sin_datos("No hay datos agrupados para el total de ayudas por departamento.")
 
@@ -835,22 +1256,13 @@ def generar_grafico_correlacion_ayudas(df_cleaned):
     plt.close()
     return base64.b64encode(image_png).decode('utf-8')
 
-def generar_grafico_distribucion_anual_ayuda_principal(df_cleaned):
-    """Genera gráfico de distribución anual de la ayuda principal."""
-    if df_cleaned.empty:
+def generar_grafico_distribucion_anual_ayuda_principal(rollups):
+    """Genera gráfico de distribución anual de la ayuda principal desde los rollups anuales."""
+    if rollups['anual'].empty:
         return crear_grafico_sin_datos("No hay datos disponibles para la distribución anual de ayuda principal.")
     
-    df = df_cleaned.copy()
-    df = df.dropna(subset=['fecha'])
-    if df.empty:
-        return crear_grafico_sin_datos("No hay datos de fecha válidos para la distribución anual de ayuda principal.")
-
-    df['AÑO'] = df['fecha'].dt.year
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-
-    # Asegurarse de que las columnas de ayuda sean numéricas
-    for field in ayudas:
-        df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
+    df = rollups['anual'].set_index('ano').rename_axis('AÑO')
+    ayudas = cleaner.aid_fields
 
     total_ayudas_por_tipo = df[ayudas].sum().sort_values(ascending=False)
     if total_ayudas_por_tipo.empty:
@@ -861,7 +1273,7 @@ def generar_grafico_distribucion_anual_ayuda_principal(df_cleaned):
     # No es necesario un check de empty aquí si ya se hizo en total_ayudas_por_tipo.empty
 
     fig, ax = plt.subplots(figsize=(10, 6)) # Ajustado el tamaño para un solo gráfico
-    df.groupby('AÑO')[ayuda_principal].sum().plot(
+    df[ayuda_principal].plot(
         kind='line', marker='o', color='skyblue', linewidth=2.5, ax=ax) # Usar un color específico
 
     plt.title(f'Distribución Anual de {ayuda_principal}')
@@ -882,26 +1294,19 @@ def generar_grafico_evolucion_ayudas_top_departamentos(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para la evolución de ayudas por departamento.")
     
-    df = df_cleaned.copy()
-    df = df.dropna(subset=['fecha'])
-    if df.empty:
+    anio = _intermedio('anio', df_cleaned)
+    if anio.empty:
         return crear_grafico_sin_datos("No hay datos de fecha válidos para la evolución de ayudas por departamento.")
 
-    df['AÑO'] = df['fecha'].dt.year
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-
-    # Asegurarse de que las columnas de ayuda sean numéricas
-    for field in ayudas:
-        df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
-
-    # Preparar datos
-    top_deptos = df['departamento'].value_counts().nlargest(5).index
-    df_top = df[df['departamento'].isin(top_deptos)]
+    # Preparar datos: los 5 departamentos con más registros con fecha
+    top_deptos = df_cleaned.loc[anio.index, 'departamento'].value_counts().nlargest(5).index
+    por_departamento_anio = _intermedio('ayudas_por_departamento_anio', df_cleaned)
+    df_top = por_departamento_anio[por_departamento_anio.index.get_level_values('departamento').isin(top_deptos)]
     
     if df_top.empty:
         return crear_grafico_sin_datos("No hay datos para los top 5 departamentos.")
 
-    pivot_data = df_top.groupby(['AÑO', 'departamento'])[ayudas].sum().sum(axis=1).unstack()
+    pivot_data = df_top.unstack('departamento')
     if pivot_data.empty:
         return crear_grafico_sin_datos("No hay datos pivotados para la evolución de ayudas por departamento.")
 
@@ -949,19 +1354,10 @@ def generar_grafico_heatmap_departamento_anio(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para el heatmap de departamento por año.")
     
-    df = df_cleaned.copy()
-    df = df.dropna(subset=['fecha'])
-    if df.empty:
+    if _intermedio('anio', df_cleaned).empty:
         return crear_grafico_sin_datos("No hay datos de fecha válidos para el heatmap de departamento por año.")
 
-    df['AÑO'] = df['fecha'].dt.year
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-
-    # Asegurarse de que las columnas de ayuda sean numéricas
-    for field in ayudas:
-        df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
-
-    heatmap_data = df.groupby(['departamento', 'AÑO'])[ayudas].sum().sum(axis=1).unstack().fillna(0)
+    heatmap_data = _intermedio('ayudas_por_departamento_anio', df_cleaned).unstack().fillna(0)
     if heatmap_data.empty:
         return crear_grafico_sin_datos("No hay datos para el heatmap de departamento por año.")
 
@@ -987,14 +1383,7 @@ def generar_grafico_eventos_mayor_ayuda(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para eventos con mayor ayuda.")
     
-    df = df_cleaned.copy()
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-
-    # Asegurarse de que las columnas de ayuda sean numéricas
-    for field in ayudas:
-        df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
-
-    evento_ayudas = df.groupby('evento')[ayudas].sum().sum(axis=1).nlargest(5)
+    evento_ayudas = _intermedio('ayudas_por_evento', df_cleaned).sum(axis=1).nlargest(5)
     if evento_ayudas.empty:
         return crear_grafico_sin_datos("No hay datos de eventos para determinar los eventos con mayor ayuda.")
 
@@ -1024,20 +1413,11 @@ def generar_grafico_composicion_ayudas_por_evento(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para la composición de ayudas por evento.")
     
-    df = df_cleaned.copy()
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-
-    # Asegurarse de que las columnas de ayuda sean numéricas
-    for field in ayudas:
-        df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
-
-    top_5_eventos = df['evento'].value_counts().nlargest(5).index
-    df_top_events = df[df['evento'].isin(top_5_eventos)]
-
-    if df_top_events.empty:
+    top_5_eventos = _intermedio('registros_por_evento', df_cleaned).nlargest(5).index
+    if top_5_eventos.empty:
         return crear_grafico_sin_datos("No hay datos suficientes para la composición de ayudas por evento.")
 
-    event_aid_composition = df_top_events.groupby('evento')[ayudas].sum()
+    event_aid_composition = _intermedio('ayudas_por_evento', df_cleaned).loc[top_5_eventos.sort_values()]
     
     # Manejar el caso donde la suma de ayudas por evento es cero para evitar división por cero
     sum_axis_1 = event_aid_composition.sum(axis=1)
@@ -1079,8 +1459,7 @@ def generar_grafico_top_eventos_frecuentes_seaborn(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para los top eventos frecuentes (Seaborn).")
     
-    df = df_cleaned.copy()
-    event_counts = df['evento'].value_counts().nlargest(5)
+    event_counts = _intermedio('registros_por_evento', df_cleaned).nlargest(5)
     if event_counts.empty:
         return crear_grafico_sin_datos("No hay datos de eventos para determinar los top eventos frecuentes (Seaborn).")
 
@@ -1115,19 +1494,10 @@ def generar_grafico_comparacion_eventos_por_anio(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para la comparación de eventos por año.")
     
-    df = df_cleaned.copy()
-    df = df.dropna(subset=['fecha'])
-    if df.empty:
+    if _intermedio('anio', df_cleaned).empty:
         return crear_grafico_sin_datos("No hay datos de fecha válidos para la comparación de eventos por año.")
 
-    df['AÑO'] = df['fecha'].dt.year
-    ayudas = [col for col in cleaner.aid_fields if col in df.columns]
-
-    # Asegurarse de que las columnas de ayuda sean numéricas
-    for field in ayudas:
-        df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
-
-    eventos_por_anio = df.groupby('AÑO')['evento'].value_counts().unstack().fillna(0)
+    eventos_por_anio = _intermedio('eventos_por_anio', df_cleaned)
     
     if eventos_por_anio.empty:
         return crear_grafico_sin_datos("No hay datos de eventos por año para comparar.")
@@ -1173,13 +1543,10 @@ def generar_grafico_heatmap_eventos_por_anio(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para el heatmap de eventos por año.")
     
-    df = df_cleaned.copy()
-    df = df.dropna(subset=['fecha'])
-    if df.empty:
+    if _intermedio('anio', df_cleaned).empty:
         return crear_grafico_sin_datos("No hay datos de fecha válidos para el heatmap de eventos por año.")
 
-    df['AÑO'] = df['fecha'].dt.year
-    eventos_por_anio = df.groupby('AÑO')['evento'].value_counts().unstack().fillna(0)
+    eventos_por_anio = _intermedio('eventos_por_anio', df_cleaned)
 
     if eventos_por_anio.empty:
         return crear_grafico_sin_datos("No hay datos de eventos por año para el heatmap.")
@@ -1210,13 +1577,10 @@ def generar_grafico_eventos_comunes_total_anio(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para el embudo de eventos por año.")
     
-    df = df_cleaned.copy()
-    df = df.dropna(subset=['fecha'])
-    if df.empty:
+    if _intermedio('anio', df_cleaned).empty:
         return crear_grafico_sin_datos("No hay datos de fecha válidos para el embudo de eventos por año.")
 
-    df['AÑO'] = df['fecha'].dt.year
-    eventos_por_anio = df.groupby('AÑO')['evento'].value_counts().unstack().fillna(0)
+    eventos_por_anio = _intermedio('eventos_por_anio', df_cleaned)
 
     if eventos_por_anio.empty:
         return crear_grafico_sin_datos("No hay datos de eventos por año para el embudo.")
@@ -1261,16 +1625,11 @@ def generar_grafico_tendencia_mensual_eventos_alternativo(df_cleaned):
     if df_cleaned.empty:
         return crear_grafico_sin_datos("No hay datos disponibles para la tendencia mensual de eventos.")
     
-    df = df_cleaned.copy()
-    df = df.dropna(subset=['fecha'])
-    if df.empty:
+    if _intermedio('anio', df_cleaned).empty:
         return crear_grafico_sin_datos("No hay datos de fecha válidos para la tendencia mensual de eventos.")
 
-    df['MES'] = df['fecha'].dt.month
-    df['AÑO'] = df['fecha'].dt.year
-
-    # Agrupar por año y mes y contar eventos
-    eventos_por_mes_anio = df.groupby(['AÑO', 'MES']).size().reset_index(name='total_eventos')
+    # Eventos por año y mes
+    eventos_por_mes_anio = _intermedio('registros_por_anio_mes', df_cleaned).reset_index(name='total_eventos')
     if eventos_por_mes_anio.empty:
         return crear_grafico_sin_datos("No hay datos agrupados por mes/año para la tendencia de eventos.")
 
@@ -1310,19 +1669,55 @@ def generar_grafico_tendencia_mensual_eventos_alternativo(df_cleaned):
     return base64.b64encode(image_png).decode('utf-8')
 
 
-def datos_tabla_view(request):
-    """API para obtener datos de la tabla con paginación"""
-    page = int(request.GET.get('page', 1))
-    per_page = int(request.GET.get('per_page', 10))
+# Gráficos de la página de eventos que pueden generarse en segundo plano (comando procesar_graficos)
+GRAFICOS_EN_SEGUNDO_PLANO = {
+    'eventos': generar_grafico_por_evento,
+    'eventos_mayor_ayuda': generar_grafico_eventos_mayor_ayuda,
+    'composicion_ayudas_por_evento': generar_grafico_composicion_ayudas_por_evento,
+    'top_eventos_frecuentes_seaborn': generar_grafico_top_eventos_frecuentes_seaborn,
+    'comparacion_eventos_por_anio': generar_grafico_comparacion_eventos_por_anio,
+    'heatmap_eventos_por_anio': generar_grafico_heatmap_eventos_por_anio,
+    'eventos_comunes_total_anio': generar_grafico_eventos_comunes_total_anio,
+    'tendencia_mensual_eventos_alternativo': generar_grafico_tendencia_mensual_eventos_alternativo,
+}
+
+def _filtros_fecha(params):
+    """
+    Filtros del ORM para desde/hasta (AAAA-MM-DD, inclusive). Comparan la columna fecha con
+    constantes, así PostgreSQL lee solo las particiones de esos años (ver particionar_tabla).
+    Lanza ValueError si alguna fecha no es válida.
+    """
+    filtros = {}
+    for parametro, lookup in (('desde', 'fecha__gte'), ('hasta', 'fecha__lte')):
+        if params.get(parametro):
+            filtros[lookup] = datetime.datetime.strptime(params[parametro], '%Y-%m-%d').date()
+    return filtros
+
+MAX_REGISTROS_POR_PAGINA = 100
+
+async def datos_tabla_view(request):
+    """API para obtener datos de la tabla con paginación (ORM async); ?desde= / ?hasta= filtran por fecha en la base"""
+    try:
+        page = int(request.GET.get('page', 1))
+        per_page = int(request.GET.get('per_page', 10))
+    except ValueError:
+        return JsonResponse({'error': 'page y per_page deben ser números enteros'}, status=400)
+    if page < 1 or per_page < 1:
+        return JsonResponse({'error': 'page y per_page deben ser mayores que cero'}, status=400)
+    per_page = min(per_page, MAX_REGISTROS_POR_PAGINA)
+    try:
+        filtros_fecha = _filtros_fecha(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Las fechas deben tener el formato AAAA-MM-DD'}, status=400)
         
     start = (page - 1) * per_page
     end = start + per_page
         
-    registros_raw = AsistenciaHumanitaria.objects.all().order_by('-fecha')
-    total = registros_raw.count()
+    registros_raw = AsistenciaHumanitaria.objects.filter(**filtros_fecha).order_by('-fecha')
+    total = await registros_raw.acount()
         
     data = []
-    for registro in registros_raw[start:end]:
+    async for registro in registros_raw[start:end]:
         # Create a dictionary from the model instance for cleaning
         record_dict = {field.name: getattr(registro, field.name) for field in registro._meta.fields}
         cleaned_record = cleaner.limpiar_registro_completo(record_dict)
@@ -1348,6 +1743,221 @@ def datos_tabla_view(request):
         'total_pages': (total + per_page - 1) // per_page
     })
 
+COLUMNAS_EXPORTACION = [
+    'id', 'fecha', 'localidad', 'distrito', 'departamento', 'evento',
+    'kit_b', 'kit_a', 'chapa_fibrocemento', 'chapa_zinc', 'colchones',
+    'frazadas', 'terciadas', 'puntales', 'carpas_plasticas'
+]
+COLUMNAS_TEXTO_EXPORTACION = {'localidad', 'distrito', 'departamento', 'evento'}
+FILAS_POR_BLOQUE_EXPORTACION = 5000
+
+def _filtrar_dataframe(df_cleaned, params):
+    """
+    Filtra el DataFrame limpio por departamento, evento y rango de fechas (desde/hasta, AAAA-MM-DD).
+    Lanza ValueError si alguna fecha no es válida.
+    """
+    if df_cleaned.empty:
+        return df_cleaned
+    mascara = pd.Series(True, index=df_cleaned.index)
+    if params.get('departamento'):
+        mascara &= df_cleaned['departamento'] == params['departamento'].strip().upper()
+    if params.get('evento'):
+        mascara &= df_cleaned['evento'] == params['evento'].strip().upper()
+    if params.get('desde'):
+        mascara &= df_cleaned['fecha'] >= pd.to_datetime(params['desde'], format='%Y-%m-%d')
+    if params.get('hasta'):
+        mascara &= df_cleaned['fecha'] <= pd.to_datetime(params['hasta'], format='%Y-%m-%d')
+    return df_cleaned[mascara]
+
+def _generar_csv(df, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """Genera el CSV por bloques para no construir la respuesta completa en memoria."""
+    if df.empty:
+        # Sin filas que exportar, igual se envía la cabecera
+        yield df.to_csv(index=False)
+        return
+    for inicio in range(0, len(df), filas_por_bloque):
+        yield df.iloc[inicio:inicio + filas_por_bloque].to_csv(
+            index=False, header=(inicio == 0), date_format='%Y-%m-%d'
+        )
+
+def _escribir_parquet(df, destino, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """Escribe el DataFrame como Parquet en `destino`, un row group por bloque."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Esquema explícito: inferido de un DataFrame vacío, las columnas de texto quedan como `null`
+    tipos = {'id': pa.int64(), 'fecha': pa.date32()}
+    esquema = pa.schema([
+        (col, tipos.get(col, pa.string() if col in COLUMNAS_TEXTO_EXPORTACION else pa.int64()))
+        for col in df.columns
+    ])
+    with pq.ParquetWriter(destino, esquema) as writer:
+        for inicio in range(0, len(df), filas_por_bloque):
+            bloque = df.iloc[inicio:inicio + filas_por_bloque]
+            writer.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+
+def _dataframe_exportacion(params):
+    """
+    DataFrame limpio y filtrado a exportar. Con el DataFrame completo en caché se filtra en
+    memoria; si no, el rango de fechas se aplica en la base y solo se leen y limpian esos registros.
+    """
+    filtros_fecha = _filtros_fecha(params)
+    en_cache = _cache['cleaned_df'] is not None and (time.time() - _cache['last_df_update']) < CACHE_TIMEOUT_SECONDS
+    if en_cache or not filtros_fecha:
+        return _filtrar_dataframe(_get_cleaned_dataframe(), params)
+
+    marcar_cache('df', False)
+    with medir('db'):
+        df = _leer_registros(AsistenciaHumanitaria.objects.filter(**filtros_fecha).order_by('id'))
+    if not df.empty:
+        with medir('limpieza'):
+            _limpiar_registros(df)
+    return _filtrar_dataframe(df, params)
+
+def exportar_datos_view(request):
+    """API para exportar los datos limpios filtrados como CSV (streaming) o Parquet"""
+    formato = request.GET.get('formato', 'csv').lower()
+    if formato not in ('csv', 'parquet'):
+        return JsonResponse({'error': "Formato no soportado, use 'csv' o 'parquet'"}, status=400)
+
+    try:
+        df = _dataframe_exportacion(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Las fechas deben tener el formato AAAA-MM-DD'}, status=400)
+    df = df[[col for col in COLUMNAS_EXPORTACION if col in df.columns]]
+
+    if formato == 'csv':
+        response = StreamingHttpResponse(_generar_csv(df), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="asistencias.csv"'
+        return response
+
+    try:
+        import pyarrow # noqa: F401
+    except ImportError:
+        return JsonResponse({'error': 'La exportación a Parquet requiere pyarrow'}, status=501)
+
+    # El archivo temporal se elimina al cerrarse la respuesta
+    archivo = tempfile.TemporaryFile()
+    _escribir_parquet(df, archivo)
+    archivo.seek(0)
+    return FileResponse(archivo, as_attachment=True, filename='asistencias.parquet',
+                        content_type='application/vnd.apache.parquet')
+
+CAMPOS_BUSQUEDA = ['localidad', 'distrito', 'departamento']
+MIN_CARACTERES_BUSQUEDA = 2
+MAX_RESULTADOS_BUSQUEDA = 50
+
+def _indice_busqueda():
+    """Índice de trigramas sobre los valores distintos del DataFrame limpio; se rearma cuando éste cambia."""
+    df_cleaned = _get_cleaned_dataframe()
+    guardado = _cache['indice_busqueda']
+    if guardado is None or guardado[0] is not df_cleaned:
+        marcar_cache('indice-busqueda', False)
+        guardado = (df_cleaned, IndiceNgramas.desde_dataframe(df_cleaned, CAMPOS_BUSQUEDA))
+        _cache['indice_busqueda'] = guardado
+    else:
+        marcar_cache('indice-busqueda', True)
+    return guardado[1]
+
+def _buscar_postgres(consulta, campos, limite):
+    """
+    Busca con ILIKE sobre las columnas crudas (trgm_icontains, resuelto con los índices GIN de
+    pg_trgm) y limpia los valores encontrados, sumando los registros de variantes que quedan iguales.
+    """
+    encontrados = {}
+    for campo in campos:
+        limpiar = cleaner.limpiar_departamento if campo == 'departamento' else cleaner.limpiar_texto
+        filas = (AsistenciaHumanitaria.objects.filter(**{f'{campo}__trgm_icontains': consulta})
+                 .values(campo).annotate(registros=Count('id')).order_by('-registros')[:limite * 5])
+        for fila in filas:
+            clave = (campo, limpiar(fila[campo]))
+            encontrados[clave] = encontrados.get(clave, 0) + fila['registros']
+    # Mismo orden que el índice en memoria (prefijo, similitud, registros)
+    return IndiceNgramas(
+        (campo, valor, registros) for (campo, valor), registros in encontrados.items()
+    ).buscar(consulta, limite=limite)
+
+@condicional_por_version
+def buscar_view(request):
+    """API de búsqueda por texto (typeahead) de localidades, distritos y departamentos limpios"""
+    consulta = request.GET.get('q', '').strip()
+    campo = request.GET.get('campo')
+    if campo and campo not in CAMPOS_BUSQUEDA:
+        return JsonResponse({'error': f"campo debe ser uno de: {', '.join(CAMPOS_BUSQUEDA)}"}, status=400)
+    try:
+        limite = min(max(int(request.GET.get('limite', 10)), 1), MAX_RESULTADOS_BUSQUEDA)
+    except ValueError:
+        return JsonResponse({'error': 'limite debe ser un número entero'}, status=400)
+
+    campos = [campo] if campo else CAMPOS_BUSQUEDA
+    if len(normalizar(consulta)) < MIN_CARACTERES_BUSQUEDA:
+        resultados = []
+    elif connection.vendor == 'postgresql':
+        with medir('db'):
+            resultados = _buscar_postgres(consulta, campos, limite)
+    else:
+        indice = _indice_busqueda()
+        with medir('busqueda'):
+            resultados = indice.buscar(consulta, campos=campos, limite=limite)
+    return JsonResponse({'q': consulta, 'resultados': resultados})
+
+def _indice_totales():
+    """Sumas acumuladas por día (total, departamento y evento); se rearman cuando cambia el DataFrame limpio."""
+    df_cleaned = _get_cleaned_dataframe()
+    guardado = _cache['sumas_acumuladas']
+    if guardado is None or guardado[0] is not df_cleaned:
+        marcar_cache('sumas-acumuladas', False)
+        with medir('agregaciones'):
+            guardado = (df_cleaned, IndiceSumasAcumuladas(df_cleaned, cleaner.aid_fields))
+        _cache['sumas_acumuladas'] = guardado
+        metricas.fijar('dashboard_sumas_acumuladas_bytes', guardado[1].bytes)
+    else:
+        marcar_cache('sumas-acumuladas', True)
+    return guardado[1]
+
+def _con_total_ayudas(totales):
+    totales['total_ayudas'] = sum(totales[campo] for campo in cleaner.aid_fields)
+    return totales
+
+@condicional_por_version
+def totales_view(request):
+    """
+    API de totales (registros y cada ayuda) de un rango de fechas: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD
+    (inclusive; cualquiera puede omitirse) y opcionalmente ?por=departamento|evento.
+    Cada consulta se responde con dos lecturas del índice de sumas acumuladas.
+    """
+    fechas = {}
+    for parametro in ('desde', 'hasta'):
+        valor = request.GET.get(parametro)
+        try:
+            fechas[parametro] = datetime.date.fromisoformat(valor) if valor else None
+        except ValueError:
+            return JsonResponse({'error': f'{parametro} debe ser una fecha AAAA-MM-DD'}, status=400)
+    if fechas['desde'] and fechas['hasta'] and fechas['desde'] > fechas['hasta']:
+        return JsonResponse({'error': 'desde no puede ser posterior a hasta'}, status=400)
+    por = request.GET.get('por')
+    if por and por not in DIMENSIONES:
+        return JsonResponse({'error': f"por debe ser uno de: {', '.join(DIMENSIONES)}"}, status=400)
+
+    indice = _indice_totales()
+    with medir('agregaciones'):
+        respuesta = {
+            'desde': fechas['desde'],
+            'hasta': fechas['hasta'],
+            'totales': _con_total_ayudas(indice.totales(fechas['desde'], fechas['hasta'])),
+        }
+        if por:
+            respuesta['por'] = por
+            respuesta['grupos'] = [
+                {por: valor, **_con_total_ayudas(totales)}
+                for valor, totales in indice.totales(fechas['desde'], fechas['hasta'], por).items()
+            ]
+    return JsonResponse(respuesta)
+
+def metricas_view(request):
+    """Métricas internas (caché, gráficos, base de datos, limpieza) en formato Prometheus"""
+    return HttpResponse(metricas.exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def crear_grafico_sin_datos(mensaje):
     """Crea un gráfico que muestra un mensaje cuando no hay datos"""
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -28,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.middleware.ServerTimingMiddleware',  # Primero, para medir el request completo
+    'dashboard.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -57,6 +60,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'dashboard_project.wsgi.application'
+ASGI_APPLICATION = 'dashboard_project.asgi.application'
 
 # Database - Configuración para Neon
 DATABASES = {
@@ -108,5 +112,53 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Logging: una línea JSON por request con los tiempos por etapa (ServerTimingMiddleware)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'dashboard': {
+            'handlers': ['console'],
+            'level': os.environ.get('DASHBOARD_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Caché compartida entre procesos para páginas completas y fragmentos de plantillas.
+# Las claves incluyen la versión de los datos: no expiran por tiempo sino cuando los datos cambian
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'dashboard_cache')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 200},
+    }
+}
+
+# Directorio compartido donde cada proceso vuelca sus métricas para /metrics
+METRICAS_DIR = os.environ.get('DASHBOARD_METRICAS_DIR', os.path.join(tempfile.gettempdir(), 'dashboard_metricas'))
+
+# Motor de las agregaciones de las vistas: 'pandas' o 'duckdb' (requiere el paquete duckdb)
+DASHBOARD_MOTOR_ANALITICO = os.environ.get('DASHBOARD_MOTOR_ANALITICO', 'pandas')
+
+# Archivo versionado con las reglas de limpieza (diccionarios y patrones del DataCleaner)
+DASHBOARD_REGLAS_LIMPIEZA = os.environ.get('DASHBOARD_REGLAS_LIMPIEZA', os.path.join(BASE_DIR, 'dashboard', 'reglas_limpieza.json'))
+
+# Segundos que el DataFrame limpio y sus gráficos se reutilizan en memoria antes de reconstruirlos
+DASHBOARD_CACHE_TIMEOUT_SECONDS = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT_SECONDS', '300'))
+# Memoria máxima (MB) de los gráficos en caché de cada proceso; al superarla se descartan los menos usados
+DASHBOARD_CACHE_GRAFICOS_MB = int(os.environ.get('DASHBOARD_CACHE_GRAFICOS_MB', '256'))
+
+# Generar en segundo plano (comando procesar_graficos) los gráficos de Análisis por Eventos que
+# falten: la página responde enseguida y el navegador carga cada gráfico cuando está listo
+DASHBOARD_GRAFICOS_EN_SEGUNDO_PLANO = os.environ.get('DASHBOARD_GRAFICOS_EN_SEGUNDO_PLANO', '') == '1'
+# Segundos que /api/grafico/ espera al worker antes de generar el gráfico en el propio request
+DASHBOARD_ESPERA_MAXIMA_GRAFICO = int(os.environ.get('DASHBOARD_ESPERA_MAXIMA_GRAFICO', '60'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,155 @@
+"""
+Benchmark de consultas con filtro de fecha antes y después de particionar asistencia_humanitaria
+Ejecutar con: python scripts/benchmark_particiones.py --base dashboard_benchmark [--registros 5000000]
+
+Usa una base PostgreSQL local de pruebas (NUNCA la de producción): la migra, completa
+--registros registros sintéticos (los ya insertados se reutilizan en la siguiente corrida),
+mide cada consulta con la tabla sin particionar, ejecuta particionar_tabla y vuelve a medir.
+Para cada consulta muestra el mejor tiempo de --repeticiones y cuántas particiones lee
+según EXPLAIN. Con --revertir la tabla queda sin particionar al terminar.
+La conexión sale de --host/--puerto/--usuario/--clave o de PGHOST, PGPORT, PGUSER y PGPASSWORD.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard_project.settings')
+
+# Año que consultan los filtros (el generador sintético produce fechas de 2015 a 2024)
+ANIO = 2024
+
+
+def configurar_django(args):
+    """Apunta Django a la base PostgreSQL de pruebas indicada."""
+    import django
+    from django.conf import settings
+
+    settings.DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': args.base,
+            'HOST': args.host,
+            'PORT': args.puerto,
+            'USER': args.usuario,
+            'PASSWORD': args.clave,
+        }
+    }
+    django.setup()
+
+
+def consultas():
+    """
+    (nombre, queryset, agregados) equivalentes a las consultas de las vistas, el admin y la
+    exportación; si hay agregados se ejecuta queryset.aggregate(**agregados).
+    """
+    from django.db.models import Count, Sum
+
+    from dashboard.models import CAMPOS_AYUDA, AsistenciaHumanitaria
+
+    objetos = AsistenciaHumanitaria.objects
+    desde, hasta = f'{ANIO}-01-01', f'{ANIO}-12-31'
+    columnas = ['id', 'fecha', 'departamento', 'evento', *CAMPOS_AYUDA]
+    return [
+        ('exportar un año (filas)', objetos.filter(fecha__gte=desde, fecha__lte=hasta).order_by('id').values_list(*columnas), None),
+        ('exportar un trimestre (filas)', objetos.filter(fecha__gte=f'{ANIO}-10-01', fecha__lte=hasta).order_by('id').values_list(*columnas), None),
+        ('datos-tabla con desde (página)', objetos.filter(fecha__gte=f'{ANIO}-07-01').order_by('-fecha').values_list('id', 'fecha')[:10], None),
+        ('admin filtro por año (conteo)', objetos.filter(fecha__gte=desde, fecha__lt=f'{ANIO + 1}-01-01'), {'registros': Count('id')}),
+        ('totales de un año (agregado)', objetos.filter(fecha__year=ANIO), {campo: Sum(campo) for campo in CAMPOS_AYUDA}),
+        ('últimos registros (sin filtro)', objetos.order_by('-fecha').values_list('id', 'fecha')[:10], None),
+        ('conteo total (sin filtro)', objetos.all(), {'registros': Count('id')}),
+    ]
+
+
+def particiones_leidas(queryset):
+    """Tablas distintas que recorre el plan de la consulta (el WHERE decide qué particiones se leen)."""
+    plan = json.loads(queryset.explain(format='json'))
+
+    def recorrer(nodo):
+        if 'Relation Name' in nodo:
+            yield nodo['Relation Name']
+        for hijo in nodo.get('Plans', []):
+            yield from recorrer(hijo)
+
+    return len(set(recorrer(plan[0]['Plan'])))
+
+
+def medir(repeticiones):
+    """{consulta: (mejor tiempo en segundos, tablas leídas)}"""
+    resultados = {}
+    for nombre, queryset, agregados in consultas():
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            # .all() copia el queryset para que cada repetición vuelva a consultar la base
+            if agregados:
+                queryset.all().aggregate(**agregados)
+            else:
+                list(queryset.all())
+            tiempos.append(time.perf_counter() - inicio)
+        resultados[nombre] = (min(tiempos), particiones_leidas(queryset))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base', required=True, help='Base PostgreSQL de pruebas (se modifica)')
+    parser.add_argument('--host', default=os.environ.get('PGHOST', 'localhost'))
+    parser.add_argument('--puerto', default=os.environ.get('PGPORT', '5432'))
+    parser.add_argument('--usuario', default=os.environ.get('PGUSER', 'postgres'))
+    parser.add_argument('--clave', default=os.environ.get('PGPASSWORD', ''))
+    parser.add_argument('--registros', type=int, default=5000000, help='Registros sintéticos en la tabla')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones de cada consulta (se toma la mejor)')
+    parser.add_argument('--revertir', action='store_true', help='Deja la tabla sin particionar al terminar')
+    args = parser.parse_args()
+
+    configurar_django(args)
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    from dashboard.management.commands.particionar_tabla import esta_particionada
+    from dashboard.models import AsistenciaHumanitaria
+    from dashboard.utils.generador_sintetico import insertar_registros
+
+    call_command('migrate', verbosity=0)
+    with connection.cursor() as cursor:
+        if esta_particionada(cursor):
+            print('📂 La tabla estaba particionada: se revierte para medir primero sin particiones')
+            call_command('particionar_tabla', revertir=True, verbosity=0)
+
+    existentes = AsistenciaHumanitaria.objects.count()
+    if existentes < args.registros:
+        print(f'📥 Insertando {args.registros - existentes:,} registros sintéticos (hay {existentes:,})...')
+        inicio = time.perf_counter()
+        insertar_registros(args.registros - existentes, semilla=existentes, lote=100000)
+        print(f'   {time.perf_counter() - inicio:.0f}s')
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {AsistenciaHumanitaria._meta.db_table}')
+
+    print('⏱️ Midiendo sin particionar...')
+    antes = medir(args.repeticiones)
+    print('📂 Particionando...')
+    call_command('particionar_tabla')
+    print('⏱️ Midiendo particionada...')
+    despues = medir(args.repeticiones)
+
+    print(f"\n{'consulta':<34} {'sin particionar':>16} {'particionada':>13} {'mejora':>8} {'tablas leídas':>14}")
+    for nombre, (tiempo_antes, tablas_antes) in antes.items():
+        tiempo_despues, tablas_despues = despues[nombre]
+        print(
+            f'{nombre:<34} {tiempo_antes * 1000:>14.1f}ms {tiempo_despues * 1000:>11.1f}ms '
+            f'{tiempo_antes / max(tiempo_despues, 1e-9):>7.1f}x {tablas_antes!s:>6} -> {tablas_despues!s:<5}'
+        )
+
+    if args.revertir:
+        print('\n↩️ Revirtiendo el particionado...')
+        call_command('particionar_tabla', revertir=True)
+
+
+if __name__ == '__main__':
+    main()
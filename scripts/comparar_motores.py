@@ -0,0 +1,79 @@
+"""
+Comprueba que los motores analíticos pandas y DuckDB den resultados idénticos
+Ejecutar con: python scripts/comparar_motores.py [--filas 100000] [--semilla 0]
+
+Genera un DataFrame sintético, lo limpia igual que el comando limpiar_datos y
+compara cada agregación usada por las vistas (con tipos y orden incluidos).
+Termina con código 1 si alguna difiere. No necesita base de datos.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard_project.settings')
+
+import django # noqa: E402
+
+django.setup()
+
+import pandas as pd # type: ignore # noqa: E402
+
+from dashboard.utils.analitica import MotorDuckDB, MotorPandas # noqa: E402
+from dashboard.utils.generador_sintetico import generar_dataframe # noqa: E402
+from dashboard.utils.limpieza_paralela import limpiar_dataframe # noqa: E402
+
+# Agregaciones que resuelven las vistas geográfica, temporal, de eventos y el mapa
+AGREGACIONES = [
+    ['departamento'],
+    ['departamento', 'distrito'],
+    ['ano'],
+    ['ano', 'mes'],
+    ['evento'],
+    ['departamento', 'evento'],
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=100000, help='Filas sintéticas a generar')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla del generador')
+    args = parser.parse_args()
+
+    print(f'🧪 Generando y limpiando {args.filas:,} filas...')
+    df = limpiar_dataframe(generar_dataframe(args.filas, semilla=args.semilla))
+    df.insert(0, 'id', range(1, len(df) + 1))
+    # Filas sin fecha ni departamento, para verificar el tratamiento de nulos
+    df.loc[df.index[:5], 'fecha'] = pd.NaT
+    df.loc[df.index[5:10], 'departamento'] = None
+
+    pandas_, duckdb_ = MotorPandas(), MotorDuckDB()
+    fallas = 0
+    print(f"{'claves':<25} {'grupos':>7} {'pandas':>9} {'duckdb':>9}")
+    for claves in AGREGACIONES:
+        inicio = time.perf_counter()
+        esperado = pandas_.agregar(df, claves)
+        duracion_pandas = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        obtenido = duckdb_.agregar(df, claves)
+        duracion_duckdb = time.perf_counter() - inicio
+
+        print(f"{', '.join(claves):<25} {len(esperado):>7} {duracion_pandas:>8.3f}s {duracion_duckdb:>8.3f}s")
+        try:
+            pd.testing.assert_frame_equal(esperado, obtenido)
+        except AssertionError as exc:
+            fallas += 1
+            print(f'  ❌ Difieren:\n{exc}')
+
+    if fallas:
+        print(f'\n❌ {fallas} agregaciones difieren entre motores')
+        sys.exit(1)
+    print('\n✅ Ambos motores dan resultados idénticos')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Verificación del presupuesto de consultas SQL y de tiempo de cada URL del dashboard
+Ejecutar con: python scripts/presupuesto_consultas.py [--registros 2000]
+
+Crea una base SQLite temporal con datos sintéticos, recorre todas las URLs de
+dashboard/urls.py con la caché fría y caliente (y revalidando con If-None-Match las que
+devuelven ETag, que deben responder 304), y termina con código 1 si alguna supera su
+máximo de consultas o de tiempo. Una URL sin presupuesto también falla.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard_project.settings')
+
+# Presupuesto por nombre de URL: estado de caché -> (máximo de consultas, máximo de segundos).
+# Las vistas con ETag hacen 1 consulta (a resumen_estadisticas) para calcular la versión de los datos
+PRESUPUESTOS = {
+    'dashboard': {'fria': (4, 20.0), 'caliente': (1, 1.0), 'revalidacion': (1, 0.1)},
+    'geografico': {'fria': (2, 30.0), 'caliente': (1, 1.0), 'revalidacion': (1, 0.1)},
+    'temporal': {'fria': (2, 25.0), 'caliente': (1, 1.0), 'revalidacion': (1, 0.1)},
+    'eventos': {'fria': (2, 40.0), 'caliente': (1, 1.0), 'revalidacion': (1, 0.1)},
+    'datos_tabla': {'fria': (2, 1.0), 'caliente': (2, 1.0)},
+    'datos_mapa': {'fria': (2, 2.0), 'caliente': (1, 0.5), 'revalidacion': (1, 0.1)},
+    'datos_mapa_detalle': {'fria': (2, 2.0), 'caliente': (1, 0.1), 'revalidacion': (1, 0.1)},
+    'buscar': {'fria': (2, 2.0), 'caliente': (1, 0.1), 'revalidacion': (1, 0.1)},
+    'totales': {'fria': (2, 2.0), 'caliente': (1, 0.1), 'revalidacion': (1, 0.1)},
+    'grafico': {'fria': (2, 5.0), 'caliente': (1, 0.1)},
+    'exportar': {'fria': (1, 3.0), 'caliente': (0, 1.0)},
+    'metricas': {'fria': (0, 0.5), 'caliente': (0, 0.5)},
+}
+
+# Parámetros GET para las URLs que no responden nada útil sin ellos
+PARAMETROS = {
+    'buscar': '?q=san',
+    'datos_mapa_detalle': '?nivel=localidad',
+    'totales': '?desde=2022-01-01&hasta=2022-12-31&por=departamento',
+    'grafico': '?nombre=eventos',
+}
+
+
+def configurar_django(directorio):
+    """Apunta Django a una base SQLite, caché y directorio de métricas temporales."""
+    import django
+    from django.conf import settings
+
+    settings.DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directorio, 'presupuesto.sqlite3'),
+        }
+    }
+    settings.METRICAS_DIR = os.path.join(directorio, 'metricas')
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(directorio, 'cache'),
+            'TIMEOUT': None,
+        }
+    }
+    django.setup()
+
+
+def consumir(response):
+    if getattr(response, 'streaming', False):
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def medir_url(client, url, **encabezados):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as consultas:
+        inicio = time.perf_counter()
+        response = consumir(client.get(url, **encabezados))
+        duracion = time.perf_counter() - inicio
+    return response, len(consultas), duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=2000, help='Registros sintéticos a insertar')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla del generador')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        configurar_django(directorio)
+
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from django.test import Client
+        from django.urls import reverse
+
+        from dashboard import urls as dashboard_urls
+        from dashboard import views
+        from dashboard.utils.generador_sintetico import insertar_registros
+
+        call_command('migrate', verbosity=0)
+        insertar_registros(args.registros, semilla=args.semilla)
+
+        client = Client()
+        fallas = []
+        print(f"{'url':<18} {'caché':<12} {'estado':>6} {'consultas':>10} {'segundos':>9}")
+        for patron in dashboard_urls.urlpatterns:
+            presupuesto = PRESUPUESTOS.get(patron.name)
+            if presupuesto is None:
+                fallas.append(f"'{patron.name}' no tiene presupuesto definido en PRESUPUESTOS")
+                continue
+
+            url = reverse(f'{dashboard_urls.app_name}:{patron.name}') + PARAMETROS.get(patron.name, '')
+            views._reiniciar_caches()
+            cache.clear()
+            etag = None
+            for estado_cache in ('fria', 'caliente', 'revalidacion'):
+                if estado_cache == 'revalidacion':
+                    if etag is None:
+                        continue
+                    response, consultas, duracion = medir_url(client, url, HTTP_IF_NONE_MATCH=etag)
+                    esperado = 304
+                else:
+                    response, consultas, duracion = medir_url(client, url)
+                    etag, esperado = response.get('ETag'), 200
+                if estado_cache not in presupuesto:
+                    fallas.append(f"'{patron.name}' no tiene presupuesto '{estado_cache}' en PRESUPUESTOS")
+                    continue
+
+                estado = response.status_code
+                max_consultas, max_segundos = presupuesto[estado_cache]
+                print(f'{patron.name:<18} {estado_cache:<12} {estado:>6} {consultas:>4}/{max_consultas:<5} {duracion:>7.2f}/{max_segundos:g}')
+
+                if estado != esperado:
+                    fallas.append(f'{url} ({estado_cache}) respondió {estado} (se esperaba {esperado})')
+                if consultas > max_consultas:
+                    fallas.append(f'{url} ({estado_cache}) ejecutó {consultas} consultas (máximo {max_consultas})')
+                if duracion > max_segundos:
+                    fallas.append(f'{url} ({estado_cache}) tardó {duracion:.2f}s (máximo {max_segundos}s)')
+
+    if fallas:
+        print('\n❌ PRESUPUESTO EXCEDIDO:')
+        for falla in fallas:
+            print(f'  • {falla}')
+        sys.exit(1)
+    print('\n✅ Todas las URLs están dentro del presupuesto')
+
+
+if __name__ == '__main__':
+    main()
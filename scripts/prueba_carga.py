@@ -0,0 +1,279 @@
+"""
+Prueba de carga de todas las URLs del dashboard con usuarios concurrentes
+Ejecutar con: python scripts/prueba_carga.py [--registros 20000] [--concurrencia 16] [--duracion 30]
+
+Crea una base SQLite temporal con datos sintéticos, levanta un servidor local sobre ella
+(por defecto runserver; --comando permite usar p. ej. gunicorn) y durante --duracion segundos
+recorre las URLs de dashboard/urls.py desde --concurrencia hilos. Para cada escenario
+muestra, por URL, los percentiles p50/p95/p99 de latencia, las respuestas por segundo y
+el porcentaje de errores (excepciones o estado >= 400):
+
+  caliente  cada URL se visita una vez antes de medir
+  fria      servidor recién iniciado y caché compartida vacía: todos los hilos arrancan a la vez
+  expira    el DataFrame en memoria vence a mitad de la prueba (DASHBOARD_CACHE_TIMEOUT_SECONDS);
+            además muestra la latencia por intervalo para ver el pico de reconstrucciones
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard_project.settings')
+
+from presupuesto_consultas import PARAMETROS  # noqa: E402
+
+ESCENARIOS = ['caliente', 'fria', 'expira']
+COMANDO_SERVIDOR = f'{sys.executable} manage.py runserver {{direccion}} --noreload'
+SEGUNDOS_ARRANQUE = 60
+
+
+def configurar_django(directorio):
+    """Apunta Django a la base SQLite temporal y escribe un módulo de settings para el servidor."""
+    import django
+    from django.conf import settings
+
+    base = os.path.join(directorio, 'carga.sqlite3')
+    settings.DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': base}}
+    with open(os.path.join(directorio, 'settings_carga.py'), 'w', encoding='utf-8') as archivo:
+        archivo.write(
+            'from dashboard_project.settings import *  # noqa\n'
+            f"DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {base!r}}}}}\n"
+        )
+    django.setup()
+
+
+def rutas(seleccion):
+    """URLs a recorrer: todas las de dashboard/urls.py con los parámetros del presupuesto."""
+    from django.urls import reverse
+
+    from dashboard import urls as dashboard_urls
+
+    nombres = [patron.name for patron in dashboard_urls.urlpatterns]
+    if seleccion:
+        desconocidas = set(seleccion) - set(nombres)
+        if desconocidas:
+            sys.exit(f"❌ URLs desconocidas: {', '.join(sorted(desconocidas))}")
+        nombres = [nombre for nombre in nombres if nombre in seleccion]
+    return {
+        nombre: reverse(f'{dashboard_urls.app_name}:{nombre}') + PARAMETROS.get(nombre, '')
+        for nombre in nombres
+    }
+
+
+class Servidor:
+    """Servidor del dashboard en un subproceso, con la base, la caché y las métricas temporales."""
+
+    def __init__(self, directorio, comando, puerto):
+        self.directorio = directorio
+        self.comando = comando
+        self.direccion = f'127.0.0.1:{puerto}'
+        self.proceso = None
+
+    def iniciar(self, timeout_cache):
+        # La caché de páginas compartida arranca vacía en cada inicio
+        shutil.rmtree(os.path.join(self.directorio, 'cache'), ignore_errors=True)
+        entorno = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join([self.directorio, BASE_DIR]),
+            DJANGO_SETTINGS_MODULE='settings_carga',
+            DASHBOARD_CACHE_DIR=os.path.join(self.directorio, 'cache'),
+            DASHBOARD_METRICAS_DIR=os.path.join(self.directorio, 'metricas'),
+            DASHBOARD_CACHE_TIMEOUT_SECONDS=str(timeout_cache),
+        )
+        entorno.pop('RENDER', None) # Sin DEBUG: no se acumulan las consultas de cada request
+        self.registro = open(os.path.join(self.directorio, 'servidor.log'), 'a', encoding='utf-8')
+        self.proceso = subprocess.Popen(
+            self.comando.format(direccion=self.direccion).split(),
+            cwd=BASE_DIR, env=entorno, stdout=self.registro, stderr=subprocess.STDOUT,
+        )
+        host, puerto = self.direccion.split(':')
+        limite = time.monotonic() + SEGUNDOS_ARRANQUE
+        while time.monotonic() < limite:
+            if self.proceso.poll() is not None:
+                sys.exit(f'❌ El servidor terminó al iniciar; ver {self.registro.name}')
+            try:
+                socket.create_connection((host, int(puerto)), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.detener()
+        sys.exit(f'❌ El servidor no respondió en {SEGUNDOS_ARRANQUE}s; ver {self.registro.name}')
+
+    def detener(self):
+        if self.proceso is not None:
+            self.proceso.terminate()
+            try:
+                self.proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+            self.proceso = None
+            self.registro.close()
+
+
+def pedir(url, timeout):
+    """(segundos, ok) de un GET leyendo la respuesta completa."""
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as respuesta:
+            while respuesta.read(65536):
+                pass
+            ok = respuesta.status < 400
+    except urllib.error.HTTPError as error:
+        ok = error.code < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - inicio, ok
+
+
+def cargar(base, urls, concurrencia, duracion, timeout):
+    """
+    Recorre las URLs desde `concurrencia` hilos durante `duracion` segundos.
+    Retorna [(nombre, segundo de inicio, latencia, ok)].
+    """
+    nombres = list(urls)
+    resultados = []
+    lock = threading.Lock()
+    barrera = threading.Barrier(concurrencia)
+
+    def usuario(numero):
+        propios = []
+        barrera.wait() # Todos los hilos arrancan juntos, como en una estampida
+        inicio_prueba = time.perf_counter()
+        indice = numero
+        while time.perf_counter() - inicio_prueba < duracion:
+            nombre = nombres[indice % len(nombres)]
+            inicio = time.perf_counter() - inicio_prueba
+            latencia, ok = pedir(base + urls[nombre], timeout)
+            propios.append((nombre, inicio, latencia, ok))
+            indice += 1
+        with lock:
+            resultados.extend(propios)
+
+    hilos = [threading.Thread(target=usuario, args=(numero,)) for numero in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def resumir(resultados, duracion):
+    """{url: {'requests', 'errores_pct', 'rps', 'p50', 'p95', 'p99', 'max'}} (latencias en ms), más 'TOTAL'."""
+    grupos = {}
+    for nombre, _, latencia, ok in resultados:
+        grupos.setdefault(nombre, []).append((latencia, ok))
+    grupos['TOTAL'] = [(latencia, ok) for _, _, latencia, ok in resultados]
+    resumen = {}
+    for nombre, filas in grupos.items():
+        if not filas:
+            continue
+        latencias = np.array([latencia for latencia, _ in filas]) * 1000
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+        resumen[nombre] = {
+            'requests': len(filas),
+            'errores_pct': 100 * sum(not ok for _, ok in filas) / len(filas),
+            'rps': len(filas) / duracion,
+            'p50': p50, 'p95': p95, 'p99': p99, 'max': latencias.max(),
+        }
+    return resumen
+
+
+def linea_tiempo(resultados, duracion, ventana):
+    """[(desde, requests, p95 ms, máx ms)] por ventana de `ventana` segundos según el inicio de cada request."""
+    filas = []
+    desde = 0.0
+    while desde < duracion:
+        latencias = [latencia * 1000 for _, inicio, latencia, _ in resultados if desde <= inicio < desde + ventana]
+        if latencias:
+            filas.append((desde, len(latencias), float(np.percentile(latencias, 95)), max(latencias)))
+        desde += ventana
+    return filas
+
+
+def imprimir(escenario, resumen):
+    print(f'\n📊 Escenario {escenario}')
+    print(f"{'url':<20} {'requests':>8} {'errores':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    for nombre, fila in resumen.items():
+        print(
+            f"{nombre:<20} {fila['requests']:>8} {fila['errores_pct']:>7.1f}% {fila['rps']:>7.1f} "
+            f"{fila['p50']:>8.1f} {fila['p95']:>8.1f} {fila['p99']:>8.1f} {fila['max']:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=20000, help='Registros sintéticos a insertar')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla del generador')
+    parser.add_argument('--concurrencia', type=int, default=16, help='Usuarios (hilos) simultáneos')
+    parser.add_argument('--duracion', type=float, default=30.0, help='Segundos de carga por escenario')
+    parser.add_argument('--escenarios', nargs='+', choices=ESCENARIOS, default=ESCENARIOS)
+    parser.add_argument('--urls', nargs='+', help='Nombres de URL a probar (por defecto todas)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Segundos máximos por request')
+    parser.add_argument('--ventana', type=float, default=2.0, help='Segundos por intervalo en la línea de tiempo de expira')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--comando', default=COMANDO_SERVIDOR,
+                        help='Comando del servidor; {direccion} se reemplaza por host:puerto')
+    parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        configurar_django(directorio)
+
+        from django.core.management import call_command
+
+        from dashboard.utils.generador_sintetico import insertar_registros
+
+        call_command('migrate', verbosity=0)
+        print(f'📥 Insertando {args.registros:,} registros sintéticos...')
+        insertar_registros(args.registros, semilla=args.semilla)
+        urls = rutas(args.urls)
+
+        servidor = Servidor(directorio, args.comando, args.puerto)
+        base = f'http://{servidor.direccion}'
+        resultados = {}
+        try:
+            for escenario in args.escenarios:
+                # En expira el DataFrame (armado al calentar) vence a mitad de la medición
+                timeout_cache = max(1, int(args.duracion / 2)) if escenario == 'expira' else 300
+                servidor.iniciar(timeout_cache)
+                if escenario != 'fria':
+                    print(f'🔥 Calentando {len(urls)} URLs ({escenario})...')
+                    for url in urls.values():
+                        pedir(base + url, args.timeout)
+                print(f'⏱️ {escenario}: {args.concurrencia} usuarios durante {args.duracion:g}s')
+                crudos = cargar(base, urls, args.concurrencia, args.duracion, args.timeout)
+                servidor.detener()
+
+                resumen = resumir(crudos, args.duracion)
+                imprimir(escenario, resumen)
+                resultados[escenario] = {'urls': resumen}
+                if escenario == 'expira':
+                    print(f'\n  vence a los ~{timeout_cache}s   {"desde":>6} {"requests":>8} {"p95 ms":>8} {"máx ms":>8}')
+                    filas = linea_tiempo(crudos, args.duracion, args.ventana)
+                    for desde, cantidad, p95, maximo in filas:
+                        print(f'  {"":<18} {desde:>5.0f}s {cantidad:>8} {p95:>8.1f} {maximo:>8.1f}')
+                    resultados[escenario]['linea_tiempo'] = filas
+        finally:
+            servidor.detener()
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'parametros': vars(args), 'escenarios': resultados}, archivo, indent=2, ensure_ascii=False)
+        print(f'\n💾 Resultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
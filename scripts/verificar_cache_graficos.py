@@ -0,0 +1,117 @@
+"""
+Comprueba que la caché de gráficos en memoria no supere su presupuesto de bytes
+Ejecutar con: python scripts/verificar_cache_graficos.py [--presupuesto-mb 64] [--requests 3000]
+
+Simula una mezcla aleatoria de requests (unos pocos gráficos muy pedidos y muchas
+variantes, p. ej. por filtro) desde varios hilos a través de views._get_cached_graph,
+con "gráficos" base64 de 0.5 a 6 MB como los PNG de 300 dpi. Después de cada request
+verifica que el total contabilizado no pase el presupuesto y que coincida con la suma de
+las entradas, y con tracemalloc que la memoria retenida tampoco lo pase (más los gráficos
+que los otros hilos están generando).
+Termina con código 1 si algo falla. No necesita base de datos.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard_project.settings')
+
+import django # noqa: E402
+
+django.setup()
+
+import numpy as np # noqa: E402
+
+from dashboard import views # noqa: E402
+from dashboard.utils.cache_graficos import CacheGraficos, tamano # noqa: E402
+
+MB = 1024 * 1024
+# Memoria de más tolerada sobre el presupuesto por las estructuras de la caché
+MARGEN_BYTES = 2 * MB
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--presupuesto-mb', type=int, default=64, help='Presupuesto de la caché')
+    parser.add_argument('--requests', type=int, default=3000, help='Requests simulados en total')
+    parser.add_argument('--graficos', type=int, default=200, help='Gráficos distintos (nombre + variante)')
+    parser.add_argument('--hilos', type=int, default=4, help='Hilos que piden gráficos a la vez')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla de la mezcla de requests')
+    args = parser.parse_args()
+
+    presupuesto = args.presupuesto_mb * MB
+    generador = np.random.default_rng(args.semilla)
+    # Popularidad tipo Zipf: pocos gráficos concentran la mayoría de los requests
+    pesos = 1 / np.arange(1, args.graficos + 1) ** 1.1
+    pedidos = generador.choice(args.graficos, size=args.requests, p=pesos / pesos.sum())
+    tamanos = generador.integers(MB // 2, 6 * MB, size=args.graficos)
+
+    cache = CacheGraficos(presupuesto)
+    views._cache['graphs'] = cache
+    datos = object() # No es el DataFrame en caché: los gráficos no vencen por tiempo
+    fallas = []
+    lock = threading.Lock()
+    maximo = {'bytes': 0, 'memoria': 0}
+    # Cada uno de los otros hilos puede tener fuera de la caché el gráfico que está generando
+    # y el que acaba de obtener: con un solo hilo el límite es el presupuesto exacto
+    tolerancia = presupuesto + MARGEN_BYTES + (args.hilos - 1) * 2 * int(tamanos.max())
+
+    def generar(numero):
+        def funcion(_):
+            return 'A' * int(tamanos[numero]) # Un PNG base64 del tamaño del gráfico
+        return funcion
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+
+    def usuario(indices):
+        for numero in indices:
+            views._get_cached_graph(f'grafico_{numero}', datos, generar(numero))
+            memoria = tracemalloc.get_traced_memory()[0] - base
+            with lock:
+                maximo['bytes'] = max(maximo['bytes'], cache.bytes)
+                maximo['memoria'] = max(maximo['memoria'], memoria)
+                if cache.bytes > presupuesto:
+                    fallas.append(f'la caché contabiliza {cache.bytes:,} bytes (presupuesto {presupuesto:,})')
+                if memoria > tolerancia:
+                    fallas.append(f'la memoria retenida es {memoria:,} bytes (máximo tolerado {tolerancia:,})')
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=usuario, args=(pedidos[numero::args.hilos],)) for numero in range(args.hilos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+    memoria_final = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    contabilizado = sum(tamano(cache.obtener(nombre)) for nombre in cache.nombres())
+    if contabilizado != cache.bytes:
+        fallas.append(f'la suma de las entradas ({contabilizado:,}) no coincide con el total ({cache.bytes:,})')
+
+    sin_limite = sum(int(tamanos[numero]) for numero in set(pedidos.tolist()))
+    print(f'🧪 {args.requests:,} requests de {args.graficos} gráficos desde {args.hilos} hilos en {duracion:.1f}s')
+    print(f'  presupuesto                {presupuesto / MB:>8.1f} MB')
+    print(f'  máximo contabilizado       {maximo["bytes"] / MB:>8.1f} MB')
+    print(f'  máximo retenido (medido)   {maximo["memoria"] / MB:>8.1f} MB (tolerado {tolerancia / MB:.1f} MB)')
+    print(f'  retenido al terminar       {memoria_final / MB:>8.1f} MB')
+    print(f'  sin límite ocuparía        {sin_limite / MB:>8.1f} MB')
+    print(f'  entradas / descartes       {len(cache):>8} / {cache.desalojos}')
+
+    if fallas:
+        print(f'\n❌ {len(fallas)} verificaciones fallaron, p. ej.:')
+        for falla in fallas[:10]:
+            print(f'  • {falla}')
+        sys.exit(1)
+    print('\n✅ La caché de gráficos se mantuvo dentro del presupuesto')
+
+
+if __name__ == '__main__':
+    main()